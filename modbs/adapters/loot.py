@@ -1,4 +1,4 @@
-"""Адаптер LOOT: mock/blocked режимы."""
+"""Адаптер LOOT: mock/blocked/native режимы."""
 
 from __future__ import annotations
 
@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Mapping
 
+from modbs.loadorder import sort_profile
 from modbs.storage import write_json
 
 
@@ -66,12 +67,39 @@ def _run_blocked() -> LootResult:
     )
 
 
+def _run_native(ctx: Mapping[str, Any]) -> LootResult:
+    """Сортирует плагины встроенным движком без запуска процесса LOOT."""
+
+    root_path = _resolve_root_path(ctx)
+    profile_name = ctx.get("profile_name")
+    if not profile_name:
+        raise ValueError("Не задан профиль для native-сортировки LOOT")
+
+    rules = ctx.get("loot_rules")
+    rules_path = root_path / str(rules) if rules else None
+    order = sort_profile(root_path, str(profile_name), rules_path)
+
+    return LootResult(
+        status="Succeeded",
+        message=f"Порядок загрузки построен встроенным сортировщиком ({len(order)} плагинов).",
+        output_path=str(root_path / "workspace" / "profiles" / str(profile_name) / "loadorder.txt"),
+    )
+
+
 def run(mode: str, ctx: Mapping[str, Any]) -> LootResult:
-    """Запускает LOOT в заданном режиме."""
+    """Запускает LOOT в заданном режиме.
+
+    Если LOOT заблокирован и в контексте задан loot_fallback="native",
+    порядок строится встроенным сортировщиком.
+    """
 
     if mode == "mock":
         return _run_mock(ctx)
+    if mode == "native":
+        return _run_native(ctx)
     if mode == "blocked":
+        if ctx.get("loot_fallback") == "native":
+            return _run_native(ctx)
         return _run_blocked()
 
     raise ValueError(f"Неизвестный режим LOOT: {mode}")
@@ -0,0 +1,293 @@
+"""Адаптер xEdit: quick auto clean (QAC) плагинов пулом процессов.
+
+Каждый плагин чистится отдельным процессом
+`<xEdit> -D:<Data> -quickautoclean -autoload <module> -autoexit`; лог
+разбирается построчно по мере вывода. Плагины чистятся ярусами по
+masters из заголовков: сначала мастера, затем зависящие от них, и
+параллельно только внутри яруса — xEdit не загружает мастер, который
+в этот момент переписывает другой процесс, а зависимый плагин
+чистится уже против очищенного мастера. Data —
+развернутый каталог профиля (DeployProfile): в нем xEdit находит и сам
+модуль, и его мастера. Если xEdit заменил файл в Data, а не переписал
+его на месте, очищенная версия возвращается в мод. Результаты
+кэшируются в state/xedit.qac.json по digest плагина и версии xEdit:
+запоминается и digest после очистки, поэтому уже очищенный плагин
+повторно не запускается.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from modbs.fsops import replace_with, sha256_file
+from modbs.plugins import parse_plugin_header
+from modbs.storage import read_json, write_json
+
+XEDIT_CACHE_PATH = Path("state") / "xedit.qac.json"
+
+QAC_ARGS = ("-quickautoclean", "-autoexit")
+
+DEFAULT_TIMEOUT = 600.0
+
+# В отчет попадают первые ошибки лога, остальное только считается.
+_MAX_ERRORS = 20
+
+_ITM_RE = re.compile(r"\bRemoving:")
+_UDR_RE = re.compile(r"\bUndeleting:")
+_NAVMESH_RE = re.compile(r"deleted navmesh", re.IGNORECASE)
+_ERROR_RE = re.compile(r"<Error\b|\bException\b|^\s*(?:\[[\d:]+\]\s*)?Error\b")
+
+
+@dataclass(frozen=True)
+class QACResult:
+    """Результат QAC одного плагина."""
+
+    plugin: str
+    status: str
+    digest: str
+    cleaned_digest: str | None = None
+    itm_removed: int = 0
+    udr_undeleted: int = 0
+    navmesh_deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+
+class QACLogParser:
+    """Потоковый разбор лога QAC: счетчики ITM/UDR, навмеши, ошибки."""
+
+    def __init__(self) -> None:
+        self.itm_removed = 0
+        self.udr_undeleted = 0
+        self.navmesh_deleted = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+
+    def feed(self, line: str) -> None:
+        """Учитывает одну строку лога."""
+
+        if _ITM_RE.search(line):
+            self.itm_removed += 1
+        elif _UDR_RE.search(line):
+            self.udr_undeleted += 1
+        if _NAVMESH_RE.search(line):
+            self.navmesh_deleted += 1
+        if _ERROR_RE.search(line):
+            self.error_count += 1
+            if len(self.errors) < _MAX_ERRORS:
+                self.errors.append(line.strip())
+
+
+def xedit_version(executable: Path, configured: Any = None) -> str:
+    """Версия xEdit для ключа кэша: из конфига или digest исполняемого файла."""
+
+    if configured:
+        return str(configured)
+    return sha256_file(executable)
+
+
+def _load_cache(root_path: Path) -> Dict[str, Any]:
+    """Читает кэш результатов QAC."""
+
+    cache_path = root_path / XEDIT_CACHE_PATH
+    if cache_path.exists():
+        return read_json(cache_path)
+    return {"meta": {"schema": "modbs.xedit_qac.v0"}, "versions": {}}
+
+
+def _clean_plugin(
+    command: Sequence[str],
+    root_path: Path,
+    plugin: Path,
+    digest: str,
+    timeout: float,
+    data_dir: Path,
+) -> QACResult:
+    """Запускает QAC для одного плагина и разбирает вывод по мере поступления."""
+
+    rel_path = plugin.relative_to(root_path).as_posix()
+    module = data_dir / plugin.name
+    if not module.is_file() or sha256_file(module) != digest:
+        # В Data другой мод перекрывает плагин или деплой устарел:
+        # xEdit почистил бы не тот файл.
+        return QACResult(
+            plugin=rel_path,
+            status="failed",
+            digest=digest,
+            errors=[f"{plugin.name} в {data_dir} не совпадает с файлом мода: выполните DeployProfile"],
+        )
+
+    args = [*command, f"-D:{data_dir}", "-autoload", plugin.name, *QAC_ARGS]
+    parser = QACLogParser()
+    started = time.perf_counter()
+
+    process = subprocess.Popen(
+        args,
+        cwd=data_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+    )
+    timed_out = threading.Event()
+
+    def _kill() -> None:
+        timed_out.set()
+        process.kill()
+
+    # Завислый xEdit (модальное окно) снимается по таймауту.
+    watchdog = threading.Timer(timeout, _kill)
+    watchdog.start()
+    try:
+        for line in process.stdout or ():
+            parser.feed(line)
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+
+    errors = list(parser.errors)
+    if timed_out.is_set():
+        errors.append(f"xEdit не завершился за {timeout:g} с")
+    elif returncode != 0:
+        errors.append(f"xEdit завершился с кодом {returncode}")
+    failed = bool(errors)
+    if not failed and module.is_file() and not os.path.samefile(module, plugin):
+        # Reflink/копия или сохранение через rename: очищенный файл только в Data.
+        replace_with(module, plugin)
+    return QACResult(
+        plugin=rel_path,
+        status="failed" if failed else ("cleaned" if parser.itm_removed or parser.udr_undeleted else "clean"),
+        digest=digest,
+        cleaned_digest=None if failed else sha256_file(plugin),
+        itm_removed=parser.itm_removed,
+        udr_undeleted=parser.udr_undeleted,
+        navmesh_deleted=parser.navmesh_deleted,
+        errors=errors,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+
+def _master_tiers(plugins: Sequence[Path], pending: Sequence[int]) -> List[List[int]]:
+    """Делит плагины на ярусы: мастер всегда в более раннем ярусе, чем зависимый.
+
+    Учитываются только masters из той же пачки; плагин с нечитаемым
+    заголовком считается плагином без masters (ошибку покажет xEdit).
+    Цикл masters разрывается в точке повторного входа.
+    """
+
+    by_name = {plugins[index].name.lower(): index for index in pending}
+    masters: Dict[int, List[int]] = {}
+    for index in pending:
+        try:
+            header = parse_plugin_header(plugins[index])
+        except (OSError, ValueError):
+            masters[index] = []
+            continue
+        masters[index] = [
+            by_name[name] for name in (master.lower() for master in header.masters) if name in by_name
+        ]
+
+    depth: Dict[int, int] = {}
+    visiting: set[int] = set()
+
+    def _depth(index: int) -> int:
+        if index in depth:
+            return depth[index]
+        visiting.add(index)
+        level = 1 + max(
+            (_depth(master) for master in masters[index] if master not in visiting),
+            default=-1,
+        )
+        visiting.discard(index)
+        depth[index] = level
+        return level
+
+    tiers: List[List[int]] = []
+    for index in pending:
+        level = _depth(index)
+        while len(tiers) <= level:
+            tiers.append([])
+        tiers[level].append(index)
+    return tiers
+
+
+def run_qac(
+    root_path: Path,
+    plugins: Sequence[Path],
+    executable: Path,
+    data_dir: Path,
+    extra_args: Sequence[str] = (),
+    version: Any = None,
+    max_workers: int | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> List[QACResult]:
+    """Чистит плагины пулом процессов xEdit, пропуская закэшированные.
+
+    Ярусы по masters идут по очереди, плагины одного яруса независимы и
+    чистятся параллельно: пул ограничен max_workers (по умолчанию
+    os.cpu_count()). Успешные
+    результаты записываются в кэш под digest до и после очистки.
+    data_dir — Data развернутого профиля, передается xEdit как -D:.
+    """
+
+    key = xedit_version(executable, version)
+    cache = _load_cache(root_path)
+    known: Dict[str, Dict[str, Any]] = cache["versions"].setdefault(key, {})
+
+    digests = [sha256_file(plugin) for plugin in plugins]
+    results: Dict[int, QACResult] = {}
+    pending: List[int] = []
+    for index, (plugin, digest) in enumerate(zip(plugins, digests)):
+        entry = known.get(digest)
+        if entry is None:
+            pending.append(index)
+            continue
+        results[index] = QACResult(
+            plugin=plugin.relative_to(root_path).as_posix(),
+            status="cached",
+            digest=digest,
+            cleaned_digest=entry.get("cleaned_digest"),
+            itm_removed=int(entry.get("itm_removed", 0)),
+            udr_undeleted=int(entry.get("udr_undeleted", 0)),
+            navmesh_deleted=int(entry.get("navmesh_deleted", 0)),
+        )
+
+    if pending:
+        command = [str(executable), *extra_args]
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for tier in _master_tiers(plugins, pending):
+                cleaned = pool.map(
+                    lambda index: _clean_plugin(
+                        command, root_path, plugins[index], digests[index], timeout, data_dir
+                    ),
+                    tier,
+                )
+                for index, result in zip(tier, cleaned):
+                    results[index] = result
+
+        for index in pending:
+            result = results[index]
+            if result.status == "failed":
+                continue
+            entry = {
+                name: value
+                for name, value in asdict(result).items()
+                if name in ("plugin", "status", "cleaned_digest", "itm_removed", "udr_undeleted", "navmesh_deleted")
+            }
+            known[result.digest] = entry
+            # Очищенный файл уже чист: повторный запуск ничего бы не изменил.
+            if result.cleaned_digest:
+                known[result.cleaned_digest] = {**entry, "status": "clean", "itm_removed": 0, "udr_undeleted": 0}
+        write_json(root_path / XEDIT_CACHE_PATH, cache)
+
+    return [results[index] for index in range(len(plugins))]
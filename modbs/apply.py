@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, Mapping
+from typing import Any, Dict, List, Mapping
 
 from .executor import ExecutionResult, execute
 from .models import PlanIR
-from .state import write_state_artifacts
+from .state import LOCKFILE_FORMAT_JSON, write_state_artifacts
+from .storage import DURABILITY_FULL, read_json, write_json
+
+RESUME_PATH = Path("state") / "resume.json"
 
 
 def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
@@ -24,13 +27,57 @@ def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
     raise ValueError("Не задан корневой путь для apply")
 
 
+def _load_resume_step_ids(resume_path: Path, plan: PlanIR) -> List[str]:
+    """Возвращает выполненные шаги прошлого запуска, если план тот же."""
+
+    if not resume_path.exists():
+        return []
+    payload = read_json(resume_path)
+    if payload.get("step_ids") != [step.step_id for step in plan.steps]:
+        # План изменился — выполненные шаги прошлой версии не переиспользуются.
+        return []
+    return list(payload.get("completed", []))
+
+
 def apply_plan(plan: PlanIR, ctx: Dict[str, Any]) -> ExecutionResult:
-    """Исполняет план и после этого пишет lockfile/provenance."""
+    """Исполняет план и после этого пишет lockfile/provenance.
+
+    При ctx["resume"] шаги, выполненные до прошлой блокировки, пропускаются.
+    Если запуск завершился Blocked, выполненные и припаркованные шаги
+    сохраняются в state/resume.json для apply --resume.
+    """
+
+    root_path = _resolve_root_path(ctx)
+    resume_path = root_path / RESUME_PATH
+    durability = ctx.get("durability", DURABILITY_FULL)
+
+    completed: List[str] = []
+    if ctx.get("resume"):
+        completed = _load_resume_step_ids(resume_path, plan)
+        ctx["skip_step_ids"] = completed
 
     result = execute(plan, ctx)
 
+    if result.status == "Blocked" and result.parked:
+        write_json(
+            resume_path,
+            {
+                "meta": {"schema": "modbs.resume.v0"},
+                "step_ids": [step.step_id for step in plan.steps],
+                "completed": completed + result.executed_step_ids,
+                "parked": result.parked,
+                "next_action_at": result.next_action_at,
+            },
+            durability,
+        )
+    elif result.status == "Succeeded" and resume_path.exists():
+        resume_path.unlink()
+
     # Даже при частичном выполнении полезно зафиксировать текущие outputs.
-    root_path = _resolve_root_path(ctx)
-    write_state_artifacts(root_path)
+    write_state_artifacts(
+        root_path,
+        durability=durability,
+        lockfile_format=ctx.get("lockfile_format", LOCKFILE_FORMAT_JSON),
+    )
 
     return result
@@ -0,0 +1,383 @@
+"""Потоковая распаковка архивов модов (zip/tar) с хэшированием на лету."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from .fsops import sha256_file
+from .remote_cache import RemoteCache, RemoteCacheError, action_key
+from .storage import read_json, write_json
+from .trace import span
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+INSTALLS_DIR = Path("state") / "installs"
+
+
+@dataclass(frozen=True)
+class InstallJob:
+    """Задание на установку одного архива в каталог назначения."""
+
+    name: str
+    archive: Path
+    target_dir: Path
+
+
+@dataclass(frozen=True)
+class InstallResult:
+    """Результат установки архива."""
+
+    name: str
+    status: str
+    files: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+def _safe_member_path(name: str) -> PurePosixPath | None:
+    """Нормализует имя члена архива; None — если путь небезопасен или пуст."""
+
+    normalized = name.replace("\\", "/")
+    path = PurePosixPath(normalized)
+    if path.is_absolute() or (path.parts and ":" in path.parts[0]):
+        return None
+    parts = [part for part in path.parts if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return PurePosixPath(*parts)
+
+
+def _stream_to_file(source: IO[bytes], target: Path) -> Dict[str, Any]:
+    """Копирует поток в файл, считая sha256 за тот же проход."""
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with open(target, "wb") as handle:
+        for chunk in iter(lambda: source.read(_COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            handle.write(chunk)
+            size += len(chunk)
+    stat = target.stat()
+    return {"hash": f"sha256:{digest.hexdigest()}", "size": size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _iter_zip_members(archive: Path) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Отдает (имя, поток) для файлов zip-архива."""
+
+    with zipfile.ZipFile(archive) as bundle:
+        for info in bundle.infolist():
+            if info.is_dir():
+                continue
+            with bundle.open(info) as stream:
+                yield info.filename, stream
+
+
+def _iter_tar_members(archive: Path) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Отдает (имя, поток) для обычных файлов tar-архива.
+
+    Используется потоковый режим r|*: архив читается строго последовательно.
+    Ссылки и спецфайлы пропускаются.
+    """
+
+    with tarfile.open(archive, mode="r|*") as bundle:
+        for member in bundle:
+            if not member.isfile():
+                continue
+            stream = bundle.extractfile(member)
+            if stream is None:
+                continue
+            with stream:
+                yield member.name, stream
+
+
+def _iter_members(archive: Path) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Выбирает читатель по формату архива."""
+
+    if zipfile.is_zipfile(archive):
+        return _iter_zip_members(archive)
+    if tarfile.is_tarfile(archive):
+        return _iter_tar_members(archive)
+    raise ValueError(f"Неподдерживаемый формат архива: {archive.name}")
+
+
+def extract_archive(archive: Path, target_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Распаковывает архив в target_dir и возвращает манифест файлов.
+
+    Манифест: относительный путь → {hash, size, mtime_ns}; хэш считается во
+    время записи, повторное чтение файлов не нужно.
+    """
+
+    files: Dict[str, Dict[str, Any]] = {}
+    for member_name, stream in _iter_members(archive):
+        member_path = _safe_member_path(member_name)
+        if member_path is None:
+            raise ValueError(f"Небезопасный путь в архиве {archive.name}: {member_name}")
+        rel_path = member_path.as_posix()
+        files[rel_path] = _stream_to_file(stream, target_dir.joinpath(*member_path.parts))
+    return files
+
+
+def _manifest_path(root_path: Path, name: str) -> Path:
+    """Путь к манифесту установки в state/installs/."""
+
+    return root_path / INSTALLS_DIR / f"{name}.json"
+
+
+def _archive_digest(archive: Path, previous: Dict[str, Any]) -> str:
+    """Возвращает sha256 архива, переиспользуя прошлый результат по stat."""
+
+    stat = archive.stat()
+    if (
+        previous.get("archive_size") == stat.st_size
+        and previous.get("archive_mtime_ns") == stat.st_mtime_ns
+        and previous.get("archive_digest")
+    ):
+        return str(previous["archive_digest"])
+    return sha256_file(archive)
+
+
+def _target_matches(target_dir: Path, files: Dict[str, Dict[str, Any]]) -> bool:
+    """Проверяет каталог назначения по манифесту (только stat, без чтения)."""
+
+    for rel_path, entry in files.items():
+        try:
+            stat = (target_dir / rel_path).stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_size != entry.get("size") or stat.st_mtime_ns != entry.get("mtime_ns"):
+            return False
+    return True
+
+
+def _swap_into_place(staging_dir: Path, target_dir: Path) -> None:
+    """Заменяет каталог назначения подготовленным staging-каталогом."""
+
+    backup_dir = target_dir.with_name(f".old-{target_dir.name}")
+    if backup_dir.exists():
+        shutil.rmtree(backup_dir)
+    if target_dir.exists():
+        os.replace(target_dir, backup_dir)
+    os.replace(staging_dir, target_dir)
+    if backup_dir.exists():
+        shutil.rmtree(backup_dir)
+
+
+def _fetch_from_cache(
+    remote: RemoteCache,
+    action: Mapping[str, Any],
+    staging_dir: Path,
+) -> Dict[str, Dict[str, Any]]:
+    """Собирает staging-каталог из blob удаленного кэша вместо распаковки.
+
+    Запись действия пришла из сети, поэтому ее форма проверяется до
+    использования: ошибка — RemoteCacheError и локальная распаковка.
+    """
+
+    entries = action.get("files") if isinstance(action, Mapping) else None
+    if not isinstance(entries, Mapping):
+        raise RemoteCacheError("Некорректный результат кэша: нет списка файлов")
+    items: List[Tuple[str, Path]] = []
+    for rel_path, entry in entries.items():
+        if not isinstance(entry, Mapping) or not isinstance(entry.get("hash"), str):
+            raise RemoteCacheError(f"Некорректная запись файла в результате кэша: {rel_path}")
+        member_path = _safe_member_path(rel_path)
+        if member_path is None or member_path.as_posix() != rel_path:
+            raise RemoteCacheError(f"Небезопасный путь в результате кэша: {rel_path}")
+        items.append((entry["hash"], staging_dir.joinpath(*member_path.parts)))
+
+    staging_dir.mkdir(parents=True)
+    remote.fetch_blobs(items)
+    files: Dict[str, Dict[str, Any]] = {}
+    for rel_path, (file_hash, path) in zip(entries, items):
+        stat = path.stat()
+        files[rel_path] = {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return files
+
+
+def _publish_to_cache(
+    remote: RemoteCache,
+    key: str,
+    target_dir: Path,
+    files: Mapping[str, Dict[str, Any]],
+) -> None:
+    """Публикует результат распаковки в удаленный кэш (ошибки не мешают сборке)."""
+
+    action = {
+        "meta": {"schema": "modbs.action.install.v0"},
+        "files": {rel_path: {"hash": entry["hash"], "size": entry["size"]} for rel_path, entry in files.items()},
+    }
+    blobs = {entry["hash"]: target_dir / rel_path for rel_path, entry in files.items()}
+    try:
+        with span("cache_upload", "install", files=len(blobs)):
+            remote.upload(key, action, blobs)
+    except (RemoteCacheError, OSError):
+        pass
+
+
+def install_archive(
+    root_path: Path,
+    job: InstallJob,
+    remote: RemoteCache | None = None,
+    cached_action: Mapping[str, Any] | None = None,
+    archive_digest: str | None = None,
+) -> InstallResult:
+    """Устанавливает архив в каталог назначения с пропуском неизмененных.
+
+    Установка пропускается, если digest архива и файлы назначения совпадают
+    с манифестом прошлой установки. С remote результат распаковки берется
+    из удаленного кэша (cached_action — заранее найденная запись), а после
+    локальной распаковки публикуется в него; при ошибке кэша архив просто
+    распаковывается локально.
+    """
+
+    if not job.archive.is_file():
+        raise FileNotFoundError(f"Не найден архив: {job.archive}")
+
+    manifest_path = _manifest_path(root_path, job.name)
+    previous: Dict[str, Any] = read_json(manifest_path) if manifest_path.exists() else {}
+
+    archive_digest = archive_digest or _archive_digest(job.archive, previous)
+    previous_files = previous.get("files", {})
+    if (
+        previous.get("archive_digest") == archive_digest
+        and job.target_dir.is_dir()
+        and _target_matches(job.target_dir, previous_files)
+    ):
+        return InstallResult(name=job.name, status="skipped", files=previous_files)
+
+    staging_dir = job.target_dir.with_name(f".staging-{job.target_dir.name}")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+
+    key = action_key("install", archive_digest)
+    files: Dict[str, Dict[str, Any]] | None = None
+    if remote is not None and cached_action is not None:
+        try:
+            with span("cache_fetch", "install", archive=job.archive.name):
+                files = _fetch_from_cache(remote, cached_action, staging_dir)
+        except (RemoteCacheError, OSError):
+            # Кэш подвел — откатываемся на локальную распаковку.
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            files = None
+
+    status = "cached" if files is not None else "installed"
+    if files is None:
+        try:
+            with span("extract_archive", "install", archive=job.archive.name):
+                files = extract_archive(job.archive, staging_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+    _swap_into_place(staging_dir, job.target_dir)
+    if remote is not None and status == "installed":
+        _publish_to_cache(remote, key, job.target_dir, files)
+
+    archive_stat = job.archive.stat()
+    resolved_root = root_path.resolve()
+    archive_ref = job.archive.resolve()
+    if archive_ref.is_relative_to(resolved_root):
+        archive_ref = archive_ref.relative_to(resolved_root)
+    write_json(
+        manifest_path,
+        {
+            "meta": {"schema": "modbs.install.v0"},
+            "name": job.name,
+            "archive": archive_ref.as_posix(),
+            "archive_digest": archive_digest,
+            "archive_size": archive_stat.st_size,
+            "archive_mtime_ns": archive_stat.st_mtime_ns,
+            "target": job.target_dir.relative_to(resolved_root).as_posix(),
+            "files": files,
+        },
+    )
+    return InstallResult(name=job.name, status=status, files=files)
+
+
+def _lookup_cached_actions(
+    root_path: Path,
+    jobs: Sequence[InstallJob],
+    remote: RemoteCache,
+    pool: ThreadPoolExecutor,
+) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """Считает digest архивов и одним пакетом ищет их в удаленном кэше."""
+
+    def _digest(job: InstallJob) -> str:
+        if not job.archive.is_file():
+            raise FileNotFoundError(f"Не найден архив: {job.archive}")
+        manifest_path = _manifest_path(root_path, job.name)
+        previous = read_json(manifest_path) if manifest_path.exists() else {}
+        return _archive_digest(job.archive, previous)
+
+    digests = list(pool.map(_digest, jobs))
+    try:
+        actions = remote.lookup_actions([action_key("install", digest) for digest in digests])
+    except RemoteCacheError:
+        actions = {}
+    return digests, actions
+
+
+def install_archives(
+    root_path: Path,
+    jobs: Sequence[InstallJob],
+    max_workers: int = 4,
+    remote: RemoteCache | None = None,
+) -> List[InstallResult]:
+    """Устанавливает несколько архивов параллельно.
+
+    zlib/lzma и sha256 отпускают GIL на больших блоках, поэтому потоков
+    достаточно для параллельной распаковки. С remote результаты всех
+    архивов ищутся в удаленном кэше одним пакетным запросом.
+    """
+
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Имена устанавливаемых модов должны быть уникальны")
+
+    workers = max(1, min(max_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if remote is None:
+            return list(pool.map(lambda job: install_archive(root_path, job), jobs))
+
+        digests, actions = _lookup_cached_actions(root_path, jobs, remote, pool)
+        return list(
+            pool.map(
+                lambda job, digest: install_archive(
+                    root_path,
+                    job,
+                    remote=remote,
+                    cached_action=actions.get(action_key("install", digest)),
+                    archive_digest=digest,
+                ),
+                jobs,
+                digests,
+            )
+        )
+
+
+def load_install_hints(root_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Собирает хэши установленных файлов: путь от корня → {hash, size, mtime_ns}.
+
+    Используется при построении lockfile, чтобы не перечитывать файлы,
+    хэш которых уже посчитан при распаковке.
+    """
+
+    hints: Dict[str, Dict[str, Any]] = {}
+    installs_dir = root_path / INSTALLS_DIR
+    if not installs_dir.is_dir():
+        return hints
+
+    for manifest_path in sorted(installs_dir.glob("*.json")):
+        manifest = read_json(manifest_path)
+        target = manifest.get("target")
+        if not target:
+            continue
+        for rel_path, entry in manifest.get("files", {}).items():
+            hints[f"{target}/{rel_path}"] = entry
+    return hints
@@ -0,0 +1,175 @@
+"""Чтение оглавления BSA-архивов (v104 Skyrim LE, v105 Skyrim SE) через mmap."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from .archives import load_install_hints
+from .storage import read_json, write_json
+
+BSA_EXTENSIONS = {".bsa"}
+BSA_CACHE_PATH = Path("state") / "bsa.cache.json"
+
+_HEADER = struct.Struct("<4sIIIIIIIH2x")
+_FOLDER_V104 = struct.Struct("<QII")
+_FOLDER_V105 = struct.Struct("<QI4xQ")
+_FILE_RECORD = struct.Struct("<QII")
+
+_FLAG_DIR_NAMES = 0x1
+_FLAG_FILE_NAMES = 0x2
+_FLAG_COMPRESSED = 0x4
+_SIZE_COMPRESS_TOGGLE = 0x40000000
+_SIZE_MASK = 0x3FFFFFFF
+
+
+@dataclass(frozen=True)
+class BsaEntry:
+    """Файл внутри BSA: путь (через /), размер в архиве и признак сжатия."""
+
+    path: str
+    size: int
+    compressed: bool
+
+
+def _parse_listing(data: Any, name: str) -> List[BsaEntry]:
+    """Разбирает таблицы каталогов и файлов BSA из буфера."""
+
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Некорректный BSA: {name}")
+    (
+        magic,
+        version,
+        folder_offset,
+        archive_flags,
+        folder_count,
+        file_count,
+        _folder_names_length,
+        file_names_length,
+        _file_flags,
+    ) = _HEADER.unpack_from(data, 0)
+    if magic != b"BSA\0":
+        raise ValueError(f"Некорректный BSA: {name}")
+    if version == 104:
+        folder_struct = _FOLDER_V104
+    elif version == 105:
+        folder_struct = _FOLDER_V105
+    else:
+        raise ValueError(f"Неподдерживаемая версия BSA {version}: {name}")
+    if not archive_flags & _FLAG_DIR_NAMES or not archive_flags & _FLAG_FILE_NAMES:
+        raise ValueError(f"BSA без таблицы имен не поддерживается: {name}")
+
+    default_compressed = bool(archive_flags & _FLAG_COMPRESSED)
+    counts = [
+        folder_struct.unpack_from(data, folder_offset + index * folder_struct.size)[1]
+        for index in range(folder_count)
+    ]
+
+    # Блоки файлов идут сразу за записями каталогов: bzstring имени каталога + записи.
+    offset = folder_offset + folder_count * folder_struct.size
+    records: List[tuple[str, int]] = []
+    for count in counts:
+        name_length = data[offset]
+        folder_name = bytes(data[offset + 1:offset + name_length]).rstrip(b"\0").decode("cp1252")
+        offset += 1 + name_length
+        for _ in range(count):
+            _, size, _ = _FILE_RECORD.unpack_from(data, offset)
+            records.append((folder_name.replace("\\", "/"), size))
+            offset += _FILE_RECORD.size
+
+    names_end = offset + file_names_length
+    if names_end > len(data) or len(records) != file_count:
+        raise ValueError(f"Оборванное оглавление BSA: {name}")
+    file_names = bytes(data[offset:names_end]).split(b"\0")[:file_count]
+
+    entries: List[BsaEntry] = []
+    for (folder_name, raw_size), file_name in zip(records, file_names):
+        compressed = default_compressed != bool(raw_size & _SIZE_COMPRESS_TOGGLE)
+        path = f"{folder_name}/{file_name.decode('cp1252')}" if folder_name else file_name.decode("cp1252")
+        entries.append(BsaEntry(path=path, size=raw_size & _SIZE_MASK, compressed=compressed))
+    return entries
+
+
+def read_bsa_listing(path: Path) -> List[BsaEntry]:
+    """Возвращает оглавление BSA, не распаковывая данные.
+
+    Через mmap с диска читаются только страницы заголовка и таблиц; тела
+    файлов (основная часть архива) не затрагиваются.
+    """
+
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"Некорректный BSA: {path.name}")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return _parse_listing(view, path.name)
+
+
+def load_bsa_listings(
+    root_path: Path,
+    archives: Iterable[Path],
+    errors: Dict[str, str] | None = None,
+) -> Dict[str, List[BsaEntry]]:
+    """Читает оглавления нескольких BSA с кэшированием в state/bsa.cache.json.
+
+    Ключ кэша — sha256 архива из манифеста установки (тот же архив в другом
+    моде не разбирается повторно), иначе (path, size, mtime). Возвращает
+    путь BSA от корня → оглавление. С errors нечитаемый архив не прерывает
+    чтение: он пропускается, а причина пишется в errors[путь BSA].
+    """
+
+    cache_path = root_path / BSA_CACHE_PATH
+    cache: Dict[str, Any] = read_json(cache_path) if cache_path.exists() else {}
+    cached_stats: Dict[str, Any] = cache.get("by_path", {})
+    cached_listings: Dict[str, Any] = cache.get("listings", {})
+    hints: Dict[str, Dict[str, Any]] | None = None
+
+    result: Dict[str, List[BsaEntry]] = {}
+    by_path = dict(cached_stats)
+    listings = dict(cached_listings)
+
+    for archive in archives:
+        rel_path = archive.relative_to(root_path).as_posix()
+        stat = archive.stat()
+
+        previous = cached_stats.get(rel_path, {})
+        if previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            key = str(previous["key"])
+        else:
+            if hints is None:
+                hints = load_install_hints(root_path)
+            hint = hints.get(rel_path, {})
+            if hint.get("size") == stat.st_size and hint.get("mtime_ns") == stat.st_mtime_ns:
+                key = str(hint["hash"])
+            else:
+                key = f"{rel_path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+        if key in listings:
+            entries = [BsaEntry(path, size, compressed) for path, size, compressed in listings[key]]
+        else:
+            try:
+                entries = read_bsa_listing(archive)
+            except (OSError, ValueError) as exc:
+                if errors is None:
+                    raise
+                errors[rel_path] = str(exc)
+                continue
+            listings[key] = [[entry.path, entry.size, entry.compressed] for entry in entries]
+
+        by_path[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "key": key}
+        result[rel_path] = entries
+
+    # Записи удаленных архивов чистятся, чтобы кэш не рос бесконечно.
+    live_keys = {entry["key"] for path, entry in by_path.items() if (root_path / path).exists()}
+    by_path = {path: entry for path, entry in by_path.items() if entry["key"] in live_keys}
+    listings = {key: value for key, value in listings.items() if key in live_keys}
+
+    if by_path != cached_stats or listings != cached_listings:
+        write_json(
+            cache_path,
+            {"meta": {"schema": "modbs.bsa_cache.v0"}, "by_path": by_path, "listings": listings},
+        )
+    return result
@@ -0,0 +1,269 @@
+"""Классификация измененных файлов по классам влияния (impact model).
+
+Класс определяется расширением, первыми байтами файла (сигнатуры
+TES4/DDS/NIF/PE/HKX/BSA) и положением пути в Data. Сигнатура читается
+параллельно и кэшируется по digest в state/classify.cache.json, поэтому
+повторная классификация тех же файлов не читает диск. Итог пишется в
+state/impact.json: классы, файлы и ключи инвалидации для планировщика.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from .state import pending_changes
+from .storage import read_json, write_json
+
+IMPACT_PATH = Path("state") / "impact.json"
+CLASSIFY_CACHE_PATH = Path("state") / "classify.cache.json"
+
+IMPACT_CLASSES = (
+    "plugin",
+    "skse_dll",
+    "root",
+    "mesh",
+    "texture",
+    "animation",
+    "generator",
+    "archive",
+    "profile",
+    "other",
+)
+
+# Ключи инвалидации по классам (контракт влияния). Маркеры генераторов
+# получают ключ своего инструмента из _GENERATOR_MARKERS.
+CLASS_INVALIDATES: Dict[str, Tuple[str, ...]] = {
+    "plugin": ("LoadOrder", "XEditOutput", "DynDOLODOutput", "DeployOutput"),
+    "skse_dll": ("DeployOutput",),
+    "root": ("RootState",),
+    "mesh": ("DynDOLODOutput", "DeployOutput"),
+    "texture": ("DynDOLODOutput", "DeployOutput"),
+    "animation": ("NemesisOutput", "DeployOutput"),
+    "generator": ("DeployOutput",),
+    "archive": ("DynDOLODOutput", "NemesisOutput", "DeployOutput"),
+    "profile": ("LoadOrder", "DeployOutput"),
+    "other": ("DeployOutput",),
+}
+
+_HEAD_SIZE = 32
+
+_DEFAULT_IO_WORKERS = 8
+
+# Сигнатуры начала файла → вид содержимого.
+_MAGIC = (
+    (b"TES4", "plugin"),
+    (b"DDS ", "dds"),
+    (b"Gamebryo File Format", "nif"),
+    (b"NetImmerse File Format", "nif"),
+    (b"MZ", "pe"),
+    (b"\x57\xe0\xe0\x57\x10\xc0\xc0\x10", "hkx"),
+    (b"BSA\x00", "bsa"),
+    (b"BTDX", "bsa"),
+)
+
+_EXTENSION_KINDS = {
+    ".esp": "plugin",
+    ".esm": "plugin",
+    ".esl": "plugin",
+    ".dds": "dds",
+    ".png": "image",
+    ".tga": "image",
+    ".nif": "nif",
+    ".tri": "nif",
+    ".btr": "nif",
+    ".bto": "nif",
+    ".dll": "pe",
+    ".exe": "pe",
+    ".asi": "pe",
+    ".hkx": "hkx",
+    ".bsa": "bsa",
+    ".ba2": "bsa",
+}
+
+_KIND_CLASSES = {
+    "plugin": "plugin",
+    "pe": "skse_dll",
+    "nif": "mesh",
+    "dds": "texture",
+    "image": "texture",
+    "hkx": "animation",
+    "bsa": "archive",
+}
+
+# ENB/ReShade и загрузчики: файлы корня игры, даже если лежат не в root/.
+_ROOT_FILE_NAMES = {
+    "enbseries.ini",
+    "enblocal.ini",
+    "d3d11.dll",
+    "d3dcompiler_46e.dll",
+    "dxgi.dll",
+    "dinput8.dll",
+    "reshade.ini",
+    "skse64_loader.exe",
+}
+_ROOT_DIRS = ("root/", "enbseries/", "reshade-shaders/")
+
+_ANIMATION_PREFIXES = ("meshes/actors/character/animations/", "nemesis_engine/")
+_ANIMATION_PATTERNS = ("fnis_*_list.txt", "*_tdm_list.txt")
+
+_GENERATOR_MARKERS = (
+    ("dyndolod/", "DynDOLODOutput"),
+    ("lodsettings/", "DynDOLODOutput"),
+    ("calientetools/bodyslide/", "BodySlideOutput"),
+)
+
+
+def sniff_kind(head: bytes) -> str | None:
+    """Вид содержимого по первым байтам файла или None."""
+
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _data_path(rel_path: str) -> Tuple[str, str] | None:
+    """Разбирает путь workspace: (зона, путь внутри мода/профиля) или None."""
+
+    parts = PurePosixPath(rel_path).parts
+    if len(parts) >= 4 and parts[:2] == ("workspace", "mods"):
+        return "mods", "/".join(parts[3:]).lower()
+    if len(parts) >= 3 and parts[:2] == ("workspace", "profiles"):
+        return "profiles", "/".join(parts[3:]).lower()
+    return None
+
+
+def classify_path(rel_path: str, kind: str | None) -> Tuple[str, List[str]]:
+    """Класс влияния и ключи инвалидации для пути и вида содержимого."""
+
+    location = _data_path(rel_path)
+    if location is None:
+        return "other", list(CLASS_INVALIDATES["other"])
+    zone, data_path = location
+    if zone == "profiles":
+        return "profile", list(CLASS_INVALIDATES["profile"])
+
+    name = data_path.rsplit("/", 1)[-1]
+    if data_path.startswith(_ROOT_DIRS) or name in _ROOT_FILE_NAMES:
+        impact = "root"
+    elif data_path.startswith(_ANIMATION_PREFIXES) or kind == "hkx" or any(
+        fnmatch.fnmatch(name, pattern) for pattern in _ANIMATION_PATTERNS
+    ):
+        impact = "animation"
+    else:
+        for prefix, key in _GENERATOR_MARKERS:
+            if data_path.startswith(prefix):
+                return "generator", [key, *CLASS_INVALIDATES["generator"]]
+        impact = _KIND_CLASSES.get(kind or "", "other")
+    return impact, list(CLASS_INVALIDATES[impact])
+
+
+def _read_head(path: Path) -> bytes:
+    """Читает первые байты файла (пусто, если файл исчез)."""
+
+    try:
+        with open(path, "rb") as handle:
+            return handle.read(_HEAD_SIZE)
+    except OSError:
+        return b""
+
+
+def _load_cache(root_path: Path) -> Dict[str, Any]:
+    """Читает кэш сигнатур по digest."""
+
+    cache_path = root_path / CLASSIFY_CACHE_PATH
+    if cache_path.exists():
+        return read_json(cache_path)
+    return {"meta": {"schema": "modbs.classify_cache.v0"}, "kinds": {}}
+
+
+def classify_files(
+    root_path: Path,
+    items: Iterable[Mapping[str, Any]],
+    removed: Iterable[str] = (),
+    max_workers: int = _DEFAULT_IO_WORKERS,
+) -> Dict[str, Any]:
+    """Классифицирует файлы {path, hash} и удаленные пути.
+
+    Сигнатура читается только у файлов без digest в кэше; у удаленных
+    вид определяется по расширению.
+    """
+
+    cache = _load_cache(root_path)
+    kinds: Dict[str, str | None] = cache["kinds"]
+    items = [item for item in items if _data_path(str(item["path"])) is not None]
+
+    to_read = [item for item in items if not item.get("hash") or item["hash"] not in kinds]
+    if to_read:
+        workers = max(1, min(max_workers, len(to_read)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            heads = list(pool.map(lambda item: _read_head(root_path / str(item["path"])), to_read))
+        sniffed = {str(item["path"]): sniff_kind(head) for item, head in zip(to_read, heads)}
+        hashed = [item for item in to_read if item.get("hash")]
+        for item in hashed:
+            kinds[str(item["hash"])] = sniffed[str(item["path"])]
+        if hashed:
+            write_json(root_path / CLASSIFY_CACHE_PATH, cache)
+    else:
+        sniffed = {}
+
+    files: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        path = str(item["path"])
+        by_extension = _EXTENSION_KINDS.get(PurePosixPath(path).suffix.lower())
+        by_magic = sniffed[path] if path in sniffed else kinds.get(str(item.get("hash")))
+        entry: Dict[str, Any] = {}
+        # Содержимое важнее расширения; расхождение отмечается в отчете.
+        if by_magic and by_extension and by_magic != by_extension:
+            entry["mismatch"] = {"extension": by_extension, "content": by_magic}
+        entry["class"], entry["invalidates"] = classify_path(path, by_magic or by_extension)
+        files[path] = entry
+    for path in removed:
+        if _data_path(path) is None:
+            continue
+        impact, keys = classify_path(path, _EXTENSION_KINDS.get(PurePosixPath(path).suffix.lower()))
+        files[path] = {"class": impact, "invalidates": keys, "removed": True}
+
+    classes: Dict[str, List[str]] = {}
+    invalidates: set[str] = set()
+    for path in sorted(files):
+        classes.setdefault(files[path]["class"], []).append(path)
+        invalidates.update(files[path]["invalidates"])
+
+    return {
+        "meta": {"schema": "modbs.impact.v0"},
+        "classes": classes,
+        "invalidates": sorted(invalidates),
+        "files": files,
+    }
+
+
+def classify_changes(
+    root_path: Path,
+    paths: Iterable[str] | None = None,
+    max_workers: int = _DEFAULT_IO_WORKERS,
+) -> Dict[str, Any]:
+    """Классифицирует изменения с последнего Checkpoint и пишет state/impact.json.
+
+    С paths классифицируются только перечисленные пути (без digest-кэша:
+    хэш для них не известен).
+    """
+
+    if paths is None:
+        delta = pending_changes(root_path)
+        items = [*delta["added"], *delta["changed"]]
+        removed: List[str] = list(delta["removed"])
+    else:
+        items, removed = [], []
+        for path in map(str, paths):
+            if (root_path / path).is_file():
+                items.append({"path": path})
+            else:
+                removed.append(path)
+
+    impact = classify_files(root_path, items, removed, max_workers)
+    write_json(root_path / IMPACT_PATH, impact)
+    return impact
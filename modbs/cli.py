@@ -5,6 +5,7 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Iterable, Mapping
@@ -12,15 +13,41 @@ from typing import Any, Dict, Iterable, Mapping
 from modbs import generate_plan
 from modbs.adapters.loot import run as run_loot
 from modbs.apply import apply_plan
-from modbs.executor import ExecutionResult, StepBlockedError
+from modbs.classify import classify_changes
+from modbs.conflicts import build_conflict_index
+from modbs.estimate import LazyInputScale, estimate_plan, format_estimates, measure_input_scale, step_input_size
+from modbs.executor import ALLOWED_STEP_TYPES, ExecutionResult, StepBlockedError
 from modbs import journal
 from modbs.journal import append_event
+from modbs.ledger import DEFAULT_MIN_FREE_BYTES, DiskLedger
+from modbs.locking import apply_lock
 from modbs.models import PlanIR, StepIR
+from modbs.planner import CHECKPOINT_PLAN_PATH, STEP_CONSUMES, plan_fingerprint
+from modbs.plugins import check_masters
+from modbs.profiling import PROFILES_DIR, wrap_profiled_handler
+from modbs.remote import DEFAULT_REMOTE_STEP_TYPES, HEARTBEAT_TIMEOUT, Coordinator, WorkerServer, parse_address
+from modbs.remote_cache import CacheServer
 from modbs.report import generate_report
-from modbs.state import write_state_artifacts
-from modbs.storage import load_plan_ir, plan_ir_to_dict, read_json, write_json
+from modbs.state import LOCKFILE_FORMAT_JSON, LOCKFILE_FORMATS, verify_lockfile, write_checkpoint_delta
+from modbs.stats import STATS_MARKDOWN_PATH, update_stats, write_stats
+from modbs.status import format_status, read_status
+from modbs.storage import (
+    DURABILITY_FULL,
+    DURABILITY_LEVELS,
+    load_plan_ir,
+    plan_ir_to_dict,
+    read_json,
+    write_json,
+)
+from modbs.steps.artifact_classify import artifact_classify
+from modbs.steps.deploy_profile import deploy_profile
+from modbs.steps.install import extract, install_to_manager
+from modbs.steps.root_state import root_apply, root_rollback, root_snapshot, root_verify
+from modbs.steps.verify_download import verify_download
 from modbs.steps.workspace_init import workspace_init
 from modbs.steps.write_mo2_profile import write_mo2_profile
+from modbs.steps.xedit_qac import run_xedit_qac
+from modbs.trace import span, start_trace, stop_trace
 
 
 def _read_config(path: Path) -> Dict[str, Any]:
@@ -64,33 +91,204 @@ def _resolve_loot_mode(config: Mapping[str, Any]) -> str:
     raise ValueError("В конфиге не задан loot.mode")
 
 
+def _loot_option(config: Mapping[str, Any], key: str) -> Any:
+    """Возвращает необязательный параметр секции loot (rules, fallback)."""
+
+    loot = config.get("loot", {})
+    return loot.get(key) if isinstance(loot, Mapping) else None
+
+
+def _resolve_scheduler(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """Параметры повторов заблокированных шагов (секция scheduler)."""
+
+    scheduler = config.get("scheduler", {})
+    if not isinstance(scheduler, Mapping):
+        scheduler = {}
+    return {
+        "max_wait_seconds": float(scheduler.get("max_wait_seconds", 0)),
+        "retry_budgets": dict(scheduler.get("retry_budgets", {})),
+        "default_retry_budget": int(scheduler.get("default_retry_budget", 1)),
+    }
+
+
+def _resolve_workers(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """Параметры удаленных worker (секция workers)."""
+
+    workers = config.get("workers", {})
+    if not isinstance(workers, Mapping):
+        workers = {}
+    step_types = list(workers.get("step_types", DEFAULT_REMOTE_STEP_TYPES))
+    for step_type in step_types:
+        if step_type not in ALLOWED_STEP_TYPES:
+            raise ValueError(f"Некорректный тип шага в workers.step_types: {step_type}")
+    return {
+        "addresses": [str(address) for address in workers.get("addresses", [])],
+        "step_types": step_types,
+        "max_parallel": workers.get("max_parallel"),
+        "heartbeat_timeout": float(workers.get("heartbeat_timeout", HEARTBEAT_TIMEOUT)),
+        "step_timeout": float(workers["step_timeout"]) if workers.get("step_timeout") else None,
+    }
+
+
+def _remote_event_sink(logged_step_ids: set[str], run_id: str, input_scale: Mapping[str, int] | None = None):
+    """Пишет в журнал события шагов, пришедшие от worker."""
+
+    def _sink(step: StepIR, event: Dict[str, Any]) -> None:
+        metrics = event.get("metrics")
+        if event.get("type") == "result" and input_scale is not None:
+            metrics = {**(metrics or {}), "input_size": step_input_size(step, input_scale)}
+        append_event(
+            str(event.get("ts") or _utc_timestamp()),
+            step.step_id,
+            str(event["status"]),
+            str(event.get("message", "")),
+            metrics,
+            run_id=run_id,
+            step_type=step.step_type,
+        )
+        if event.get("type") == "result":
+            logged_step_ids.add(step.step_id)
+
+    return _sink
+
+
+def _resolve_remote_cache(config: Mapping[str, Any]) -> Dict[str, Any] | None:
+    """Параметры удаленного кэша действий (cache.remote_url)."""
+
+    cache = config.get("cache", {})
+    if not isinstance(cache, Mapping) or not cache.get("remote_url"):
+        return None
+    return {
+        "url": str(cache["remote_url"]),
+        "timeout": float(cache.get("timeout", 30.0)),
+        "max_transfers": int(cache.get("max_transfers", 8)),
+    }
+
+
+def _resolve_xedit(config: Mapping[str, Any]) -> Dict[str, Any] | None:
+    """Параметры xEdit для RunXEditQAC (секция xedit)."""
+
+    xedit = config.get("xedit", {})
+    if not isinstance(xedit, Mapping) or not xedit.get("path"):
+        return None
+    return {
+        "path": str(xedit["path"]),
+        "args": [str(arg) for arg in xedit.get("args", [])],
+        "version": xedit.get("version"),
+        "max_workers": xedit.get("max_workers"),
+        "timeout": float(xedit.get("timeout", 600.0)),
+    }
+
+
+def _resolve_durability(config: Mapping[str, Any]) -> str:
+    """Определяет уровень durability записи state из конфига."""
+
+    state = config.get("state", {})
+    durability = state.get("durability") if isinstance(state, Mapping) else None
+    if not durability:
+        return DURABILITY_FULL
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Некорректный state.durability: {durability}")
+    return str(durability)
+
+
+def _resolve_lockfile_format(config: Mapping[str, Any]) -> str:
+    """Определяет формат базы lockfile (state.lockfile_format) из конфига."""
+
+    state = config.get("state", {})
+    lockfile_format = state.get("lockfile_format") if isinstance(state, Mapping) else None
+    if not lockfile_format:
+        return LOCKFILE_FORMAT_JSON
+    if lockfile_format not in LOCKFILE_FORMATS:
+        raise ValueError(f"Некорректный state.lockfile_format: {lockfile_format}")
+    return str(lockfile_format)
+
+
+def _resolve_incremental(config: Mapping[str, Any]) -> bool:
+    """Включен ли инкрементальный план (plan.incremental) в конфиге."""
+
+    plan = config.get("plan", {})
+    return bool(plan.get("incremental")) if isinstance(plan, Mapping) else False
+
+
+def _resolve_min_free_bytes(config: Mapping[str, Any]) -> int:
+    """Определяет порог disk pressure (ledger.min_free_bytes) из конфига."""
+
+    ledger = config.get("ledger", {})
+    value = ledger.get("min_free_bytes") if isinstance(ledger, Mapping) else None
+    if value is None:
+        return DEFAULT_MIN_FREE_BYTES
+    return int(value)
+
+
 def _utc_timestamp() -> str:
     """Возвращает ISO-строку с текущим временем UTC."""
 
     return datetime.now(timezone.utc).isoformat()
 
 
+def _new_run_id() -> str:
+    """Возвращает идентификатор запуска apply (UTC-время с микросекундами)."""
+
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
 def _wrap_journaled_handler(
     handler,
     logged_step_ids: set[str],
+    ledger: DiskLedger | None = None,
 ):
-    """Декоратор для записи статусов шага в журнал."""
+    """Декоратор для записи статусов шага в журнал.
+
+    Если передан ledger, в metrics событий попадают прогноз диска
+    (Running) и Δдиск по зонам (финальный статус). Финальное событие
+    всегда содержит duration_ms для modbs stats и, если в ctx есть
+    input_scale, размер входа шага для plan --estimate.
+    """
 
     def _wrapper(step: StepIR, ctx: Dict[str, Any]) -> None:
-        append_event(_utc_timestamp(), step.step_id, "Running", "Старт шага", None)
+        run_id = ctx.get("run_id")
+        start_metrics = ledger.begin_step(step.step_id) if ledger else None
+        append_event(
+            _utc_timestamp(),
+            step.step_id,
+            "Running",
+            "Старт шага",
+            start_metrics,
+            run_id=run_id,
+            step_type=step.step_type,
+        )
+        started = time.perf_counter()
+
+        def _finish(status: str, message: str, extra: Dict[str, Any] | None = None) -> None:
+            metrics = dict(ledger.end_step(step.step_id)) if ledger else {}
+            metrics.update(extra or {})
+            metrics["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            if ctx.get("input_scale") is not None:
+                metrics["input_size"] = step_input_size(step, ctx["input_scale"])
+            append_event(
+                _utc_timestamp(),
+                step.step_id,
+                status,
+                message,
+                metrics,
+                run_id=run_id,
+                step_type=step.step_type,
+            )
+            logged_step_ids.add(step.step_id)
+
         try:
-            handler(step, ctx)
+            with span(step.step_id, "step", step_type=step.step_type):
+                handler(step, ctx)
         except StepBlockedError as exc:
-            append_event(_utc_timestamp(), step.step_id, "Blocked", str(exc), None)
-            logged_step_ids.add(step.step_id)
+            blocked = {"next_action_at": exc.next_action_at, "source": exc.source}
+            _finish("Blocked", str(exc), {key: value for key, value in blocked.items() if value})
             raise
         except Exception as exc:  # noqa: BLE001
-            append_event(_utc_timestamp(), step.step_id, "Failed", str(exc), None)
-            logged_step_ids.add(step.step_id)
+            _finish("Failed", str(exc))
             raise
         else:
-            append_event(_utc_timestamp(), step.step_id, "Succeeded", "Шаг выполнен", None)
-            logged_step_ids.add(step.step_id)
+            _finish("Succeeded", "Шаг выполнен")
 
     return _wrapper
 
@@ -107,6 +305,18 @@ def _handle_write_profile(step: StepIR, ctx: Dict[str, Any]) -> None:
     write_mo2_profile(step, ctx)
 
 
+def _resolve_game_data_dir(ctx: Mapping[str, Any]) -> Path | None:
+    """Возвращает Data/ игры (paths.stock_game или paths.skyrim), если задан."""
+
+    paths = ctx.get("paths", {})
+    if not isinstance(paths, Mapping):
+        return None
+    for key in ("stock_game", "skyrim"):
+        if paths.get(key):
+            return Path(paths[key]) / "Data"
+    return None
+
+
 def _handle_run_loot(step: StepIR, ctx: Dict[str, Any]) -> None:
     """Handler для шага RunLOOT."""
 
@@ -114,42 +324,163 @@ def _handle_run_loot(step: StepIR, ctx: Dict[str, Any]) -> None:
     if not mode:
         raise ValueError("Не задан режим LOOT для RunLOOT")
 
+    # MissingMaster выявляется до запуска LOOT: чтение заголовков дешевле процесса.
+    check_masters(Path(ctx["root_path"]), _resolve_game_data_dir(ctx), ctx.get("profile_name"))
+
     result = run_loot(str(mode), ctx)
     if result.status == "Blocked":
-        raise StepBlockedError(result.message)
+        raise StepBlockedError(result.message, source="loot")
+
+
+def _handle_root_snapshot(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага RootSnapshot."""
+
+    root_snapshot(step, ctx)
+
+
+def _handle_root_apply(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага RootApply."""
+
+    root_apply(step, ctx)
+
+
+def _handle_root_rollback(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага RootRollback."""
+
+    root_rollback(step, ctx)
+
+
+def _handle_root_verify(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага RootVerify."""
+
+    root_verify(step, ctx)
+
+
+def _handle_extract(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага Extract."""
+
+    extract(step, ctx)
+
+
+def _handle_install_to_manager(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага InstallToManager."""
+
+    install_to_manager(step, ctx)
+
+
+def _handle_verify_download(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага VerifyDownload."""
+
+    verify_download(step, ctx)
+
+
+def _handle_run_xedit_qac(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага RunXEditQAC."""
+
+    run_xedit_qac(step, ctx)
+
+
+def _handle_artifact_classify(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага ArtifactClassify."""
+
+    artifact_classify(step, ctx)
 
 
 def _handle_checkpoint(step: StepIR, ctx: Dict[str, Any]) -> None:
-    """Handler для шага Checkpoint: фиксируем текущие артефакты состояния."""
+    """Handler для шага Checkpoint: дописываем delta к артефактам состояния."""
 
     root_path = Path(ctx["root_path"])
-    write_state_artifacts(root_path)
+    if ctx.get("plan_fingerprint"):
+        # Фиксируется до снимка, чтобы следующий Checkpoint не видел его изменением.
+        write_json(
+            root_path / CHECKPOINT_PLAN_PATH,
+            {"fingerprint": ctx["plan_fingerprint"]},
+            ctx.get("durability", DURABILITY_FULL),
+        )
+    write_checkpoint_delta(
+        root_path,
+        durability=ctx.get("durability", DURABILITY_FULL),
+        lockfile_format=ctx.get("lockfile_format", LOCKFILE_FORMAT_JSON),
+    )
+
+
+def _handle_deploy_profile(step: StepIR, ctx: Dict[str, Any]) -> None:
+    """Handler для шага DeployProfile."""
+
+    deploy_profile(step, ctx)
 
 
 def _handle_report(step: StepIR, ctx: Dict[str, Any]) -> None:
     """Handler для шага Report."""
 
     root_path = Path(ctx["root_path"])
+    profile_name = ctx.get("profile_name")
+    if profile_name:
+        # Индекс обновляется инкрементально: пересканируются только измененные моды.
+        build_conflict_index(root_path, str(profile_name))
     generate_report(root_path)
 
 
-def _build_handlers(logged_step_ids: set[str]) -> Dict[str, Any]:
-    """Собирает allowlist обработчиков шагов с журналированием."""
+def _step_handlers() -> Dict[str, Any]:
+    """Allowlist обработчиков шагов без журналирования (для worker)."""
 
-    handlers = {
+    return {
         "WorkspaceInit": _handle_workspace_init,
         "WriteMO2Profile": _handle_write_profile,
         "RunLOOT": _handle_run_loot,
         "Checkpoint": _handle_checkpoint,
         "Report": _handle_report,
+        "RootSnapshot": _handle_root_snapshot,
+        "RootApply": _handle_root_apply,
+        "RootRollback": _handle_root_rollback,
+        "RootVerify": _handle_root_verify,
+        "Extract": _handle_extract,
+        "InstallToManager": _handle_install_to_manager,
+        "VerifyDownload": _handle_verify_download,
+        "DeployProfile": _handle_deploy_profile,
+        "RunXEditQAC": _handle_run_xedit_qac,
+        "ArtifactClassify": _handle_artifact_classify,
     }
 
+
+def _build_handlers(
+    logged_step_ids: set[str],
+    ledger: DiskLedger | None = None,
+    profile_dir: Path | None = None,
+) -> Dict[str, Any]:
+    """Собирает allowlist обработчиков шагов с журналированием.
+
+    С profile_dir каждый handler дополнительно выполняется под cProfile.
+    """
+
+    handlers = _step_handlers()
+    if profile_dir is not None:
+        handlers = {
+            step_type: wrap_profiled_handler(handler, profile_dir)
+            for step_type, handler in handlers.items()
+        }
+
     return {
-        step_type: _wrap_journaled_handler(handler, logged_step_ids)
+        step_type: _wrap_journaled_handler(handler, logged_step_ids, ledger)
         for step_type, handler in handlers.items()
     }
 
 
+def _config_from_plan(plan: PlanIR, root_path: Path) -> Dict[str, Any]:
+    """Восстанавливает конфиг по meta плана: config_ref или встроенная копия."""
+
+    meta = plan.meta if isinstance(plan.meta, Mapping) else {}
+    config_ref = meta.get("config_ref")
+    if config_ref:
+        config = _read_config(Path(config_ref))
+        if plan_fingerprint(config, root_path) != meta.get("fingerprint"):
+            raise ValueError("План устарел: конфиг или манифест изменились, выполните plan")
+        return config
+
+    meta_config = meta.get("config")
+    return dict(meta_config) if isinstance(meta_config, Mapping) else {}
+
+
 def _load_plan(root_path: Path) -> PlanIR:
     """Загружает план из state/plan.ir.json."""
 
@@ -167,20 +498,93 @@ def cmd_init(root_path: Path) -> None:
     workspace_init(step, ctx)
 
 
-def cmd_plan(config_path: Path) -> Path:
-    """Генерирует Plan IR и сохраняет его в state/plan.ir.json."""
+def cmd_plan(config_path: Path, estimate: bool = False) -> Path:
+    """Генерирует Plan IR и сохраняет его в state/plan.ir.json.
+
+    Если отпечаток конфига и файлов-ссылок не изменился, план не
+    переписывается (mtime сохраняется для downstream-кэшей).
+    estimate=True добавляет в meta["estimates"] прогноз длительности,
+    записанных байт и Δдиска шагов по истории журнала и критический путь;
+    прогноз пересчитывается и для неизменившегося плана, а план без
+    estimate сбрасывает прогноз прошлого plan --estimate.
+
+    С plan.incremental изменения с последнего Checkpoint классифицируются
+    (state/impact.json), и в план попадают только шаги, зависящие от
+    затронутых ключей инвалидации; такой план строится заново каждый раз.
+    Если отпечаток конфига и файлов-ссылок отличается от зафиксированного
+    последним Checkpoint, инвалидируются все ключи.
+    """
 
     config = _read_config(config_path)
     root_path = _resolve_root_path(config)
-
-    plan = generate_plan(config)
     plan_path = root_path / "state" / "plan.ir.json"
+    incremental = _resolve_incremental(config)
+
+    fingerprint = plan_fingerprint(config, root_path)
+    config_ref = str(config_path.resolve())
+    plan: PlanIR | None = None
+    if plan_path.exists() and not incremental:
+        meta = read_json(plan_path).get("meta", {})
+        if meta.get("fingerprint") == fingerprint and meta.get("config_ref") == config_ref:
+            if not estimate and "estimates" not in meta:
+                return plan_path
+            plan = _load_plan(root_path)
+            plan.meta.pop("estimates", None)
+
+    if plan is None:
+        invalidates = None
+        if incremental:
+            invalidates = set(classify_changes(root_path)["invalidates"])
+            checkpoint_path = root_path / CHECKPOINT_PLAN_PATH
+            applied = read_json(checkpoint_path).get("fingerprint") if checkpoint_path.exists() else None
+            if applied != fingerprint:
+                # Изменения конфига, правил LOOT или манифеста не видны в файлах workspace.
+                invalidates.update(key for keys in STEP_CONSUMES.values() for key in keys)
+        plan = generate_plan(config, fingerprint=fingerprint, config_ref=config_ref, invalidates=invalidates)
+    if estimate:
+        history = update_stats(root_path).get("step_types", {})
+        scale = measure_input_scale(root_path, config.get("manifest_path"))
+        plan.meta["estimates"] = estimate_plan(plan, history, scale)
     write_json(plan_path, plan_ir_to_dict(plan))
     return plan_path
 
 
-def cmd_apply(root_path: Path | None, config_path: Path | None) -> ExecutionResult:
-    """Выполняет план и фиксирует артефакты состояния."""
+def cmd_apply(
+    root_path: Path | None,
+    config_path: Path | None,
+    trace_path: Path | None = None,
+    profile: bool = False,
+    resume: bool = False,
+    wait: bool = False,
+) -> ExecutionResult:
+    """Выполняет план и фиксирует артефакты состояния.
+
+    trace_path включает запись Chrome trace (шаги, журнал, атомарные
+    записи, обход снимка, хэширование). profile=True сохраняет cProfile
+    каждого шага в state/profiles/<run_id>/<step_id>.pstats. resume=True
+    пропускает шаги, выполненные до прошлой блокировки (state/resume.json).
+    wait=True ждет завершения другого apply на том же корне вместо ошибки.
+    """
+
+    if trace_path is None:
+        return _apply(root_path, config_path, profile, resume, wait)
+
+    start_trace()
+    try:
+        with span("apply", "run"):
+            return _apply(root_path, config_path, profile, resume, wait)
+    finally:
+        stop_trace(trace_path)
+
+
+def _apply(
+    root_path: Path | None,
+    config_path: Path | None,
+    profile: bool,
+    resume: bool,
+    wait: bool = False,
+) -> ExecutionResult:
+    """Загружает план и конфиг и выполняет шаги под блокировкой apply."""
 
     config: Dict[str, Any] = {}
     if config_path:
@@ -195,40 +599,88 @@ def cmd_apply(root_path: Path | None, config_path: Path | None) -> ExecutionResu
     plan = _load_plan(root_path)
 
     if not config:
-        meta_config = plan.meta.get("config") if isinstance(plan.meta, Mapping) else None
-        if isinstance(meta_config, Mapping):
-            config = dict(meta_config)
+        config = _config_from_plan(plan, root_path)
 
     profile_name = _resolve_profile_name(config)
     loot_mode = _resolve_loot_mode(config)
-
-    journal.JOURNAL_PATH = root_path / "state" / "job.journal.jsonl"
-
-    logged_step_ids: set[str] = set()
-    handlers = _build_handlers(logged_step_ids)
-
-    ctx = {
-        "root_path": root_path,
-        "profile_name": profile_name,
-        "loot_mode": loot_mode,
-        "handlers": handlers,
-        "paths": config.get("paths", {}),
-    }
-
-    result = apply_plan(plan, ctx)
-
-    if result.status in {"Blocked", "Failed"}:
-        step_id = result.blocked_step_id or result.failed_step_id
-        if step_id and step_id not in logged_step_ids:
-            append_event(
-                _utc_timestamp(),
-                step_id,
-                result.status,
-                result.message or "Шаг завершен с ошибкой",
-                None,
+    durability = _resolve_durability(config)
+
+    # Второй apply на том же корне переписал бы журнал и lockfile поверх первого.
+    with apply_lock(root_path, wait=wait):
+        journal.JOURNAL_PATH = root_path / "state" / "job.journal.jsonl"
+        journal.DURABILITY = durability
+
+        ledger = DiskLedger(
+            root_path,
+            planned_steps=len(plan.steps),
+            min_free_bytes=_resolve_min_free_bytes(config),
+        )
+
+        run_id = _new_run_id()
+        profile_dir = root_path / PROFILES_DIR / run_id if profile else None
+
+        logged_step_ids: set[str] = set()
+        handlers = _build_handlers(logged_step_ids, ledger, profile_dir)
+
+        ctx = {
+            "root_path": root_path,
+            "run_id": run_id,
+            "profile_name": profile_name,
+            "loot_mode": loot_mode,
+            "loot_rules": _loot_option(config, "rules"),
+            "loot_fallback": _loot_option(config, "fallback"),
+            "handlers": handlers,
+            "paths": config.get("paths", {}),
+            "durability": durability,
+            "lockfile_format": _resolve_lockfile_format(config),
+            "manifest_path": config.get("manifest_path"),
+            "remote_cache": _resolve_remote_cache(config),
+            "xedit": _resolve_xedit(config),
+            "input_scale": LazyInputScale(
+                root_path,
+                config.get("manifest_path"),
+                count_files=lambda: ledger.file_count("workspace"),
+            ),
+            "plan_fingerprint": plan.meta.get("fingerprint") if isinstance(plan.meta, Mapping) else None,
+            "resume": resume,
+            **_resolve_scheduler(config),
+        }
+
+        workers = _resolve_workers(config)
+        coordinator = None
+        if workers["addresses"]:
+            # Выбранные типы шагов уходят на worker и выполняются параллельно.
+            coordinator = Coordinator(
+                workers["addresses"],
+                on_event=_remote_event_sink(logged_step_ids, run_id, ctx["input_scale"]),
+                heartbeat_timeout=workers["heartbeat_timeout"],
+                step_timeout=workers["step_timeout"],
             )
+            alive = coordinator.connect()
+            for step_type in workers["step_types"]:
+                handlers[step_type] = coordinator.run_step
+            ctx["concurrent_step_types"] = workers["step_types"]
+            ctx["max_parallel"] = int(workers["max_parallel"] or alive)
 
-    return result
+        try:
+            result = apply_plan(plan, ctx)
+        finally:
+            if coordinator is not None:
+                coordinator.close()
+
+        if result.status in {"Blocked", "Failed"}:
+            step_id = result.blocked_step_id or result.failed_step_id
+            if step_id and step_id not in logged_step_ids:
+                append_event(
+                    _utc_timestamp(),
+                    step_id,
+                    result.status,
+                    result.message or "Шаг завершен с ошибкой",
+                    None,
+                    run_id=run_id,
+                )
+
+        return result
 
 
 def cmd_report(root_path: Path) -> Path:
@@ -241,6 +693,58 @@ def cmd_report(root_path: Path) -> Path:
     return report_path
 
 
+def cmd_verify(root_path: Path, paths: Iterable[str] | None = None) -> None:
+    """Сверяет outputs с lockfile; расхождения — RuntimeError."""
+
+    drift = verify_lockfile(root_path, list(paths) if paths else None)
+    parts = []
+    for label in ("added", "changed", "removed"):
+        if drift[label]:
+            preview = ", ".join(drift[label][:5])
+            suffix = "…" if len(drift[label]) > 5 else ""
+            parts.append(f"{label}: {preview}{suffix}")
+    if parts:
+        raise RuntimeError(f"Outputs расходятся с lockfile ({'; '.join(parts)})")
+
+
+def cmd_status(root_path: Path, as_json: bool = False) -> str:
+    """Возвращает состояние текущего или последнего запуска."""
+
+    status = read_status(root_path)
+    if as_json:
+        return json.dumps(status, ensure_ascii=False, indent=2) + "\n"
+    return format_status(status)
+
+
+def cmd_stats(root_path: Path) -> Path:
+    """Обновляет межзапусковую статистику и возвращает путь к stats.md."""
+
+    write_stats(root_path)
+    return root_path / STATS_MARKDOWN_PATH
+
+
+def cmd_worker(root_path: Path, listen: str) -> None:
+    """Запускает worker, выполняющий шаги coordinator над root_path."""
+
+    server = WorkerServer(root_path, _step_handlers(), parse_address(listen))
+    print(f"modbs worker {server.worker_id} слушает {server.address}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def cmd_cache_server(storage_dir: Path, listen: str) -> None:
+    """Запускает эталонный сервер удаленного кэша над storage_dir."""
+
+    server = CacheServer(storage_dir, parse_address(listen))
+    print(f"modbs cache-server слушает {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
 def _build_parser() -> argparse.ArgumentParser:
     """Создает argparse-парсер для CLI."""
 
@@ -252,14 +756,58 @@ def _build_parser() -> argparse.ArgumentParser:
 
     plan_parser = subparsers.add_parser("plan", help="Сгенерировать Plan IR")
     plan_parser.add_argument("--config", required=True, type=Path, help="Путь к JSON-конфигу")
+    plan_parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Оценить длительность и диск шагов по истории журнала",
+    )
 
     apply_parser = subparsers.add_parser("apply", help="Выполнить план")
     apply_parser.add_argument("--root", type=Path, help="Корневая директория workspace")
     apply_parser.add_argument("--config", type=Path, help="Путь к JSON-конфигу")
+    apply_parser.add_argument("--trace", type=Path, help="Записать Chrome trace в файл")
+    apply_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Профилировать шаги cProfile (state/profiles/<run>/)",
+    )
+    apply_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Продолжить после Blocked, пропуская выполненные шаги",
+    )
+    apply_parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Ждать завершения другого apply на этом корне",
+    )
 
     report_parser = subparsers.add_parser("report", help="Сформировать отчет")
     report_parser.add_argument("--root", required=True, type=Path, help="Корневая директория")
 
+    verify_parser = subparsers.add_parser("verify", help="Сверить outputs с lockfile")
+    verify_parser.add_argument("--root", required=True, type=Path, help="Корневая директория")
+    verify_parser.add_argument("paths", nargs="*", help="Проверить только эти пути")
+
+    status_parser = subparsers.add_parser("status", help="Состояние текущего запуска")
+    status_parser.add_argument("--root", required=True, type=Path, help="Корневая директория")
+    status_parser.add_argument("--json", action="store_true", help="Вывести сводку в JSON")
+
+    stats_parser = subparsers.add_parser("stats", help="Статистика шагов по всем запускам")
+    stats_parser.add_argument("--root", required=True, type=Path, help="Корневая директория")
+
+    worker_parser = subparsers.add_parser("worker", help="Выполнять шаги удаленного apply")
+    worker_parser.add_argument("--root", required=True, type=Path, help="Корневая директория")
+    worker_parser.add_argument(
+        "--listen",
+        default="127.0.0.1:7421",
+        help="Адрес host:port для подключения coordinator",
+    )
+
+    cache_parser = subparsers.add_parser("cache-server", help="Эталонный сервер удаленного кэша")
+    cache_parser.add_argument("--dir", required=True, type=Path, help="Каталог хранилища кэша")
+    cache_parser.add_argument("--listen", default="127.0.0.1:7420", help="Адрес host:port")
+
     return parser
 
 
@@ -273,11 +821,24 @@ def main(argv: Iterable[str] | None = None) -> int:
         if args.command == "init":
             cmd_init(args.root)
         elif args.command == "plan":
-            cmd_plan(args.config)
+            plan_path = cmd_plan(args.config, args.estimate)
+            if args.estimate:
+                plan = load_plan_ir(str(plan_path))
+                sys.stdout.write(format_estimates(plan, plan.meta["estimates"]))
         elif args.command == "apply":
-            cmd_apply(args.root, args.config)
+            cmd_apply(args.root, args.config, args.trace, args.profile, args.resume, args.wait)
         elif args.command == "report":
             cmd_report(args.root)
+        elif args.command == "verify":
+            cmd_verify(args.root, args.paths)
+        elif args.command == "status":
+            sys.stdout.write(cmd_status(args.root, args.json))
+        elif args.command == "stats":
+            cmd_stats(args.root)
+        elif args.command == "worker":
+            cmd_worker(args.root, args.listen)
+        elif args.command == "cache-server":
+            cmd_cache_server(args.dir, args.listen)
         else:
             parser.error("Неизвестная команда")
     except (FileNotFoundError, ValueError, RuntimeError) as exc:
@@ -0,0 +1,426 @@
+"""Индекс конфликтов файлов модов по приоритету modlist.txt (модель VFS MO2)."""
+
+from __future__ import annotations
+
+import bisect
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from .bsa import BSA_EXTENSIONS, load_bsa_listings
+from .storage import read_json, write_json
+
+CONFLICTS_INDEX_PATH = Path("state") / "conflicts.index.json"
+
+# Чтение BSA пачкой: архивы → (BSA → упакованные пути, BSA → ошибка чтения).
+PackedLister = Callable[[List[Path]], Tuple[Mapping[Path, List[str]], Mapping[Path, str]]]
+
+
+def read_modlist(profile_dir: Path) -> List[str]:
+    """Читает включенные моды modlist.txt в порядке возрастания приоритета.
+
+    В modlist.txt MO2 первая строка — самый приоритетный мод, поэтому
+    список разворачивается: последний элемент выигрывает конфликты.
+    """
+
+    modlist_path = profile_dir / "modlist.txt"
+    if not modlist_path.exists():
+        return []
+
+    enabled: List[str] = []
+    for line in modlist_path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("+") and line[1:].strip():
+            enabled.append(line[1:].strip())
+    enabled.reverse()
+    return enabled
+
+
+def _list_mods(mods_dir: Path) -> List[str]:
+    """Возвращает каталоги модов, пропуская служебные .staging-*/.old-*."""
+
+    if not mods_dir.is_dir():
+        return []
+    return sorted(
+        entry.name
+        for entry in os.scandir(mods_dir)
+        if entry.is_dir() and not entry.name.startswith(".")
+    )
+
+
+def mod_priority(root_path: Path, profile_name: str | None) -> List[str]:
+    """Моды по возрастанию приоритета: modlist.txt профиля или все по алфавиту.
+
+    Последний мод списка выигрывает конфликты; моды вне списка проигрывают всем.
+    """
+
+    priority = read_modlist(root_path / "workspace" / "profiles" / profile_name) if profile_name else []
+    return priority or _list_mods(root_path / "workspace" / "mods")
+
+
+def _walk_mod(mod_dir: Path, files: List[str]) -> Dict[str, Any]:
+    """Собирает файлы мода и возвращает его отпечаток.
+
+    Отпечаток — mtime каждого каталога мода: добавление, удаление и
+    переименование файла меняют mtime родителя, а правка содержимого
+    на конфликты не влияет. Исключение — BSA в корне мода: их (size, mtime)
+    входят в отпечаток, потому что от содержимого зависит список
+    упакованных путей.
+    """
+
+    dirs: Dict[str, int] = {}
+    archives: Dict[str, List[int]] = {}
+    pending = [mod_dir]
+    while pending:
+        current = pending.pop()
+        dirs[current.relative_to(mod_dir).as_posix()] = current.stat().st_mtime_ns
+        for entry in os.scandir(current):
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(Path(entry.path))
+                continue
+            if current == mod_dir and Path(entry.name).suffix.lower() in BSA_EXTENSIONS:
+                stat = entry.stat(follow_symlinks=False)
+                archives[entry.name] = [stat.st_size, stat.st_mtime_ns]
+            if entry.is_file(follow_symlinks=False):
+                files.append(Path(entry.path).relative_to(mod_dir).as_posix())
+    return {"dirs": dirs, "archives": archives}
+
+
+def _stamp_matches(mod_dir: Path, stamp: Mapping[str, Any]) -> bool:
+    """True, если каталоги и BSA мода не менялись с прошлого обхода.
+
+    Проверяются только stat каталогов и BSA, записанных прошлым обходом,
+    без чтения содержимого каталогов: новый подкаталог или файл меняет
+    mtime уже известного родителя.
+    """
+
+    dirs = stamp.get("dirs")
+    if not isinstance(dirs, Mapping) or not dirs:
+        return False
+    try:
+        for rel_dir, mtime_ns in dirs.items():
+            if (mod_dir / rel_dir).stat().st_mtime_ns != mtime_ns:
+                return False
+        for name, (size, mtime_ns) in stamp.get("archives", {}).items():
+            stat = (mod_dir / name).stat()
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+class ConflictIndex:
+    """Хэш-таблица нормализованных путей → моды-поставщики по приоритету.
+
+    providers(path) хранит моды по возрастанию приоритета: последний —
+    победитель. Файлы из BSA (packed) всегда проигрывают свободным (loose),
+    как в MO2, а между собой упорядочены по приоритету мода. Отдельно
+    ведется множество конфликтных путей, поэтому запросы по моду стоят
+    O(файлов мода), а не O(всех файлов).
+    """
+
+    def __init__(self, priority: Sequence[str] = ()) -> None:
+        self._priority: List[str] = list(priority)
+        self._rank: Dict[str, int] = {mod: index for index, mod in enumerate(self._priority)}
+        self._mod_files: Dict[str, List[str]] = {}
+        self._mod_packed: Dict[str, List[str]] = {}
+        self._mod_stamps: Dict[str, Dict[str, Any]] = {}
+        self._mod_warnings: Dict[str, List[str]] = {}
+        # mod → нормализованный путь → (путь в написании мода, уровень: 0 packed, 1 loose).
+        self._mod_entries: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        self._providers: Dict[str, List[str]] = {}
+        self._display: Dict[str, str] = {}
+        self._conflicting: set[str] = set()
+
+    @property
+    def priority(self) -> List[str]:
+        """Порядок модов по возрастанию приоритета."""
+
+        return list(self._priority)
+
+    def _rank_key(self, key: str, mod: str) -> Tuple[int, int, str]:
+        """Ключ сортировки поставщиков: loose выше packed, моды вне modlist — ниже всех."""
+
+        return (self._mod_entries[mod][key][1], self._rank.get(mod, -1), mod)
+
+    def _insert(self, mod: str, key: str) -> None:
+        """Добавляет мод в поставщики пути с сохранением порядка приоритета."""
+
+        providers = self._providers.setdefault(key, [])
+        self._display.setdefault(key, self._mod_entries[mod][key][0])
+        keys = [self._rank_key(key, item) for item in providers]
+        providers.insert(bisect.bisect(keys, self._rank_key(key, mod)), mod)
+        if len(providers) > 1:
+            self._conflicting.add(key)
+
+    def _discard(self, mod: str, key: str) -> None:
+        """Убирает мод из поставщиков пути."""
+
+        providers = self._providers.get(key)
+        if not providers or mod not in providers:
+            return
+        providers.remove(mod)
+        if not providers:
+            del self._providers[key]
+            self._display.pop(key, None)
+        if len(providers) < 2:
+            self._conflicting.discard(key)
+
+    def set_mod(
+        self,
+        mod: str,
+        files: Iterable[str],
+        stamp: Mapping[str, Any] | None = None,
+        packed: Iterable[str] = (),
+        warnings: Iterable[str] = (),
+    ) -> None:
+        """Заменяет набор файлов одного мода (loose и из BSA), не трогая остальные.
+
+        warnings — предупреждения сканирования мода (например, нечитаемый BSA).
+        """
+
+        self.remove_mod(mod)
+        self._mod_files[mod] = sorted(files)
+        self._mod_packed[mod] = sorted(packed)
+        self._mod_stamps[mod] = dict(stamp or {})
+        if warnings:
+            self._mod_warnings[mod] = sorted(warnings)
+
+        entries: Dict[str, Tuple[str, int]] = {}
+        for rel_path in self._mod_packed[mod]:
+            entries.setdefault(rel_path.lower(), (rel_path, 0))
+        for rel_path in self._mod_files[mod]:
+            entries[rel_path.lower()] = (rel_path, 1)
+        self._mod_entries[mod] = entries
+        for key in entries:
+            self._insert(mod, key)
+
+    def remove_mod(self, mod: str) -> None:
+        """Удаляет мод из индекса."""
+
+        for key in self._mod_entries.get(mod, {}):
+            self._discard(mod, key)
+        self._mod_entries.pop(mod, None)
+        self._mod_files.pop(mod, None)
+        self._mod_packed.pop(mod, None)
+        self._mod_stamps.pop(mod, None)
+        self._mod_warnings.pop(mod, None)
+
+    def set_priority(self, priority: Sequence[str]) -> None:
+        """Меняет порядок модов; пересортировываются только конфликтные пути."""
+
+        if list(priority) == self._priority:
+            return
+        self._priority = list(priority)
+        self._rank = {mod: index for index, mod in enumerate(self._priority)}
+        for key in self._conflicting:
+            self._providers[key].sort(key=lambda mod, key=key: self._rank_key(key, mod))
+
+    def providers(self, path: str) -> List[str]:
+        """Моды, поставляющие путь, по возрастанию приоритета."""
+
+        return list(self._providers.get(path.replace("\\", "/").lower(), []))
+
+    def winner(self, path: str) -> str | None:
+        """Мод, чей файл виден в виртуальном Data/."""
+
+        providers = self._providers.get(path.replace("\\", "/").lower())
+        return providers[-1] if providers else None
+
+    def is_packed(self, mod: str, path: str) -> bool:
+        """True, если мод поставляет путь только внутри BSA."""
+
+        entry = self._mod_entries.get(mod, {}).get(path.replace("\\", "/").lower())
+        return entry is not None and entry[1] == 0
+
+    def overwrites(self, mod: str) -> Dict[str, List[str]]:
+        """Пути, где мод выигрывает: путь → проигравшие моды."""
+
+        result: Dict[str, List[str]] = {}
+        for key, (rel_path, _) in self._mod_entries.get(mod, {}).items():
+            if key in self._conflicting and self._providers[key][-1] == mod:
+                result[rel_path] = self._providers[key][:-1]
+        return result
+
+    def overwritten_by(self, mod: str) -> Dict[str, str]:
+        """Пути, где мод проигрывает: путь → победитель."""
+
+        result: Dict[str, str] = {}
+        for key, (rel_path, _) in self._mod_entries.get(mod, {}).items():
+            if key in self._conflicting and self._providers[key][-1] != mod:
+                result[rel_path] = self._providers[key][-1]
+        return result
+
+    def winners(self, include_packed: bool = True) -> Dict[str, str]:
+        """Пути виртуального Data/ → мод-победитель.
+
+        include_packed=False оставляет только loose-файлы победителей
+        (то, что можно разложить по каталогу без распаковки BSA).
+        """
+
+        result: Dict[str, str] = {}
+        for key, providers in self._providers.items():
+            mod = providers[-1]
+            rel_path, tier = self._mod_entries[mod][key]
+            if tier or include_packed:
+                result[rel_path] = mod
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """Сводка для отчета: число файлов, конфликтов и итог по модам."""
+
+        mods: Dict[str, Dict[str, int]] = {}
+        for key in self._conflicting:
+            providers = self._providers[key]
+            for mod in providers[:-1]:
+                mods.setdefault(mod, {"wins": 0, "loses": 0})["loses"] += 1
+            mods.setdefault(providers[-1], {"wins": 0, "loses": 0})["wins"] += 1
+        summary: Dict[str, Any] = {
+            "files": len(self._providers),
+            "packed": sum(len(packed) for packed in self._mod_packed.values()),
+            "conflicts": len(self._conflicting),
+            "mods": {mod: mods[mod] for mod in sorted(mods)},
+        }
+        warnings = [warning for mod in sorted(self._mod_warnings) for warning in self._mod_warnings[mod]]
+        if warnings:
+            summary["warnings"] = warnings
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализует индекс (списки файлов и отпечатки модов)."""
+
+        return {
+            "meta": {"schema": "modbs.conflicts.v0"},
+            "priority": self._priority,
+            "mods": {
+                mod: {
+                    "stamp": self._mod_stamps.get(mod, {}),
+                    "files": files,
+                    "packed": self._mod_packed.get(mod, []),
+                    **({"warnings": self._mod_warnings[mod]} if mod in self._mod_warnings else {}),
+                }
+                for mod, files in sorted(self._mod_files.items())
+            },
+            "summary": self.summary(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Mapping[str, Any]) -> "ConflictIndex":
+        """Восстанавливает индекс из сериализованного вида."""
+
+        index = cls(payload.get("priority", []))
+        for mod, entry in payload.get("mods", {}).items():
+            index.set_mod(
+                mod,
+                entry.get("files", []),
+                # Отпечаток старого формата (строка) не сверить: мод пересканируется.
+                entry["stamp"] if isinstance(entry.get("stamp"), Mapping) else None,
+                entry.get("packed", []),
+                entry.get("warnings", []),
+            )
+        return index
+
+    def refresh(
+        self,
+        mods_dir: Path,
+        mods: Sequence[str],
+        list_packed: PackedLister | None = None,
+    ) -> List[str]:
+        """Обновляет индекс по каталогу модов и возвращает пересканированные моды.
+
+        Мод пересканируется, только если изменился его отпечаток. list_packed
+        получает BSA всех пересканированных модов разом (один проход по кэшу
+        оглавлений) и возвращает BSA → упакованные пути и BSA → ошибка чтения.
+        Нечитаемый BSA не останавливает сканирование: мод индексируется по
+        свободным файлам, а ошибка становится предупреждением сводки.
+        """
+
+        wanted = set(mods)
+        for mod in list(self._mod_files):
+            if mod not in wanted:
+                self.remove_mod(mod)
+
+        changed: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+        for mod in mods:
+            mod_dir = mods_dir / mod
+            if not mod_dir.is_dir():
+                self.remove_mod(mod)
+                continue
+            if mod in self._mod_files and _stamp_matches(mod_dir, self._mod_stamps.get(mod, {})):
+                continue
+            # Один обход дает и новый отпечаток, и список файлов.
+            files: List[str] = []
+            changed[mod] = (_walk_mod(mod_dir, files), files)
+
+        archives: Dict[str, List[Path]] = {
+            mod: [
+                mods_dir / mod / rel_path
+                for rel_path in files
+                if "/" not in rel_path and Path(rel_path).suffix.lower() in BSA_EXTENSIONS
+            ]
+            for mod, (_, files) in changed.items()
+        }
+        listings: Mapping[Path, List[str]] = {}
+        errors: Mapping[Path, str] = {}
+        if list_packed is not None:
+            all_archives = [archive for paths in archives.values() for archive in paths]
+            if all_archives:
+                listings, errors = list_packed(all_archives)
+
+        for mod, (stamp, files) in changed.items():
+            packed = [path for archive in archives[mod] for path in listings.get(archive, [])]
+            warnings = [
+                f"{mod}/{archive.name}: {errors[archive]}" for archive in archives[mod] if archive in errors
+            ]
+            self.set_mod(mod, files, stamp, packed, warnings)
+        return list(changed)
+
+
+def _list_bsa_paths(root_path: Path) -> PackedLister:
+    """Возвращает функцию чтения оглавлений BSA через кэш state/bsa.cache.json."""
+
+    def _list(archives: List[Path]) -> Tuple[Dict[Path, List[str]], Dict[Path, str]]:
+        errors: Dict[str, str] = {}
+        listings = load_bsa_listings(root_path, archives, errors)
+        packed: Dict[Path, List[str]] = {}
+        failed: Dict[Path, str] = {}
+        for archive in archives:
+            rel_path = archive.relative_to(root_path).as_posix()
+            if rel_path in errors:
+                failed[archive] = errors[rel_path]
+            else:
+                packed[archive] = [entry.path for entry in listings[rel_path]]
+        return packed, failed
+
+    return _list
+
+
+def build_conflict_index(root_path: Path, profile_name: str) -> ConflictIndex:
+    """Загружает сохраненный индекс, обновляет измененные моды и сохраняет.
+
+    Приоритет берется из modlist.txt профиля; если в нем нет включенных
+    модов, используются все каталоги workspace/mods по алфавиту. Содержимое
+    BSA в корне модов учитывается как packed-файлы.
+    """
+
+    mods_dir = root_path / "workspace" / "mods"
+    priority = mod_priority(root_path, profile_name)
+
+    index_path = root_path / CONFLICTS_INDEX_PATH
+    index = ConflictIndex.from_dict(read_json(index_path)) if index_path.exists() else ConflictIndex()
+    previous_priority = index.priority
+    index.set_priority(priority)
+    rescanned = index.refresh(mods_dir, priority, _list_bsa_paths(root_path))
+
+    if rescanned or previous_priority != priority or not index_path.exists():
+        write_json(index_path, index.to_dict())
+    return index
+
+
+def load_conflict_summary(root_path: Path) -> Dict[str, Any]:
+    """Возвращает сохраненную сводку конфликтов (пусто, если индекса нет)."""
+
+    index_path = root_path / CONFLICTS_INDEX_PATH
+    if not index_path.exists():
+        return {}
+    return dict(read_json(index_path).get("summary", {}))
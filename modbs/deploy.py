@@ -0,0 +1,136 @@
+"""Материализация профиля в плоский каталог Data/ через reflink/hardlink.
+
+Для Linux/Proton, где USVFS MO2 недоступен: победители индекса конфликтов
+раскладываются ссылками на файлы workspace/mods, поэтому деплой стоит
+O(файлов) в метаданных, а не копирование десятков ГБ. Hardlink делит inode
+с исходником: правка файла в деплое меняет и файл мода.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .conflicts import build_conflict_index
+from .fsops import replace_with
+from .storage import read_json, write_json
+
+DEPLOY_DIR = Path("workspace") / "deploy"
+DEPLOY_MANIFESTS_DIR = Path("state") / "deploy"
+
+
+@dataclass(frozen=True)
+class DeployResult:
+    """Итог деплоя: что перелинковано, что осталось и что удалено."""
+
+    linked: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    removed: List[str] = field(default_factory=list)
+    methods: Dict[str, int] = field(default_factory=dict)
+
+
+def default_target_dir(root_path: Path, profile_name: str) -> Path:
+    """Каталог деплоя по умолчанию: workspace/deploy/<profile>/Data."""
+
+    return root_path / DEPLOY_DIR / profile_name / "Data"
+
+
+def _target_matches(target: Path, entry: Dict[str, Any]) -> bool:
+    """Проверяет, что файл деплоя все еще совпадает с записью манифеста."""
+
+    try:
+        stat = target.stat()
+    except FileNotFoundError:
+        return False
+    return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+
+def _prune_empty_dirs(target_dir: Path, rel_path: str) -> None:
+    """Удаляет опустевшие родительские каталоги удаленного файла."""
+
+    parent = (target_dir / rel_path).parent
+    while parent != target_dir and parent.is_relative_to(target_dir):
+        try:
+            parent.rmdir()
+        except OSError:
+            return
+        parent = parent.parent
+
+
+def materialize_profile(
+    root_path: Path,
+    profile_name: str,
+    target_dir: Path | None = None,
+) -> DeployResult:
+    """Раскладывает победителей профиля в target_dir инкрементально.
+
+    Перелинковываются только пути, у которых сменился мод-победитель или
+    (size, mtime) исходника; пути, исчезнувшие из профиля, удаляются.
+    Файлы внутри BSA не распаковываются: в Data/ попадает сам архив.
+    """
+
+    target_dir = target_dir or default_target_dir(root_path, profile_name)
+    mods_dir = root_path / "workspace" / "mods"
+    manifest_path = root_path / DEPLOY_MANIFESTS_DIR / f"{profile_name}.json"
+    previous: Dict[str, Any] = read_json(manifest_path) if manifest_path.exists() else {}
+    previous_files: Dict[str, Dict[str, Any]] = {}
+    if previous.get("target") == str(target_dir):
+        previous_files = previous.get("files", {})
+
+    winners = build_conflict_index(root_path, profile_name).winners(include_packed=False)
+
+    files: Dict[str, Dict[str, Any]] = {}
+    linked: List[str] = []
+    methods: Dict[str, int] = {}
+    unchanged = 0
+
+    for rel_path, mod in sorted(winners.items()):
+        key = rel_path.lower()
+        source = mods_dir / mod / rel_path
+        stat = source.stat()
+        entry = previous_files.get(key)
+        if (
+            entry is not None
+            and entry.get("mod") == mod
+            and entry.get("path") == rel_path
+            and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+            and _target_matches(target_dir / rel_path, entry)
+        ):
+            files[key] = entry
+            unchanged += 1
+            continue
+
+        if entry is not None and entry.get("path") != rel_path:
+            # Сменилось написание пути: старый файл на регистрозависимой ФС остался бы лишним.
+            (target_dir / entry["path"]).unlink(missing_ok=True)
+        method = replace_with(source, target_dir / rel_path)
+        methods[method] = methods.get(method, 0) + 1
+        files[key] = {
+            "path": rel_path,
+            "mod": mod,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "method": method,
+        }
+        linked.append(rel_path)
+
+    removed: List[str] = []
+    for key, entry in sorted(previous_files.items()):
+        if key in files:
+            continue
+        (target_dir / entry["path"]).unlink(missing_ok=True)
+        _prune_empty_dirs(target_dir, entry["path"])
+        removed.append(entry["path"])
+
+    if linked or removed or not manifest_path.exists():
+        write_json(
+            manifest_path,
+            {
+                "meta": {"schema": "modbs.deploy.v0", "profile": profile_name},
+                "target": str(target_dir),
+                "files": files,
+            },
+        )
+    return DeployResult(linked=linked, unchanged=unchanged, removed=removed, methods=methods)
@@ -0,0 +1,184 @@
+"""Проверка скачанных архивов в cache/ по ожидаемым sha256."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping
+
+from .storage import append_jsonl, write_text
+from .trace import span
+
+DOWNLOADS_DIR = Path("cache") / "downloads"
+PROGRESS_PATH = Path("state") / "verify.progress.jsonl"
+
+# Крупные последовательные чтения: меньше системных вызовов на многогигабайтных архивах.
+_READ_SIZE = 8 * 1024 * 1024
+
+DEFAULT_IO_CONCURRENCY = 4
+
+_PROGRESS_KEYS = ("archive", "size", "mtime_ns", "digest")
+
+
+@dataclass(frozen=True)
+class VerifyResult:
+    """Результат проверки одного архива."""
+
+    archive: str
+    status: str
+    expected: str | None = None
+    actual: str | None = None
+    cached: bool = False
+
+
+def hash_large_file(path: Path) -> str:
+    """Считает sha256 файла крупными блоками в переиспользуемый буфер."""
+
+    digest = hashlib.sha256()
+    buffer = bytearray(_READ_SIZE)
+    view = memoryview(buffer)
+    with span("hash_file", "hash", path=path.name), open(path, "rb", buffering=0) as handle:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            read = handle.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _load_progress(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Загружает сохраненные результаты хэширования: архив → {size, mtime_ns, digest}.
+
+    append_jsonl начинает следующую запись с новой строки, поэтому
+    оборванный прерванной записью фрагмент может оказаться и посередине
+    файла. Такие строки, как и записи без нужных полей, пропускаются:
+    архив просто будет захэширован заново.
+    """
+
+    progress: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return progress
+
+    with open(path, "r", encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            if not line.endswith("\n") or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or any(key not in record for key in _PROGRESS_KEYS):
+                continue
+            progress[str(record["archive"])] = record
+    return progress
+
+
+def _compact_progress(path: Path, progress: Mapping[str, Dict[str, Any]]) -> None:
+    """Переписывает журнал прогресса, оставляя по одной записи на архив."""
+
+    lines = [json.dumps(progress[name], ensure_ascii=False) for name in sorted(progress)]
+    write_text(path, "\n".join(lines) + "\n" if lines else "")
+
+
+def verify_downloads(
+    root_path: Path,
+    entries: Iterable[Mapping[str, Any]],
+    io_concurrency: int = DEFAULT_IO_CONCURRENCY,
+) -> List[VerifyResult]:
+    """Проверяет архивы cache/downloads/ против sha256 из манифеста.
+
+    Результат каждого архива сразу дописывается в state/verify.progress.jsonl:
+    прерванная проверка продолжается с непроверенных архивов, а неизменные
+    по (size, mtime) архивы повторно не читаются.
+    """
+
+    progress_path = root_path / PROGRESS_PATH
+    progress = _load_progress(progress_path)
+    progress_lock = threading.Lock()
+    results: Dict[str, VerifyResult] = {}
+    pending: Dict[str, tuple[Path, str | None, os.stat_result]] = {}
+    order: List[str] = []
+
+    for entry in entries:
+        archive = str(entry.get("archive") or "")
+        if not archive or Path(archive).name != archive:
+            raise ValueError(f"Некорректное имя архива в манифесте: {archive!r}")
+        order.append(archive)
+        expected = entry.get("sha256")
+        path = root_path / DOWNLOADS_DIR / archive
+        if not path.is_file():
+            results[archive] = VerifyResult(archive=archive, status="missing", expected=expected)
+            continue
+
+        stat = path.stat()
+        cached = progress.get(archive)
+        if (
+            cached is not None
+            and cached.get("size") == stat.st_size
+            and cached.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            results[archive] = _compare(archive, expected, cached["digest"], cached=True)
+            continue
+        pending[archive] = (path, expected, stat)
+
+    def _hash_one(archive: str) -> VerifyResult:
+        path, expected, stat = pending[archive]
+        digest = hash_large_file(path)
+        record = {
+            "archive": archive,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+        }
+        with progress_lock:
+            append_jsonl(progress_path, record)
+            progress[archive] = record
+        return _compare(archive, expected, digest, cached=False)
+
+    if pending:
+        # Крупные архивы первыми: так последний поток не остается в одиночестве.
+        jobs = sorted(pending, key=lambda name: pending[name][2].st_size, reverse=True)
+        workers = max(1, min(io_concurrency, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_hash_one, archive) for archive in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.archive] = result
+
+        with progress_lock:
+            if progress_path.exists() and _count_lines(progress_path) > 2 * len(progress):
+                _compact_progress(progress_path, progress)
+
+    return [results[archive] for archive in order]
+
+
+def _count_lines(path: Path) -> int:
+    """Считает строки файла."""
+
+    with open(path, "rb") as handle:
+        return sum(1 for _ in handle)
+
+
+def _compare(archive: str, expected: str | None, actual: str, cached: bool) -> VerifyResult:
+    """Сравнивает digest с ожидаемым и формирует результат."""
+
+    if expected is None:
+        status = "unverified"
+    elif expected == actual:
+        status = "ok"
+    else:
+        status = "mismatch"
+    return VerifyResult(
+        archive=archive,
+        status=status,
+        expected=expected,
+        actual=actual,
+        cached=cached,
+    )
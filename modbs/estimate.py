@@ -0,0 +1,265 @@
+"""Оценка стоимости плана по истории журнала.
+
+Для каждого типа шага stats.json хранит окно точек (размер входа,
+длительность, записанные байты, Δдиск). Прогноз для шага — линейная
+зависимость метрики от размера входа, подобранная по этим точкам;
+критический путь — самая длинная по прогнозу цепочка DAG.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from .manifest import iter_manifest
+from .models import PlanIR, StepIR
+
+# Метрики прогноза в порядке полей точки после размера входа.
+ESTIMATE_METRICS = ("duration_ms", "bytes_written", "disk_delta")
+
+# Мерило размера входа по типу шага: шаги, обходящие workspace, растут
+# с числом файлов, остальные — с числом записей манифеста.
+_SCALE_BY_STEP_TYPE = {
+    "Checkpoint": "files",
+    "DeployProfile": "files",
+    "Report": "files",
+}
+
+# Поля payload с явным списком входов шага.
+_PAYLOAD_INPUT_FIELDS = ("entries", "archives", "mods", "mod_ids", "plugins")
+
+
+def _count_files(path: Path) -> int:
+    """Считает файлы в дереве каталога."""
+
+    count = 0
+    for _, _, files in os.walk(path):
+        count += len(files)
+    return count
+
+
+def _count_manifest(root_path: Path, manifest_path: Any) -> int:
+    """Считает записи манифеста модов (0, если манифеста нет или он битый)."""
+
+    if not manifest_path:
+        return 0
+    try:
+        return sum(1 for _ in iter_manifest(root_path / str(manifest_path)))
+    except (OSError, ValueError):
+        return 0
+
+
+def measure_input_scale(root_path: Path, manifest_path: Any = None) -> Dict[str, int]:
+    """Размеры входов сборки: записи манифеста и файлы workspace."""
+
+    return {
+        "mods": _count_manifest(root_path, manifest_path),
+        "files": _count_files(root_path / "workspace"),
+    }
+
+
+class LazyInputScale(Mapping[str, int]):
+    """Размеры входов для apply, считаемые только по требованию.
+
+    Шаги с явным списком входов в payload не обращаются к мерилу вовсе.
+    mods (разбор манифеста) считается один раз за запуск, files — при
+    каждом обращении: Checkpoint/Report должны видеть workspace на момент
+    своего завершения, а не на старте apply. count_files подставляет
+    счетчик без обхода диска (в apply — дерево DiskLedger, уже обновленное
+    к завершению шага); без него workspace обходится заново.
+    """
+
+    _KEYS = ("mods", "files")
+
+    def __init__(
+        self,
+        root_path: Path,
+        manifest_path: Any = None,
+        count_files: Callable[[], int] | None = None,
+    ) -> None:
+        self._root_path = root_path
+        self._manifest_path = manifest_path
+        self._count_files = count_files
+        self._mods: int | None = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> int:
+        if key == "files":
+            if self._count_files is not None:
+                return self._count_files()
+            return _count_files(self._root_path / "workspace")
+        if key != "mods":
+            raise KeyError(key)
+        with self._lock:
+            if self._mods is None:
+                self._mods = _count_manifest(self._root_path, self._manifest_path)
+            return self._mods
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
+def step_input_size(step: StepIR, scale: Mapping[str, int]) -> int:
+    """Размер входа шага: явный список в payload или мерило по типу шага."""
+
+    for name in _PAYLOAD_INPUT_FIELDS:
+        value = step.payload.get(name)
+        if isinstance(value, list):
+            return len(value)
+    return int(scale.get(_SCALE_BY_STEP_TYPE.get(step.step_type, "mods"), 0))
+
+
+def cost_point(input_size: Any, metrics: Mapping[str, Any]) -> List[float] | None:
+    """Точка истории из metrics финального события или None.
+
+    Записанные байты — сумма положительных Δ по зонам ledger, Δдиск —
+    сумма всех Δ; без ledger обе величины нулевые.
+    """
+
+    duration = metrics.get("duration_ms")
+    if input_size is None or duration is None:
+        return None
+    delta = metrics.get("disk_delta")
+    zones = [float(value) for value in delta.values()] if isinstance(delta, Mapping) else []
+    written = sum(value for value in zones if value > 0)
+    return [float(input_size), float(duration), written, sum(zones)]
+
+
+def _median(values: Sequence[float]) -> float:
+    """Медиана значений."""
+
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _predict(points: Sequence[Tuple[float, float]], size: float) -> float:
+    """Прогноз метрики для размера входа по точкам (размер, значение).
+
+    При разных размерах — метод наименьших квадратов; если размер во всех
+    точках один, медиана масштабируется пропорционально размеру.
+    """
+
+    sizes = [point[0] for point in points]
+    values = [point[1] for point in points]
+    if len(set(sizes)) < 2:
+        median = _median(values)
+        return median * size / sizes[0] if sizes[0] else median
+
+    mean_x = sum(sizes) / len(sizes)
+    mean_y = sum(values) / len(values)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x in sizes)
+    return mean_y + slope * (size - mean_x)
+
+
+def estimate_step(
+    step: StepIR,
+    history: Mapping[str, Any],
+    scale: Mapping[str, int],
+) -> Dict[str, Any]:
+    """Прогноз длительности, записанных байт и Δдиска для одного шага."""
+
+    size = step_input_size(step, scale)
+    entry = history.get(step.step_type) or {}
+    costs = entry.get("costs", [])
+    estimate: Dict[str, Any] = {"input_size": size, "samples": len(costs)}
+    if not costs:
+        estimate.update({name: None for name in ESTIMATE_METRICS})
+        return estimate
+
+    for offset, name in enumerate(ESTIMATE_METRICS, start=1):
+        value = _predict([(point[0], point[offset]) for point in costs], size)
+        # Δдиск может быть отрицательным (очистка), остальные метрики — нет.
+        if name != "disk_delta":
+            value = max(value, 0.0)
+        estimate[name] = round(value, 3) if name == "duration_ms" else int(round(value))
+    return estimate
+
+
+def critical_path(plan: PlanIR, durations: Mapping[str, float | None]) -> Tuple[float, List[str]]:
+    """Самая длинная по длительности цепочка DAG: (мс, шаги по порядку).
+
+    Шаги без прогноза считаются нулевыми.
+    """
+
+    incoming: Dict[str, List[str]] = {step.step_id: [] for step in plan.steps}
+    outgoing: Dict[str, List[str]] = {step.step_id: [] for step in plan.steps}
+    for edge in plan.edges:
+        incoming[edge.target].append(edge.source)
+        outgoing[edge.source].append(edge.target)
+
+    pending = {step_id: len(sources) for step_id, sources in incoming.items()}
+    ready = [step.step_id for step in plan.steps if not pending[step.step_id]]
+    order: List[str] = []
+    finish: Dict[str, float] = {}
+    previous: Dict[str, str | None] = {}
+    while ready:
+        step_id = ready.pop(0)
+        order.append(step_id)
+        best = max(incoming[step_id], key=lambda source: finish[source], default=None)
+        previous[step_id] = best
+        finish[step_id] = (finish[best] if best else 0.0) + float(durations.get(step_id) or 0.0)
+        for target in outgoing[step_id]:
+            pending[target] -= 1
+            if not pending[target]:
+                ready.append(target)
+
+    if len(order) != len(plan.steps):
+        raise ValueError("Граф плана содержит цикл")
+    if not order:
+        return 0.0, []
+
+    # При равенстве берется более поздний шаг: нулевые шаги в хвосте
+    # остаются на пути.
+    last: str | None = max(reversed(order), key=lambda step_id: finish[step_id])
+    total = finish[last]
+    path: List[str] = []
+    while last is not None:
+        path.append(last)
+        last = previous[last]
+    path.reverse()
+    return round(total, 3), path
+
+
+def estimate_plan(
+    plan: PlanIR,
+    history: Mapping[str, Any],
+    scale: Mapping[str, int],
+) -> Dict[str, Any]:
+    """Прогнозы по шагам плана и критический путь для meta["estimates"]."""
+
+    steps = {step.step_id: estimate_step(step, history, scale) for step in plan.steps}
+    total_ms, path = critical_path(plan, {step_id: item["duration_ms"] for step_id, item in steps.items()})
+    return {
+        "scale": dict(scale),
+        "steps": steps,
+        "critical_path": {"duration_ms": total_ms, "steps": path},
+        "unestimated": sorted(step_id for step_id, item in steps.items() if not item["samples"]),
+    }
+
+
+def format_estimates(plan: PlanIR, estimates: Mapping[str, Any]) -> str:
+    """Текстовая таблица прогнозов для терминала."""
+
+    def _fmt(value: Any) -> str:
+        return "—" if value is None else f"{value}"
+
+    lines = ["Step | Type | Input | Duration ms | Bytes written | Disk Δ | Samples"]
+    for step in plan.steps:
+        item = estimates["steps"][step.step_id]
+        lines.append(
+            f"{step.step_id} | {step.step_type} | {item['input_size']} | {_fmt(item['duration_ms'])} "
+            f"| {_fmt(item['bytes_written'])} | {_fmt(item['disk_delta'])} | {item['samples']}"
+        )
+    path = estimates["critical_path"]
+    lines.append(f"Critical path: {path['duration_ms']:.1f} ms ({' → '.join(path['steps'])})")
+    if estimates.get("unestimated"):
+        lines.append("No history: " + ", ".join(estimates["unestimated"]))
+    return "\n".join(lines) + "\n"
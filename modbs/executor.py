@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any, Callable, Dict, List, Optional
 
@@ -15,11 +17,36 @@ ALLOWED_STEP_TYPES = {
     "RunLOOT",
     "Checkpoint",
     "Report",
+    "RootSnapshot",
+    "RootApply",
+    "RootRollback",
+    "RootVerify",
+    "Extract",
+    "InstallToManager",
+    "VerifyDownload",
+    "DeployProfile",
+    "RunXEditQAC",
+    "ArtifactClassify",
 }
 
 
 class StepBlockedError(RuntimeError):
-    """Ошибка для остановки шага со статусом Blocked."""
+    """Ошибка для остановки шага со статусом Blocked.
+
+    next_action_at — время (epoch, секунды), когда шаг имеет смысл
+    повторить (например, после окна rate limit); source — внешний
+    источник, у которого свой бюджет повторов.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        next_action_at: float | None = None,
+        source: str | None = None,
+    ) -> None:
+        super().__init__(message)
+        self.next_action_at = next_action_at
+        self.source = source
 
 
 @dataclass(frozen=True)
@@ -31,6 +58,8 @@ class ExecutionResult:
     blocked_step_id: Optional[str] = None
     failed_step_id: Optional[str] = None
     message: str = ""
+    parked: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    next_action_at: Optional[float] = None
 
 
 def _resolve_handler(step: StepIR, handlers: Dict[str, StepHandler]) -> StepHandler:
@@ -42,42 +71,188 @@ def _resolve_handler(step: StepIR, handlers: Dict[str, StepHandler]) -> StepHand
     return handler
 
 
+def _dependencies(plan: PlanIR) -> Dict[str, set[str]]:
+    """Возвращает зависимости шагов по ребрам плана.
+
+    План без ребер исполняется строго последовательно: каждый шаг
+    зависит от предыдущего.
+    """
+
+    step_ids = [step.step_id for step in plan.steps]
+    deps: Dict[str, set[str]] = {step_id: set() for step_id in step_ids}
+    if not plan.edges:
+        for previous, current in zip(step_ids, step_ids[1:]):
+            deps[current].add(previous)
+        return deps
+
+    for edge in plan.edges:
+        if edge.target in deps and edge.source in deps:
+            deps[edge.target].add(edge.source)
+    return deps
+
+
+def _blocked_result(
+    executed_step_ids: List[str],
+    parked: Dict[str, Dict[str, Any]],
+    plan: PlanIR,
+) -> ExecutionResult:
+    """Формирует результат Blocked по припаркованным шагам."""
+
+    first = next(step.step_id for step in plan.steps if step.step_id in parked)
+    times = [info["next_action_at"] for info in parked.values() if info.get("next_action_at")]
+    return ExecutionResult(
+        status="Blocked",
+        executed_step_ids=executed_step_ids,
+        blocked_step_id=first,
+        message=str(parked[first]["reason"]),
+        parked=parked,
+        next_action_at=min(times) if times else None,
+    )
+
+
+def _run_step(step: StepIR, handlers: Dict[str, StepHandler], ctx: Dict[str, Any]) -> Exception | None:
+    """Выполняет шаг и возвращает исключение вместо его выбрасывания."""
+
+    try:
+        handler = _resolve_handler(step, handlers)
+        handler(step, ctx)
+    except Exception as exc:  # noqa: BLE001
+        return exc
+    return None
+
+
+def _run_wave(
+    ready: List[StepIR],
+    handlers: Dict[str, StepHandler],
+    ctx: Dict[str, Any],
+) -> Dict[str, Exception | None]:
+    """Выполняет готовые шаги одной волны: step_id → исключение или None.
+
+    Шаги типов из ctx["concurrent_step_types"] (например, отправляемые
+    на удаленные worker) запускаются параллельно, до ctx["max_parallel"]
+    одновременно; остальные выполняются по одному в порядке плана. После
+    первой ошибки новые локальные шаги волны не запускаются.
+    """
+
+    max_parallel = int(ctx.get("max_parallel", 1))
+    concurrent_types = set(ctx.get("concurrent_step_types", ())) if max_parallel > 1 else set()
+    concurrent = [step for step in ready if step.step_type in concurrent_types]
+
+    outcomes: Dict[str, Exception | None] = {}
+    pool = ThreadPoolExecutor(max_workers=max_parallel) if concurrent else None
+    futures: Dict[str, Future] = {}
+    try:
+        if pool is not None:
+            futures = {step.step_id: pool.submit(_run_step, step, handlers, ctx) for step in concurrent}
+        for step in ready:
+            if step.step_id in futures:
+                continue
+            error = outcomes[step.step_id] = _run_step(step, handlers, ctx)
+            if error is not None and not isinstance(error, StepBlockedError):
+                break
+        for step_id, future in futures.items():
+            outcomes[step_id] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return outcomes
+
+
 def execute(plan: PlanIR, ctx: Dict[str, Any]) -> ExecutionResult:
-    """Исполняет шаги плана по порядку и останавливается при ошибке.
+    """Исполняет шаги плана по DAG ребер и останавливается при ошибке.
 
-    Поддерживаются только типы шагов из allowlist.
+    Поддерживаются только типы шагов из allowlist. Шаги исполняются
+    волнами: в волну входят все шаги, зависимости которых выполнены.
+    Шаг, выбросивший StepBlockedError, паркуется вместе с зависимыми, а
+    независимые ветви продолжают выполняться. Если у шага есть
+    next_action_at, он повторяется, когда время наступит, пока ожидание
+    не превышает ctx["max_wait_seconds"] и не исчерпан бюджет повторов
+    источника (ctx["retry_budgets"][source], по умолчанию
+    ctx["default_retry_budget"]). Шаги из ctx["skip_step_ids"] считаются
+    уже выполненными (resume).
     """
 
     handlers = ctx.get("handlers", {})
+    max_wait = float(ctx.get("max_wait_seconds", 0))
+    budgets: Dict[str, int] = dict(ctx.get("retry_budgets", {}))
+    default_budget = int(ctx.get("default_retry_budget", 1))
+
+    deps = _dependencies(plan)
+    done: set[str] = set(ctx.get("skip_step_ids", ())) & set(deps)
     executed_step_ids: List[str] = []
+    parked: Dict[str, Dict[str, Any]] = {}
 
-    for step in plan.steps:
-        if step.step_type not in ALLOWED_STEP_TYPES:
-            return ExecutionResult(
-                status="Blocked",
-                executed_step_ids=executed_step_ids,
-                blocked_step_id=step.step_id,
-                message=f"Неизвестный тип шага: {step.step_type}",
-            )
+    while True:
+        ready = [
+            step
+            for step in plan.steps
+            if step.step_id not in done
+            and step.step_id not in parked
+            and deps[step.step_id] <= done
+        ]
 
-        try:
-            handler = _resolve_handler(step, handlers)
-            handler(step, ctx)
-        except StepBlockedError as exc:
-            return ExecutionResult(
-                status="Blocked",
-                executed_step_ids=executed_step_ids,
-                blocked_step_id=step.step_id,
-                message=str(exc),
-            )
-        except Exception as exc:  # noqa: BLE001
+        for step in ready:
+            if step.step_type not in ALLOWED_STEP_TYPES:
+                return ExecutionResult(
+                    status="Blocked",
+                    executed_step_ids=executed_step_ids,
+                    blocked_step_id=step.step_id,
+                    message=f"Неизвестный тип шага: {step.step_type}",
+                )
+
+        outcomes = _run_wave(ready, handlers, ctx) if ready else {}
+        progressed = False
+        failed: StepIR | None = None
+        for step in ready:
+            if step.step_id not in outcomes:
+                continue
+            error = outcomes[step.step_id]
+            if error is None:
+                done.add(step.step_id)
+                executed_step_ids.append(step.step_id)
+                progressed = True
+            elif isinstance(error, StepBlockedError):
+                parked[step.step_id] = {
+                    "reason": str(error),
+                    "next_action_at": error.next_action_at,
+                    "source": error.source,
+                }
+            elif failed is None:
+                failed = step
+
+        if failed is not None:
             return ExecutionResult(
                 status="Failed",
                 executed_step_ids=executed_step_ids,
-                failed_step_id=step.step_id,
-                message=str(exc),
+                failed_step_id=failed.step_id,
+                message=str(outcomes[failed.step_id]),
+                parked=parked,
             )
 
-        executed_step_ids.append(step.step_id)
+        if progressed:
+            continue
+        if not parked:
+            return ExecutionResult(status="Succeeded", executed_step_ids=executed_step_ids)
+
+        retryable = {
+            step_id: info
+            for step_id, info in parked.items()
+            if info.get("next_action_at") is not None
+            and budgets.get(str(info.get("source")), default_budget) > 0
+        }
+        if not retryable:
+            return _blocked_result(executed_step_ids, parked, plan)
+
+        wake_at = min(info["next_action_at"] for info in retryable.values())
+        delay = wake_at - time.time()
+        if delay > max_wait:
+            # Ждать дольше разрешенного — выходим, состояние для --resume сохранит apply.
+            return _blocked_result(executed_step_ids, parked, plan)
+        if delay > 0:
+            time.sleep(delay)
 
-    return ExecutionResult(status="Succeeded", executed_step_ids=executed_step_ids)
+        for step_id, info in retryable.items():
+            if info["next_action_at"] <= wake_at:
+                source = str(info.get("source"))
+                budgets[source] = budgets.get(source, default_budget) - 1
+                del parked[step_id]
@@ -0,0 +1,94 @@
+"""Файловые операции: reflink/hardlink с fallback на копию и хэширование."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+try:  # fcntl есть только на POSIX-системах.
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+# ioctl FICLONE (Linux): клонирование экстентов на btrfs/XFS.
+_FICLONE = 0x40049409
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+LINK_REFLINK = "reflink"
+LINK_HARDLINK = "hardlink"
+LINK_COPY = "copy"
+
+
+def sha256_file(path: Path) -> str:
+    """Вычисляет sha256 для файла и возвращает строку с префиксом."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _try_reflink(source: Path, target: Path) -> bool:
+    """Пробует создать reflink-копию. Возвращает False, если ФС не умеет."""
+
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError:
+        if target.exists():
+            target.unlink()
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def link_or_copy(source: Path, target: Path, allow_hardlink: bool = True) -> str:
+    """Материализует source в target самым дешевым доступным способом.
+
+    Порядок: reflink (copy-on-write) → hardlink → полная копия.
+    Возвращает использованный способ. target не должен существовать.
+    """
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    if _try_reflink(source, target):
+        return LINK_REFLINK
+
+    if allow_hardlink:
+        try:
+            os.link(source, target)
+            return LINK_HARDLINK
+        except OSError:
+            pass
+
+    shutil.copy2(source, target)
+    return LINK_COPY
+
+
+def replace_with(source: Path, target: Path, allow_hardlink: bool = True) -> str:
+    """Атомарно заменяет target содержимым source (temp → rename).
+
+    Замена через rename разрывает hardlink со старым содержимым target,
+    поэтому снимки, ссылающиеся на прежний inode, не портятся.
+    """
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=target.parent, prefix=".modbs-", suffix=".tmp")
+    os.close(fd)
+    temp_path = Path(temp_name)
+    temp_path.unlink()
+    try:
+        method = link_or_copy(source, temp_path, allow_hardlink=allow_hardlink)
+        os.replace(temp_path, target)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    return method
@@ -5,10 +5,13 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict
 
-from .storage import append_jsonl
+from .locking import state_lock
+from .storage import DURABILITY_FULL, append_jsonl
+from .trace import span
 
 ALLOWED_STATUSES = {"Running", "Succeeded", "Failed", "Blocked"}
 JOURNAL_PATH = Path("state/job.journal.jsonl")
+DURABILITY = DURABILITY_FULL
 
 
 def append_event(
@@ -17,8 +20,14 @@ def append_event(
     status: str,
     message: str,
     metrics: Dict[str, Any] | None,
+    run_id: str | None = None,
+    step_type: str | None = None,
 ) -> None:
-    """Добавляет событие в журнал в режиме append-only."""
+    """Добавляет событие в журнал в режиме append-only.
+
+    run_id и step_type необязательны: по ним modbs stats группирует
+    события разных запусков.
+    """
 
     if status not in ALLOWED_STATUSES:
         raise ValueError(
@@ -33,5 +42,11 @@ def append_event(
         "message": message,
         "metrics": metrics or {},
     }
-
-    append_jsonl(JOURNAL_PATH, payload)
+    if run_id is not None:
+        payload["run_id"] = run_id
+    if step_type is not None:
+        payload["step_type"] = step_type
+
+    with span("journal_append", "journal", step_id=step_id, status=status):
+        with state_lock(Path(JOURNAL_PATH).parent, exclusive=True):
+            append_jsonl(JOURNAL_PATH, payload, DURABILITY)
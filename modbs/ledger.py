@@ -0,0 +1,202 @@
+"""Cost/Risk Ledger: учет Δдиска по зонам workspace для каждого шага."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+LEDGER_ZONES = ("workspace", "cache", "rootstate", "state")
+
+# Append-only логи растут на месте и не меняют mtime каталога,
+# поэтому их размер перечитывается при каждом обновлении.
+_VOLATILE_FILES = ("state/job.journal.jsonl", "state/lockfile.deltas.jsonl")
+
+DEFAULT_MIN_FREE_BYTES = 1024 * 1024 * 1024
+
+
+@dataclass
+class _DirNode:
+    """Кэшированный узел дерева размеров каталога."""
+
+    mtime_ns: int = -1
+    files: Dict[str, int] = field(default_factory=dict)
+    children: Dict[str, "_DirNode"] = field(default_factory=dict)
+
+    def total(self) -> int:
+        """Возвращает суммарный размер поддерева."""
+
+        return sum(self.files.values()) + sum(child.total() for child in self.children.values())
+
+    def file_count(self) -> int:
+        """Возвращает число файлов в поддереве."""
+
+        return len(self.files) + sum(child.file_count() for child in self.children.values())
+
+
+def _rescan_node(path: Path, node: _DirNode) -> None:
+    """Обновляет узел: перечитывает каталог, только если изменился его mtime.
+
+    Подкаталоги проверяются всегда (их изменения не меняют mtime родителя),
+    но для неизменившихся каталогов не выполняется ни scandir, ни stat файлов.
+    """
+
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        node.mtime_ns = -1
+        node.files.clear()
+        node.children.clear()
+        return
+
+    if mtime_ns != node.mtime_ns:
+        files: Dict[str, int] = {}
+        child_names: List[str] = []
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                child_names.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                files[entry.name] = entry.stat(follow_symlinks=False).st_size
+        node.files = files
+        node.children = {
+            name: node.children.get(name, _DirNode()) for name in child_names
+        }
+        node.mtime_ns = mtime_ns
+
+    for name, child in node.children.items():
+        _rescan_node(path / name, child)
+
+
+class DiskLedger:
+    """Инкрементальный учет занятого места по зонам и прогноз роста.
+
+    Деревья размеров держатся в памяти между шагами одного apply и
+    обновляются по списку измененных путей или mtime-проверкой каталогов
+    вместо полного обхода в стиле du.
+    """
+
+    def __init__(
+        self,
+        root_path: Path,
+        planned_steps: int = 0,
+        min_free_bytes: int = DEFAULT_MIN_FREE_BYTES,
+    ) -> None:
+        self.root_path = Path(root_path)
+        self.planned_steps = planned_steps
+        self.min_free_bytes = min_free_bytes
+        self._trees: Dict[str, _DirNode] = {zone: _DirNode() for zone in LEDGER_ZONES}
+        self._step_totals: Dict[str, Dict[str, int]] = {}
+        self._growth_history: List[int] = []
+        self.refresh()
+
+    def totals(self) -> Dict[str, int]:
+        """Возвращает текущий размер каждой зоны в байтах."""
+
+        return {zone: node.total() for zone, node in self._trees.items()}
+
+    def file_count(self, zone: str) -> int:
+        """Число файлов зоны по дереву в памяти, без обращения к диску.
+
+        Актуально на момент последнего refresh (begin_step/end_step).
+        """
+
+        return self._trees[zone].file_count()
+
+    def _node_for(self, rel_parts: tuple[str, ...]) -> _DirNode | None:
+        """Находит кэшированный узел каталога по относительному пути."""
+
+        if not rel_parts or rel_parts[0] not in self._trees:
+            return None
+        node = self._trees[rel_parts[0]]
+        for part in rel_parts[1:]:
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _update_path(self, path: Path) -> bool:
+        """Точечно обновляет один путь. Возвращает False, если нужен rescan."""
+
+        try:
+            rel_parts = path.resolve().relative_to(self.root_path.resolve()).parts
+        except ValueError:
+            return True
+        if len(rel_parts) < 2:
+            return False
+
+        parent = self._node_for(rel_parts[:-1])
+        if parent is None:
+            return False
+
+        name = rel_parts[-1]
+        if path.is_dir():
+            child = parent.children.setdefault(name, _DirNode())
+            _rescan_node(path, child)
+        elif path.is_file():
+            parent.files[name] = path.stat().st_size
+        else:
+            parent.files.pop(name, None)
+            parent.children.pop(name, None)
+        return True
+
+    def refresh(self, changed_paths: Iterable[Path] | None = None) -> Dict[str, int]:
+        """Обновляет деревья размеров и возвращает размеры зон."""
+
+        if changed_paths is not None:
+            hints = [Path(path) for path in changed_paths]
+            hints += [self.root_path / rel for rel in _VOLATILE_FILES]
+            if all(self._update_path(path) for path in hints):
+                return self.totals()
+
+        for zone, node in self._trees.items():
+            _rescan_node(self.root_path / zone, node)
+        for rel_path in _VOLATILE_FILES:
+            self._update_path(self.root_path / rel_path)
+        return self.totals()
+
+    def _projected_step_growth(self) -> int:
+        """Оценивает рост на следующий шаг по истории положительных Δ."""
+
+        positive = [growth for growth in self._growth_history if growth > 0]
+        if not positive:
+            return 0
+        return max(positive)
+
+    def begin_step(self, step_id: str) -> Dict[str, Any]:
+        """Фиксирует размеры зон до шага и возвращает прогноз и risk-flags."""
+
+        totals = self.refresh()
+        self._step_totals[step_id] = totals
+
+        free_bytes = shutil.disk_usage(self.root_path).free
+        projected_step = self._projected_step_growth()
+        remaining = max(self.planned_steps - len(self._growth_history), 1)
+        projected_remaining = projected_step * remaining
+
+        risk_flags: List[str] = []
+        if free_bytes - projected_step < self.min_free_bytes:
+            risk_flags.append("disk_pressure")
+        if projected_remaining > free_bytes:
+            risk_flags.append("disk_growth_exceeds_free")
+
+        return {
+            "disk_free": free_bytes,
+            "disk_projected_step": projected_step,
+            "disk_projected_remaining": projected_remaining,
+            "risk_flags": risk_flags,
+        }
+
+    def end_step(
+        self,
+        step_id: str,
+        changed_paths: Iterable[Path] | None = None,
+    ) -> Dict[str, Any]:
+        """Вычисляет Δдиск по зонам за шаг."""
+
+        before = self._step_totals.pop(step_id, None) or self.totals()
+        after = self.refresh(changed_paths)
+        delta = {zone: after[zone] - before.get(zone, 0) for zone in LEDGER_ZONES}
+        self._growth_history.append(sum(delta.values()))
+        return {"disk_delta": delta, "disk_total": after}
@@ -0,0 +1,179 @@
+"""Встроенная сортировка порядка загрузки плагинов (быстрый fallback к LOOT)."""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from .conflicts import mod_priority
+from .plugins import PluginHeader, scan_plugins
+from .storage import read_json, write_json, write_text
+
+LOADORDER_CACHE_PATH = Path("state") / "loadorder.cache.json"
+
+_PLUGINS_HEADER = "# This file was automatically generated by modbs.\n"
+
+
+class LoadOrderCycleError(ValueError):
+    """Правила и masters образуют цикл — порядок не существует."""
+
+
+@dataclass(frozen=True)
+class SortRules:
+    """Пользовательские правила порядка: пары (раньше, позже) в нижнем регистре."""
+
+    edges: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def load_rules(path: Path | None) -> SortRules:
+    """Читает правила в стиле masterlist из JSON или YAML.
+
+    Формат: {"plugins": [{"name": "Patch.esp", "after": [...], "before": [...]}]}.
+    YAML требует установленного PyYAML (опциональная зависимость).
+    """
+
+    if path is None:
+        return SortRules()
+    if not path.exists():
+        raise FileNotFoundError(f"Не найден файл правил порядка загрузки: {path}")
+
+    if path.suffix.lower() in {".yaml", ".yml"}:
+        try:
+            import yaml  # type: ignore[import-not-found]
+        except ImportError as exc:
+            raise ValueError("Для правил в YAML нужен пакет PyYAML") from exc
+        payload = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    else:
+        payload = read_json(path)
+
+    edges: List[Tuple[str, str]] = []
+    for entry in payload.get("plugins", []):
+        name = str(entry["name"]).lower()
+        for other in entry.get("after", []):
+            edges.append((str(other).lower(), name))
+        for other in entry.get("before", []):
+            edges.append((name, str(other).lower()))
+    return SortRules(edges=edges)
+
+
+def _fingerprint(headers: Mapping[str, PluginHeader], rules: SortRules) -> str:
+    """Отпечаток входов сортировки: имена, masters, флаги и правила."""
+
+    payload = {
+        "plugins": [
+            [name, [master.lower() for master in header.masters], header.is_master]
+            for name, header in sorted(headers.items())
+        ],
+        "rules": sorted(rules.edges),
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def sort_plugins(
+    headers: Mapping[str, PluginHeader],
+    rules: SortRules | None = None,
+    previous_order: Sequence[str] = (),
+) -> List[str]:
+    """Детерминированная топологическая сортировка плагинов.
+
+    Ограничения: masters раньше зависимых, правила after/before, плагины с
+    флагом ESM/ESL раньше обычных. При равенстве сохраняется прошлый порядок
+    (previous_order), новые плагины идут по имени — так изменение нескольких
+    плагинов сдвигает только их самих. Возвращает имена в исходном регистре.
+    """
+
+    rules = rules or SortRules()
+    names = set(headers)
+    successors: Dict[str, set[str]] = {name: set() for name in names}
+
+    def _add_edge(before: str, after: str) -> None:
+        if before in names and after in names and before != after:
+            successors[before].add(after)
+
+    for name, header in headers.items():
+        for master in header.masters:
+            _add_edge(master.lower(), name)
+    for before, after in rules.edges:
+        _add_edge(before, after)
+
+    for before, targets in successors.items():
+        for after in targets:
+            if not headers[before].is_master and headers[after].is_master:
+                raise LoadOrderCycleError(
+                    f"{headers[after].name} (master) не может грузиться после "
+                    f"{headers[before].name}"
+                )
+
+    previous_rank = {name.lower(): index for index, name in enumerate(previous_order)}
+    offset = len(previous_rank)
+
+    def _priority(name: str) -> Tuple[int, int, str]:
+        tier = 0 if headers[name].is_master else 1
+        return (tier, previous_rank.get(name, offset), name)
+
+    in_degree = {name: 0 for name in names}
+    for targets in successors.values():
+        for after in targets:
+            in_degree[after] += 1
+
+    ready = [_priority(name) for name in names if in_degree[name] == 0]
+    heapq.heapify(ready)
+    order: List[str] = []
+    while ready:
+        _, _, name = heapq.heappop(ready)
+        order.append(headers[name].name)
+        for after in successors[name]:
+            in_degree[after] -= 1
+            if in_degree[after] == 0:
+                heapq.heappush(ready, _priority(after))
+
+    if len(order) != len(names):
+        stuck = sorted(headers[name].name for name, degree in in_degree.items() if degree > 0)
+        raise LoadOrderCycleError(f"Цикл в порядке загрузки: {', '.join(stuck)}")
+    return order
+
+
+def write_load_order(profile_dir: Path, order: Sequence[str]) -> None:
+    """Записывает plugins.txt (активные, формат SE со звездочкой) и loadorder.txt."""
+
+    plugins_text = _PLUGINS_HEADER + "".join(f"*{name}\n" for name in order)
+    loadorder_text = _PLUGINS_HEADER + "".join(f"{name}\n" for name in order)
+    write_text(profile_dir / "plugins.txt", plugins_text)
+    write_text(profile_dir / "loadorder.txt", loadorder_text)
+
+
+def sort_profile(
+    root_path: Path,
+    profile_name: str,
+    rules_path: Path | None = None,
+) -> List[str]:
+    """Сортирует плагины workspace/mods и пишет порядок в профиль.
+
+    Если отпечаток входов не изменился, берется закэшированный порядок и
+    файлы профиля не переписываются.
+    """
+
+    headers = scan_plugins(root_path, mod_priority(root_path, profile_name))
+    rules = load_rules(rules_path)
+    fingerprint = _fingerprint(headers, rules)
+    profile_dir = root_path / "workspace" / "profiles" / profile_name
+
+    cache_path = root_path / LOADORDER_CACHE_PATH
+    cache: Dict[str, Any] = read_json(cache_path) if cache_path.exists() else {}
+    previous = cache.get("profiles", {}).get(profile_name, {})
+
+    if previous.get("fingerprint") == fingerprint and (profile_dir / "loadorder.txt").exists():
+        return list(previous.get("order", []))
+
+    order = sort_plugins(headers, rules, previous.get("order", []))
+    write_load_order(profile_dir, order)
+
+    profiles = dict(cache.get("profiles", {}))
+    profiles[profile_name] = {"fingerprint": fingerprint, "order": order}
+    write_json(cache_path, {"meta": {"schema": "modbs.loadorder_cache.v0"}, "profiles": profiles})
+    return order
@@ -0,0 +1,181 @@
+"""Блокировки рабочего каталога для параллельных apply/report.
+
+Блокировки на файлах в state/:
+
+- .apply.lock — exclusive на все время apply: два apply на одном корне
+  не выполняются одновременно;
+- .state.lock — reader/writer для коротких критических секций: запись
+  журнала и фиксация lockfile берут exclusive, читатели (report, stats)
+  берут shared только на время чтения и видят согласованное состояние;
+- .steps/<step_id>.lock — exclusive на время выполнения шага worker:
+  шаг, переназначенный после потери связи, не начнется на другом worker,
+  пока прежний его не закончил.
+
+На POSIX используется fcntl.flock, на Windows — msvcrt.locking (там
+shared-блокировок нет, и читатели тоже берут exclusive).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+APPLY_LOCK_NAME = ".apply.lock"
+STATE_LOCK_NAME = ".state.lock"
+LOCK_FILE_NAMES = (APPLY_LOCK_NAME, STATE_LOCK_NAME)
+STEP_LOCK_DIR = ".steps"
+
+# Интервал опроса msvcrt при ожидании блокировки.
+_POLL_INTERVAL = 0.05
+
+
+class WorkspaceBusyError(RuntimeError):
+    """Рабочий каталог занят другим процессом."""
+
+
+def _try_lock(fd: int, exclusive: bool) -> bool:
+    """Пытается взять блокировку без ожидания."""
+
+    if fcntl is not None:
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    os.lseek(fd, 0, os.SEEK_SET)
+    try:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _lock(fd: int, exclusive: bool) -> None:
+    """Берет блокировку, ожидая ее освобождения."""
+
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    while not _try_lock(fd, exclusive):
+        time.sleep(_POLL_INTERVAL)
+
+
+def _unlock(fd: int) -> None:
+    """Снимает блокировку."""
+
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def _open_lock_file(path: Path) -> int:
+    """Открывает (создавая) файл блокировки."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+@contextmanager
+def apply_lock(root_path: Path, wait: bool = False) -> Iterator[None]:
+    """Держит exclusive-блокировку state/.apply.lock на время apply.
+
+    Без wait занятый каталог сразу дает WorkspaceBusyError.
+    """
+
+    fd = _open_lock_file(root_path / "state" / APPLY_LOCK_NAME)
+    try:
+        if wait:
+            _lock(fd, exclusive=True)
+        elif not _try_lock(fd, exclusive=True):
+            raise WorkspaceBusyError(f"В {root_path} уже выполняется apply")
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def step_lock(root_path: Path, step_id: str) -> Iterator[None]:
+    """Держит exclusive-блокировку state/.steps/<step_id>.lock, ожидая ее.
+
+    Рабочий каталог общий для всех worker, поэтому блокировка видна им
+    всем: второй экземпляр шага ждет, пока первый не выйдет из обработчика.
+    """
+
+    name = "".join(char if char.isalnum() or char in "-_." else "_" for char in step_id)
+    fd = _open_lock_file(root_path / "state" / STEP_LOCK_DIR / f"{name}.lock")
+    try:
+        _lock(fd, exclusive=True)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class _HeldLock:
+    """Блокировка state/, уже взятая этим процессом."""
+
+    fd: int
+    exclusive: bool
+    depth: int
+
+
+_HELD: Dict[Path, _HeldLock] = {}
+_HELD_GUARD = threading.RLock()
+
+
+@contextmanager
+def state_lock(state_dir: Path, exclusive: bool = False) -> Iterator[None]:
+    """Reader/writer-блокировка state/.state.lock, реентерабельная в потоке.
+
+    Вложенный вызов под уже взятой блокировкой не обращается к ОС, другие
+    потоки процесса входят в критическую секцию по очереди. Повысить
+    shared до exclusive нельзя — такой порядок взятия приводил бы к взаимной
+    блокировке двух читателей.
+    """
+
+    key = Path(state_dir).resolve()
+    with _HELD_GUARD:
+        held = _HELD.get(key)
+        if held is not None:
+            if exclusive and not held.exclusive:
+                raise RuntimeError("Нельзя повысить shared-блокировку state до exclusive")
+            held.depth += 1
+        else:
+            fd = _open_lock_file(key / STATE_LOCK_NAME)
+            try:
+                _lock(fd, exclusive)
+            except BaseException:
+                os.close(fd)
+                raise
+            held = _HELD[key] = _HeldLock(fd=fd, exclusive=exclusive, depth=1)
+        try:
+            yield
+        finally:
+            held.depth -= 1
+            if held.depth == 0:
+                del _HELD[key]
+                try:
+                    _unlock(held.fd)
+                finally:
+                    os.close(held.fd)
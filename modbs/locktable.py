@@ -0,0 +1,189 @@
+"""Отсортированный построчный lockfile с разреженным индексом смещений.
+
+Формат state/lockfile.lines: первая строка — JSON-заголовок, далее по
+одной записи ["path", "hash"] на строку в порядке сортировки путей.
+Рядом лежит state/lockfile.lines.idx.json: путь и байтовое смещение
+каждой _SPARSE_EVERY-й записи. Поиск пути — бинарный поиск по индексу
+и чтение одного блока; перебор и diff идут потоком.
+"""
+
+from __future__ import annotations
+
+import bisect
+import io
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from .storage import read_json
+
+SORTED_LOCKFILE_NAME = "lockfile.lines"
+SORTED_INDEX_NAME = "lockfile.lines.idx.json"
+
+# Шаг разреженного индекса: размер индекса — count / _SPARSE_EVERY,
+# поиск читает не больше _SPARSE_EVERY строк.
+_SPARSE_EVERY = 256
+
+Artifact = Tuple[str, str]
+
+
+def write_sorted_lockfile(
+    handle: BinaryIO,
+    header: Mapping[str, Any],
+    artifacts: Iterable[Artifact],
+    every: int = _SPARSE_EVERY,
+) -> Dict[str, Any]:
+    """Пишет артефакты в построчном формате в открытый файл и возвращает индекс.
+
+    Записи пишутся по одной, поэтому память не зависит от размера lockfile.
+    Артефакты должны идти в порядке сортировки путей: на этом держится
+    бинарный поиск и потоковый diff.
+    """
+
+    head = (json.dumps(dict(header), ensure_ascii=False) + "\n").encode("utf-8")
+    handle.write(head)
+    offset = len(head)
+    sparse: List[List[Any]] = []
+    previous: str | None = None
+    count = 0
+
+    for path, file_hash in artifacts:
+        if previous is not None and path <= previous:
+            raise ValueError(f"Артефакты lockfile не отсортированы: {path}")
+        if count % every == 0:
+            sparse.append([path, offset])
+        line = (json.dumps([path, file_hash], ensure_ascii=False) + "\n").encode("utf-8")
+        handle.write(line)
+        offset += len(line)
+        previous = path
+        count += 1
+
+    return {
+        "meta": {"schema": "modbs.lockfile_index.v0"},
+        "count": count,
+        "every": every,
+        "size": offset,
+        "sparse": sparse,
+    }
+
+
+def render_sorted_lockfile(
+    header: Mapping[str, Any],
+    artifacts: Iterable[Artifact],
+    every: int = _SPARSE_EVERY,
+) -> Tuple[str, Dict[str, Any]]:
+    """Кодирует артефакты в построчный формат в памяти и строит индекс."""
+
+    buffer = io.BytesIO()
+    index = write_sorted_lockfile(buffer, header, artifacts, every)
+    return buffer.getvalue().decode("utf-8"), index
+
+
+def _parse_line(line: bytes) -> Artifact:
+    """Разбирает строку записи lockfile."""
+
+    path, file_hash = json.loads(line)
+    return str(path), str(file_hash)
+
+
+def iter_records(handle: BinaryIO) -> Iterator[Artifact]:
+    """Перебирает записи из открытого lockfile.lines, пропуская заголовок.
+
+    Файл заменяется атомарно, поэтому уже открытый дескриптор дочитывает
+    ту версию, которая была на момент открытия.
+    """
+
+    handle.seek(0)
+    handle.readline()
+    for line in handle:
+        if line.strip():
+            yield _parse_line(line)
+
+
+class SortedLockfile:
+    """Чтение lockfile.lines без загрузки всех записей в память."""
+
+    def __init__(self, path: Path, index_path: Path | None = None) -> None:
+        self.path = path
+        index_path = index_path or path.with_name(SORTED_INDEX_NAME)
+        with open(path, "rb") as handle:
+            self.header: Dict[str, Any] = json.loads(handle.readline())
+
+        index = read_json(index_path) if index_path.exists() else {}
+        if index.get("size") != path.stat().st_size:
+            # Индекс потерян или от другой версии файла: строим заново одним проходом.
+            index = self._scan_index(int(index.get("every", _SPARSE_EVERY)))
+        self.count = int(index["count"])
+        self._every = int(index["every"])
+        self._keys = [item[0] for item in index["sparse"]]
+        self._offsets = [int(item[1]) for item in index["sparse"]]
+
+    def _scan_index(self, every: int) -> Dict[str, Any]:
+        """Восстанавливает разреженный индекс по самому файлу."""
+
+        sparse: List[List[Any]] = []
+        count = 0
+        with open(self.path, "rb") as handle:
+            offset = len(handle.readline())
+            for line in handle:
+                if count % every == 0:
+                    sparse.append([_parse_line(line)[0], offset])
+                offset += len(line)
+                count += 1
+        return {"count": count, "every": every, "sparse": sparse}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def lookup(self, rel_path: str) -> str | None:
+        """Возвращает хэш пути или None: O(log n) по индексу + один блок."""
+
+        block = bisect.bisect_right(self._keys, rel_path) - 1
+        if block < 0:
+            return None
+        with open(self.path, "rb") as handle:
+            handle.seek(self._offsets[block])
+            for _ in range(self._every):
+                line = handle.readline()
+                if not line:
+                    return None
+                path, file_hash = _parse_line(line)
+                if path == rel_path:
+                    return file_hash
+                if path > rel_path:
+                    return None
+        return None
+
+    def __iter__(self) -> Iterator[Artifact]:
+        """Перебирает (path, hash) в порядке сортировки."""
+
+        with open(self.path, "rb") as handle:
+            yield from iter_records(handle)
+
+
+def diff_lockfiles(
+    old: Iterable[Artifact],
+    new: Iterable[Artifact],
+) -> Iterator[Tuple[str, str | None, str | None]]:
+    """Потоковый merge-diff двух отсортированных lockfile.
+
+    Выдает (path, старый хэш, новый хэш) только для различающихся путей;
+    None означает, что пути нет в соответствующей стороне.
+    """
+
+    old_iter, new_iter = iter(old), iter(new)
+    old_item = next(old_iter, None)
+    new_item = next(new_iter, None)
+
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+            yield old_item[0], old_item[1], None
+            old_item = next(old_iter, None)
+        elif old_item is None or new_item[0] < old_item[0]:
+            yield new_item[0], None, new_item[1]
+            new_item = next(new_iter, None)
+        else:
+            if old_item[1] != new_item[1]:
+                yield old_item[0], old_item[1], new_item[1]
+            old_item = next(old_iter, None)
+            new_item = next(new_iter, None)
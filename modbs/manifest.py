@@ -0,0 +1,331 @@
+"""Чтение манифеста модов (manifest_path из конфига).
+
+Манифест читается потоково: JSONL построчно, JSON — инкрементальным
+разбором массива записей, так что в памяти одновременно находится одна
+запись. Для точечных запросов строится индекс state/manifest.index.json
+(id → смещение записи в файле, категория и digest → id).
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Tuple
+
+from .storage import read_json, write_json
+
+MANIFEST_INDEX_PATH = Path("state") / "manifest.index.json"
+
+_READ_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+
+# Описание полей записи: имя → (обязательное, допустимые типы).
+_RECORD_SCHEMA: Dict[str, Tuple[bool, Tuple[type, ...]]] = {
+    "id": (False, (str,)),
+    "name": (False, (str,)),
+    "archive": (False, (str,)),
+    "sha256": (False, (str,)),
+    "category": (False, (str,)),
+}
+
+_DIGEST_PATTERN = re.compile(r"^sha256:[0-9a-f]{64}$")
+
+RecordValidator = Callable[[Dict[str, Any], str], Dict[str, Any]]
+
+
+def _normalize_digest(value: Any) -> str | None:
+    """Приводит sha256 к виду 'sha256:<hex>' в нижнем регистре."""
+
+    if not value:
+        return None
+    text = str(value).strip().lower()
+    if not text.startswith("sha256:"):
+        text = f"sha256:{text}"
+    return text
+
+
+def compile_validator(schema: Mapping[str, Tuple[bool, Tuple[type, ...]]] = _RECORD_SCHEMA) -> RecordValidator:
+    """Компилирует схему в функцию проверки одной записи.
+
+    Схема разбирается один раз: на запись остается проход по готовому
+    кортежу проверок без повторной интерпретации описания.
+    """
+
+    required = tuple(name for name, (is_required, _) in schema.items() if is_required)
+    typed = tuple((name, types) for name, (_, types) in schema.items())
+    match_digest = _DIGEST_PATTERN.match
+
+    def _validate(record: Dict[str, Any], where: str) -> Dict[str, Any]:
+        if not isinstance(record, dict):
+            raise ValueError(f"Некорректная запись манифеста ({where}): {record!r}")
+        for name in required:
+            if not record.get(name):
+                raise ValueError(f"Запись манифеста без поля {name} ({where})")
+        for name, types in typed:
+            value = record.get(name)
+            if value is not None and not isinstance(value, types):
+                raise ValueError(f"Поле {name} имеет неверный тип ({where})")
+        entry = dict(record)
+        if "sha256" in entry:
+            entry["sha256"] = _normalize_digest(entry["sha256"])
+            if entry["sha256"] is not None and not match_digest(entry["sha256"]):
+                raise ValueError(f"Некорректный sha256 ({where}): {record['sha256']}")
+        return entry
+
+    return _validate
+
+
+_validate_record = compile_validator()
+
+
+class _JsonStream:
+    """Потоковый читатель JSON поверх байтового файла с учетом смещений.
+
+    Буфер хранит декодированный текст и байтовое смещение отметки в нем;
+    смещение двигается вперед кодированием только пройденного с прошлого
+    запроса куска, поэтому границы значений в файле обходятся линейно.
+    Без track_offsets смещения не считаются вовсе.
+    """
+
+    def __init__(self, handle: Any, track_offsets: bool = True) -> None:
+        self._handle = handle
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._track = track_offsets
+        self._buffer = ""
+        self._pos = 0
+        self._mark = 0
+        self._base = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Дочитывает очередной блок; False — файл закончился."""
+
+        if self._eof:
+            return False
+        chunk = self._handle.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            self._buffer += self._decoder.decode(b"", final=True)
+            return False
+        # Уже разобранная часть буфера отбрасывается, смещение копится в байтах.
+        if self._track:
+            self.offset()
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = self._mark = 0
+        return True
+
+    def offset(self) -> int:
+        """Байтовое смещение текущей позиции в файле (-1 без track_offsets)."""
+
+        if not self._track:
+            return -1
+        self._base += len(self._buffer[self._mark:self._pos].encode("utf-8"))
+        self._mark = self._pos
+        return self._base
+
+    def _where(self) -> str:
+        """Позиция для сообщения об ошибке."""
+
+        return f" (байт {self.offset()})" if self._track else ""
+
+    def peek(self) -> str:
+        """Возвращает следующий непробельный символ ('' в конце файла)."""
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Пропускает ожидаемый символ-разделитель."""
+
+        if self.peek() != char:
+            raise ValueError(f"Некорректный JSON манифеста: ожидался '{char}'{self._where()}")
+        self._pos += 1
+
+    def value(self) -> Tuple[Any, int, int]:
+        """Разбирает одно JSON-значение: (значение, начало, конец) в байтах."""
+
+        self.peek()
+        where = self._where()
+        start = self.offset()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Значение обрезано границей блока — дочитываем и пробуем снова.
+                if not self._fill():
+                    raise ValueError(f"Оборванный JSON манифеста{where}") from None
+                continue
+            if end == len(self._buffer) and not self._eof and self._fill():
+                # Число на границе блока могло быть прочитано не целиком.
+                continue
+            self._pos = end
+            return value, start, self.offset()
+
+
+def _iter_json_records(path: Path, offsets: bool = True) -> Iterator[Tuple[Any, int, int]]:
+    """Потоково перебирает записи JSON-манифеста: список или {"mods": [...]}.
+
+    Без offsets границы записей не считаются (-1).
+    """
+
+    with open(path, "rb") as handle:
+        stream = _JsonStream(handle, track_offsets=offsets)
+        head = stream.peek()
+        if head == "{":
+            stream.expect("{")
+            while True:
+                if stream.peek() == "}":
+                    return
+                key, _, _ = stream.value()
+                stream.expect(":")
+                if key == "mods":
+                    break
+                stream.value()
+                if stream.peek() == ",":
+                    stream.expect(",")
+        elif head != "[":
+            raise ValueError(f"Некорректный манифест: {path}")
+
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value()
+            if stream.peek() == ",":
+                stream.expect(",")
+                continue
+            stream.expect("]")
+            return
+
+
+def _iter_jsonl_records(path: Path) -> Iterator[Tuple[Any, int, int]]:
+    """Построчно перебирает записи JSONL-манифеста."""
+
+    offset = 0
+    with open(path, "rb") as handle:
+        for line in handle:
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"Некорректная строка манифеста (байт {start})") from exc
+            yield record, start, start + len(line.rstrip(b"\r\n"))
+
+
+def _iter_raw_records(path: Path, offsets: bool = True) -> Iterator[Tuple[Any, int, int]]:
+    """Выбирает потоковый читатель по расширению файла."""
+
+    if path.suffix.lower() == ".jsonl":
+        return _iter_jsonl_records(path)
+    return _iter_json_records(path, offsets)
+
+
+def iter_manifest(path: Path) -> Iterator[Dict[str, Any]]:
+    """Перебирает проверенные записи манифеста, не загружая его целиком.
+
+    Поддерживаются JSONL и JSON-документ: список записей или {"mods": [...]}.
+    Поле sha256 нормализуется к формату lockfile. Смещения записей здесь
+    не нужны и для JSON не считаются.
+    """
+
+    for number, (record, start, _) in enumerate(_iter_raw_records(path, offsets=False), start=1):
+        where = f"байт {start}" if start >= 0 else f"запись {number}"
+        yield _validate_record(record, f"{path.name}, {where}")
+
+
+class ManifestIndex:
+    """Индекс манифеста на диске: точечные запросы без чтения всех записей."""
+
+    def __init__(self, source: Path, payload: Mapping[str, Any]) -> None:
+        self._source = source
+        self._by_id: Dict[str, List[int]] = payload.get("by_id", {})
+        self._by_category: Dict[str, List[str]] = payload.get("by_category", {})
+        self._by_digest: Dict[str, List[str]] = payload.get("by_digest", {})
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, mod_id: object) -> bool:
+        return mod_id in self._by_id
+
+    def get(self, mod_id: str) -> Dict[str, Any] | None:
+        """Читает одну запись по id через seek к ее смещению."""
+
+        location = self._by_id.get(mod_id)
+        if location is None:
+            return None
+        start, end = location
+        with open(self._source, "rb") as handle:
+            handle.seek(start)
+            raw = handle.read(end - start)
+        return _validate_record(json.loads(raw), f"{self._source.name}, байт {start}")
+
+    def ids_by_category(self, category: str) -> List[str]:
+        """Возвращает id модов категории."""
+
+        return list(self._by_category.get(category, []))
+
+    def ids_by_digest(self, digest: str) -> List[str]:
+        """Возвращает id модов с указанным sha256 архива."""
+
+        return list(self._by_digest.get(_normalize_digest(digest) or "", []))
+
+
+def build_manifest_index(manifest_path: Path, index_path: Path) -> ManifestIndex:
+    """Строит (или переиспользует) индекс манифеста.
+
+    Индекс пересобирается одним потоковым проходом, только если размер
+    или mtime манифеста изменились.
+    """
+
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Не найден манифест: {manifest_path}")
+
+    stat = manifest_path.stat()
+    source = {"path": str(manifest_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if index_path.exists():
+        payload = read_json(index_path)
+        if payload.get("source") == source:
+            return ManifestIndex(manifest_path, payload)
+
+    by_id: Dict[str, List[int]] = {}
+    by_category: Dict[str, List[str]] = {}
+    by_digest: Dict[str, List[str]] = {}
+    for record, start, end in _iter_raw_records(manifest_path):
+        entry = _validate_record(record, f"{manifest_path.name}, байт {start}")
+        mod_id = entry.get("id")
+        if not mod_id:
+            raise ValueError(f"Запись манифеста без поля id ({manifest_path.name}, байт {start})")
+        if mod_id in by_id:
+            raise ValueError(f"Повторяющийся id в манифесте: {mod_id}")
+        by_id[mod_id] = [start, end]
+        if entry.get("category"):
+            by_category.setdefault(entry["category"], []).append(mod_id)
+        if entry.get("sha256"):
+            by_digest.setdefault(entry["sha256"], []).append(mod_id)
+
+    payload = {
+        "meta": {"schema": "modbs.manifest_index.v0"},
+        "source": source,
+        "by_id": by_id,
+        "by_category": by_category,
+        "by_digest": by_digest,
+    }
+    write_json(index_path, payload)
+    return ManifestIndex(manifest_path, payload)
+
+
+def load_manifest_index(root_path: Path, manifest_path: Path) -> ManifestIndex:
+    """Индекс манифеста сборки в state/manifest.index.json."""
+
+    return build_manifest_index(manifest_path, root_path / MANIFEST_INDEX_PATH)
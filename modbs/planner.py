@@ -2,11 +2,38 @@
 
 from __future__ import annotations
 
-from typing import Dict
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping
 
+from .fsops import sha256_file
 from .models import EdgeIR, PlanIR, StepIR
 
 
+# Ключи инвалидации, от которых зависит шаг (impact contract): при
+# инкрементальном плане шаг остается, только если один из них затронут.
+# Шаги без записи выполняются всегда.
+STEP_CONSUMES: Dict[str, tuple[str, ...]] = {
+    "WriteMO2Profile": ("LoadOrder",),
+    "RunLOOT": ("LoadOrder",),
+    "RunXEditQAC": ("XEditOutput",),
+    "DeployProfile": ("DeployOutput",),
+    "RootApply": ("RootState",),
+    "RootVerify": ("RootState",),
+}
+
+
+# Версия планировщика: входит в отпечаток плана, поэтому изменение
+# шаблона шагов или STEP_CONSUMES делает устаревшими прежние отпечатки.
+PLANNER_VERSION = "1.0"
+
+
+# Отпечаток плана на момент последнего Checkpoint: точка отсчета для
+# изменений конфига в инкрементальном плане (как снимок — для файлов).
+CHECKPOINT_PLAN_PATH = Path("state") / "checkpoint.plan.json"
+
+
 def _build_linear_edges(step_ids: list[str]) -> list[EdgeIR]:
     """Создает линейные ребра по порядку шагов."""
 
@@ -16,11 +43,50 @@ def _build_linear_edges(step_ids: list[str]) -> list[EdgeIR]:
     ]
 
 
-def generate_plan(config: Dict[str, object]) -> PlanIR:
+def plan_inputs(config: Mapping[str, Any], root_path: Path) -> List[Path]:
+    """Файлы, на которые ссылается конфиг: манифест модов и правила LOOT.
+
+    Относительные пути считаются от корня сборки.
+    """
+
+    references: List[Any] = [config.get("manifest_path")]
+    loot = config.get("loot", {})
+    if isinstance(loot, Mapping):
+        references.append(loot.get("rules"))
+    return [root_path / str(reference) for reference in references if reference]
+
+
+def plan_fingerprint(config: Mapping[str, Any], root_path: Path) -> str:
+    """Отпечаток входов планировщика: версия, конфиг и содержимое файлов-ссылок."""
+
+    inputs = {
+        str(path): sha256_file(path) if path.is_file() else "missing"
+        for path in plan_inputs(config, root_path)
+    }
+    payload = json.dumps(
+        {"planner": PLANNER_VERSION, "config": config, "inputs": inputs},
+        sort_keys=True,
+        default=str,
+    )
+    return f"sha256:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def generate_plan(
+    config: Dict[str, object],
+    fingerprint: str | None = None,
+    config_ref: str | None = None,
+    invalidates: Iterable[str] | None = None,
+) -> PlanIR:
     """Генерирует базовый Plan IR с линейным списком шагов.
 
     Шаги идут строго в порядке:
     WorkspaceInit → WriteMO2Profile → RunLOOT → Checkpoint → Report.
+    Каждый шаг шаблона зависит от предыдущего, поэтому волны исполнителя
+    здесь шириной в один шаг: удаленные worker разгружают coordinator,
+    но параллелизма не дают (он появляется в планах с независимыми шагами).
+    Если задан config_ref, meta хранит ссылку на конфиг и отпечаток
+    вместо копии конфига. С invalidates (ключи из ArtifactClassify) в
+    плане остаются только шаги, зависящие от затронутых ключей.
     """
 
     steps = [
@@ -30,11 +96,24 @@ def generate_plan(config: Dict[str, object]) -> PlanIR:
         StepIR(step_id="checkpoint", step_type="Checkpoint", label="Сделать контрольную точку"),
         StepIR(step_id="report", step_type="Report", label="Сформировать отчет"),
     ]
+    if invalidates is not None:
+        keys = set(invalidates)
+        steps = [
+            step
+            for step in steps
+            if step.step_type not in STEP_CONSUMES or keys.intersection(STEP_CONSUMES[step.step_type])
+        ]
     step_ids = [step.step_id for step in steps]
     edges = _build_linear_edges(step_ids)
-    meta = {
-        "version": "1.0",
+    meta: Dict[str, Any] = {
+        "version": PLANNER_VERSION,
         "generator": "modbs.generate_plan",
-        "config": config,
     }
+    if invalidates is not None:
+        meta["invalidates"] = sorted(keys)
+    if config_ref is not None:
+        meta["config_ref"] = config_ref
+        meta["fingerprint"] = fingerprint
+    else:
+        meta["config"] = config
     return PlanIR(meta=meta, steps=steps, edges=edges)
@@ -0,0 +1,250 @@
+"""Чтение заголовков плагинов (TES4) через mmap и граф зависимостей от masters."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+from .archives import load_install_hints
+from .conflicts import mod_priority
+from .storage import read_json, write_json
+
+PLUGIN_EXTENSIONS = {".esp", ".esm", ".esl"}
+
+# Мастера базовой игры лежат в Data/ Stock Game, а не в workspace/mods.
+BASE_GAME_MASTERS = {
+    "skyrim.esm",
+    "update.esm",
+    "dawnguard.esm",
+    "hearthfires.esm",
+    "dragonborn.esm",
+}
+
+PLUGINS_CACHE_PATH = Path("state") / "plugins.cache.json"
+
+_RECORD_HEADER_SIZE = 24
+_FLAG_MASTER = 0x1
+_FLAG_LOCALIZED = 0x80
+_FLAG_LIGHT = 0x200
+
+
+class MissingMasterError(RuntimeError):
+    """Плагину не хватает master-файлов (категория MissingMaster)."""
+
+
+@dataclass(frozen=True)
+class PluginHeader:
+    """Данные заголовка TES4, нужные для порядка загрузки."""
+
+    name: str
+    path: str
+    masters: List[str] = field(default_factory=list)
+    flags: int = 0
+    is_master: bool = False
+    is_light: bool = False
+    is_localized: bool = False
+    version: float = 0.0
+
+
+def _parse_header_bytes(data: Any, name: str, rel_path: str) -> PluginHeader:
+    """Разбирает запись TES4 из буфера (mmap или bytes)."""
+
+    if len(data) < _RECORD_HEADER_SIZE or data[0:4] != b"TES4":
+        raise ValueError(f"Некорректный заголовок плагина: {rel_path}")
+
+    data_size, flags = struct.unpack_from("<II", data, 4)
+    end = _RECORD_HEADER_SIZE + data_size
+    if end > len(data):
+        raise ValueError(f"Оборванный заголовок плагина: {rel_path}")
+
+    masters: List[str] = []
+    version = 0.0
+    offset = _RECORD_HEADER_SIZE
+    pending_size: int | None = None
+
+    while offset + 6 <= end:
+        sub_type = bytes(data[offset:offset + 4])
+        (size,) = struct.unpack_from("<H", data, offset + 4)
+        offset += 6
+        if pending_size is not None:
+            # XXXX задает размер следующего подзаписи, не влезающий в uint16.
+            size, pending_size = pending_size, None
+        payload = data[offset:offset + size]
+
+        if sub_type == b"XXXX":
+            (pending_size,) = struct.unpack_from("<I", payload, 0)
+        elif sub_type == b"MAST":
+            masters.append(bytes(payload).rstrip(b"\0").decode("cp1252"))
+        elif sub_type == b"HEDR" and size >= 4:
+            (version,) = struct.unpack_from("<f", payload, 0)
+        offset += size
+
+    extension = Path(name).suffix.lower()
+    return PluginHeader(
+        name=name,
+        path=rel_path,
+        masters=masters,
+        flags=flags,
+        is_master=bool(flags & _FLAG_MASTER) or extension in {".esm", ".esl"},
+        is_light=bool(flags & _FLAG_LIGHT) or extension == ".esl",
+        is_localized=bool(flags & _FLAG_LOCALIZED),
+        version=round(version, 2),
+    )
+
+
+def parse_plugin_header(path: Path, rel_path: str | None = None) -> PluginHeader:
+    """Читает только запись TES4 плагина через mmap.
+
+    Отображение ленивое: с диска подтягиваются лишь страницы заголовка,
+    остальной плагин (иногда сотни МБ) не читается.
+    """
+
+    rel = rel_path or path.name
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < _RECORD_HEADER_SIZE:
+            raise ValueError(f"Некорректный заголовок плагина: {rel}")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return _parse_header_bytes(view, path.name, rel)
+
+
+def iter_mod_plugins(mods_dir: Path) -> Iterable[Path]:
+    """Перебирает плагины в корне каждого мода workspace/mods/<mod>/."""
+
+    if not mods_dir.is_dir():
+        return
+    for mod_entry in sorted(os.scandir(mods_dir), key=lambda entry: entry.name):
+        if not mod_entry.is_dir() or mod_entry.name.startswith("."):
+            # .staging-*/.old-* — служебные каталоги установки.
+            continue
+        for entry in sorted(os.scandir(mod_entry.path), key=lambda item: item.name):
+            if entry.is_file() and Path(entry.name).suffix.lower() in PLUGIN_EXTENSIONS:
+                yield Path(entry.path)
+
+
+def scan_plugins(root_path: Path, priority: Sequence[str] | None = None) -> Dict[str, PluginHeader]:
+    """Читает заголовки всех плагинов workspace/mods с кэшированием.
+
+    Разобранные заголовки кэшируются по sha256 файла, если он известен из
+    манифеста установки (переустановка того же архива не требует разбора),
+    иначе по (path, size, mtime). Быстрый путь — совпадение stat с прошлым
+    сканированием. Возвращает имя в нижнем регистре → заголовок.
+
+    Если одно имя плагина есть в нескольких модах, берется заголовок мода,
+    выигрывающего по priority (как в индексе конфликтов: последний в
+    списке; моды вне списка проигрывают). Без priority — все моды по алфавиту.
+    """
+
+    if priority is None:
+        priority = mod_priority(root_path, None)
+    rank = {mod: index for index, mod in enumerate(priority)}
+    winners: Dict[str, tuple[int, str]] = {}
+
+    cache_path = root_path / PLUGINS_CACHE_PATH
+    cache: Dict[str, Any] = read_json(cache_path) if cache_path.exists() else {}
+    cached_stats: Dict[str, Any] = cache.get("by_path", {})
+    cached_headers: Dict[str, Any] = cache.get("headers", {})
+    hints: Dict[str, Dict[str, Any]] | None = None
+
+    headers: Dict[str, PluginHeader] = {}
+    by_path: Dict[str, Any] = {}
+    header_entries: Dict[str, Any] = {}
+
+    for path in iter_mod_plugins(root_path / "workspace" / "mods"):
+        rel_path = path.relative_to(root_path).as_posix()
+        stat = path.stat()
+
+        previous = cached_stats.get(rel_path, {})
+        if previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            key = str(previous["key"])
+        else:
+            if hints is None:
+                hints = load_install_hints(root_path)
+            hint = hints.get(rel_path, {})
+            if hint.get("size") == stat.st_size and hint.get("mtime_ns") == stat.st_mtime_ns:
+                key = str(hint["hash"])
+            else:
+                key = f"{rel_path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+        if key in cached_headers:
+            header = PluginHeader(**{**cached_headers[key], "name": path.name, "path": rel_path})
+        else:
+            header = parse_plugin_header(path, rel_path)
+
+        by_path[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "key": key}
+        header_entries[key] = asdict(header)
+        name = path.name.lower()
+        mod_key = (rank.get(path.parent.name, -1), path.parent.name)
+        if name not in winners or mod_key > winners[name]:
+            winners[name] = mod_key
+            headers[name] = header
+
+    if by_path != cached_stats or header_entries != cached_headers:
+        write_json(
+            cache_path,
+            {
+                "meta": {"schema": "modbs.plugins_cache.v0"},
+                "by_path": by_path,
+                "headers": header_entries,
+            },
+        )
+    return headers
+
+
+def build_master_graph(headers: Mapping[str, PluginHeader]) -> Dict[str, List[str]]:
+    """Строит граф: плагин (lower) → список его masters (lower)."""
+
+    return {
+        name: [master.lower() for master in header.masters]
+        for name, header in sorted(headers.items())
+    }
+
+
+def find_missing_masters(
+    headers: Mapping[str, PluginHeader],
+    available: Iterable[str] = (),
+) -> Dict[str, List[str]]:
+    """Возвращает плагины, у которых есть отсутствующие masters."""
+
+    known = set(headers) | BASE_GAME_MASTERS | {name.lower() for name in available}
+    missing: Dict[str, List[str]] = {}
+    for name, header in sorted(headers.items()):
+        absent = [master for master in header.masters if master.lower() not in known]
+        if absent:
+            missing[header.name] = absent
+    return missing
+
+
+def list_game_plugins(game_data_dir: Path | None) -> List[str]:
+    """Возвращает имена плагинов из Data/ игры (только листинг, без чтения)."""
+
+    if game_data_dir is None or not game_data_dir.is_dir():
+        return []
+    return [
+        entry.name
+        for entry in os.scandir(game_data_dir)
+        if entry.is_file() and Path(entry.name).suffix.lower() in PLUGIN_EXTENSIONS
+    ]
+
+
+def check_masters(
+    root_path: Path,
+    game_data_dir: Path | None = None,
+    profile_name: str | None = None,
+) -> Dict[str, PluginHeader]:
+    """Сканирует плагины и выбрасывает MissingMasterError при пропусках.
+
+    Дубликаты имен плагинов разрешаются по приоритету модов профиля.
+    """
+
+    headers = scan_plugins(root_path, mod_priority(root_path, profile_name))
+    missing = find_missing_masters(headers, list_game_plugins(game_data_dir))
+    if missing:
+        details = "; ".join(
+            f"{plugin}: {', '.join(masters)}" for plugin, masters in missing.items()
+        )
+        raise MissingMasterError(f"MissingMaster: {details}")
+    return headers
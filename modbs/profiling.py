@@ -0,0 +1,79 @@
+"""Опциональный cProfile для шагов apply и выборка горячих функций для отчета."""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .models import StepIR
+
+PROFILES_DIR = Path("state") / "profiles"
+
+DEFAULT_TOP_N = 10
+
+
+def wrap_profiled_handler(
+    handler: Callable[[StepIR, Dict[str, Any]], None],
+    profile_dir: Path,
+) -> Callable[[StepIR, Dict[str, Any]], None]:
+    """Оборачивает handler в cProfile и сохраняет <step_id>.pstats.
+
+    Профиль пишется и при ошибке шага: медленный упавший шаг тоже
+    интересен.
+    """
+
+    def _wrapper(step: StepIR, ctx: Dict[str, Any]) -> None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            handler(step, ctx)
+        finally:
+            profiler.disable()
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(profile_dir / f"{step.step_id}.pstats"))
+
+    return _wrapper
+
+
+def top_functions(pstats_path: Path, limit: int = DEFAULT_TOP_N) -> List[Dict[str, Any]]:
+    """Возвращает top-N функций по кумулятивному времени."""
+
+    stats = pstats.Stats(str(pstats_path))
+    rows: List[Dict[str, Any]] = []
+    for (filename, line, function), (_, calls, _, cumulative, _) in stats.stats.items():  # type: ignore[attr-defined]
+        if function == "<method 'disable' of '_lsprof.Profiler' objects>":
+            continue
+        rows.append(
+            {
+                "function": function,
+                "location": f"{Path(filename).name}:{line}" if line else filename,
+                "calls": calls,
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda row: (-row["cumulative_ms"], row["location"], row["function"]))
+    return rows[:limit]
+
+
+def latest_profiles(root_path: Path, limit: int = DEFAULT_TOP_N) -> Dict[str, Any]:
+    """Собирает горячие функции последнего профилированного запуска.
+
+    Каталоги запусков называются run_id (UTC-время), поэтому последний —
+    максимальный по имени. Шаги идут в порядке записи профилей.
+    """
+
+    profiles_dir = root_path / PROFILES_DIR
+    if not profiles_dir.is_dir():
+        return {}
+    runs = sorted(path for path in profiles_dir.iterdir() if path.is_dir())
+    if not runs:
+        return {}
+
+    run_dir = runs[-1]
+    files = sorted(run_dir.glob("*.pstats"), key=lambda path: path.stat().st_mtime_ns)
+    return {
+        "run_id": run_dir.name,
+        "steps": {path.stem: top_functions(path, limit) for path in files},
+    }
@@ -0,0 +1,443 @@
+"""Распределенное выполнение шагов: coordinator и worker по TCP.
+
+Worker (modbs worker) слушает порт и выполняет шаги над тем же рабочим
+каталогом, смонтированным у него локально. Протокол — JSON-строки:
+
+- worker → coordinator: {"type": "hello", "worker_id", "cached": [...]};
+- coordinator → worker: {"type": "run", "step": {...}, "ctx": {...}};
+- worker → coordinator: {"type": "event", ...} при старте шага,
+  {"type": "heartbeat"} каждые HEARTBEAT_INTERVAL секунд, пока шаг идет,
+  и {"type": "result", "status", "message", "metrics", ...} по завершении.
+
+Журнал пишет только coordinator: события worker приходят по сокету,
+поэтому в общий job.journal.jsonl не пишут несколько машин сразу.
+Worker, от которого дольше heartbeat_timeout нет ни одного сообщения,
+считается потерянным, и шаг переназначается другому. Worker выполняет
+шаг под state/.steps/<step_id>.lock в общем рабочем каталоге, поэтому
+если прежний worker на самом деле жив (пропала только сеть), новый ждет
+его завершения, а не распаковывает тот же архив одновременно с ним.
+Шаг, вышедший за step_timeout, не переназначается, а завершается с
+ошибкой: worker, судя по heartbeat, жив и продолжает его выполнять.
+
+Параллельно выполняются только шаги одной волны исполнителя. Шаблонный
+план generate_plan линеен (каждый шаг зависит от предыдущего), поэтому
+с ним worker разгружают coordinator, но шире одного шага волна не
+бывает; параллелизм дают планы с настоящими зависимостями (например,
+независимые VerifyDownload/Extract по разным архивам).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Mapping, Tuple
+
+from .executor import ALLOWED_STEP_TYPES, StepBlockedError, StepHandler
+from .locking import step_lock
+from .models import StepIR
+
+# Типы шагов, которые по умолчанию уходят на worker: хэширование,
+# распаковка и внешние инструменты. Шаги, меняющие state/ целиком
+# (Checkpoint, Report), всегда выполняются на coordinator.
+DEFAULT_REMOTE_STEP_TYPES = ("VerifyDownload", "Extract", "InstallToManager", "RunLOOT")
+
+# Ключи контекста, передаваемые worker; root_path у worker свой.
+REMOTE_CTX_KEYS = (
+    "run_id",
+    "profile_name",
+    "loot_mode",
+    "loot_rules",
+    "loot_fallback",
+    "durability",
+    "lockfile_format",
+    "manifest_path",
+    "remote_cache",
+    "xedit",
+)
+
+# Поля payload, по которым шаг привязывается к worker с прогретым кэшем.
+_INPUT_FIELDS = ("archive", "archives", "mod", "mods", "mod_ids", "plugin", "plugins")
+
+# Worker шлет heartbeat во время шага; coordinator ждет любое сообщение
+# не дольше HEARTBEAT_TIMEOUT (несколько пропущенных heartbeat подряд).
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+EventSink = Callable[[StepIR, Dict[str, Any]], None]
+
+
+class WorkerLostError(ConnectionError):
+    """Worker закрыл соединение или перестал отвечать."""
+
+
+class StepDeadlineError(RuntimeError):
+    """Шаг на живом worker вышел за step_timeout."""
+
+
+def _utc_timestamp() -> str:
+    """Возвращает ISO-строку с текущим временем UTC."""
+
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _send(stream: BinaryIO, message: Mapping[str, Any]) -> None:
+    """Отправляет одно сообщение протокола."""
+
+    stream.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def _receive(stream: BinaryIO) -> Dict[str, Any]:
+    """Читает одно сообщение протокола."""
+
+    line = stream.readline()
+    if not line:
+        raise WorkerLostError("Соединение закрыто")
+    return json.loads(line)
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """Разбирает адрес вида host:port."""
+
+    host, separator, port = value.rpartition(":")
+    if not separator or not host or not port.isdigit():
+        raise ValueError(f"Некорректный адрес host:port: {value}")
+    return host, int(port)
+
+
+def step_input_keys(step: StepIR) -> List[str]:
+    """Возвращает ключи входов шага (архивы, моды, плагины)."""
+
+    keys: set[str] = set()
+    for name in _INPUT_FIELDS:
+        value = step.payload.get(name)
+        if isinstance(value, str):
+            keys.add(value)
+        elif isinstance(value, list):
+            keys.update(str(item) for item in value)
+    for entry in step.payload.get("entries", []) or []:
+        if isinstance(entry, Mapping) and entry.get("archive"):
+            keys.add(str(entry["archive"]))
+    return sorted(keys)
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    """TCP-сервер worker: выполняет присланные шаги по одному."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(
+        self,
+        root_path: Path,
+        handlers: Mapping[str, StepHandler],
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        worker_id: str | None = None,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+    ) -> None:
+        self.root_path = root_path
+        self.handlers = dict(handlers)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.cached: set[str] = set()
+        self._run_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        super().__init__(address, _WorkerRequestHandler)
+
+    @property
+    def address(self) -> str:
+        """Адрес, на котором слушает worker (host:port)."""
+
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def run_step(self, message: Mapping[str, Any], stream: BinaryIO) -> Dict[str, Any]:
+        """Выполняет шаг из сообщения run и возвращает сообщение result."""
+
+        step = StepIR(**message["step"])
+        ctx: Dict[str, Any] = dict(message.get("ctx", {}))
+        ctx["root_path"] = self.root_path
+
+        handler = self.handlers.get(step.step_type)
+        if step.step_type not in ALLOWED_STEP_TYPES or handler is None:
+            return {
+                "type": "result",
+                "ts": _utc_timestamp(),
+                "status": "Failed",
+                "message": f"Worker не выполняет шаги типа {step.step_type}",
+                "metrics": {},
+            }
+
+        # Heartbeat идет и в ожидании _run_lock: занятый worker жив.
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stream, stop), daemon=True)
+        heartbeat.start()
+        try:
+            return self._run_locked(step, ctx, handler, stream)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _heartbeat(self, stream: BinaryIO, stop: threading.Event) -> None:
+        """Шлет heartbeat, пока не выставлен stop."""
+
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                with self._send_lock:
+                    _send(stream, {"type": "heartbeat", "ts": _utc_timestamp()})
+            except OSError:
+                return
+
+    def _run_locked(
+        self,
+        step: StepIR,
+        ctx: Dict[str, Any],
+        handler: StepHandler,
+        stream: BinaryIO,
+    ) -> Dict[str, Any]:
+        """Выполняет шаг под _run_lock: worker исполняет шаги по одному.
+
+        step_lock ограждает шаг от второго экземпляра на другом worker,
+        которому coordinator переназначил его после потери связи.
+        """
+
+        with self._run_lock, step_lock(self.root_path, step.step_id):
+            with self._send_lock:
+                _send(
+                    stream,
+                    {
+                        "type": "event",
+                        "ts": _utc_timestamp(),
+                        "status": "Running",
+                        "message": "Старт шага",
+                        "metrics": {},
+                    },
+                )
+            started = time.perf_counter()
+            result: Dict[str, Any] = {"type": "result", "status": "Succeeded", "message": "Шаг выполнен"}
+            try:
+                handler(step, ctx)
+            except StepBlockedError as exc:
+                result.update(
+                    status="Blocked",
+                    message=str(exc),
+                    next_action_at=exc.next_action_at,
+                    source=exc.source,
+                )
+            except Exception as exc:  # noqa: BLE001
+                result.update(status="Failed", message=str(exc))
+            else:
+                self.cached.update(step_input_keys(step))
+
+        result["ts"] = _utc_timestamp()
+        result["metrics"] = {"duration_ms": round((time.perf_counter() - started) * 1000, 3)}
+        return result
+
+
+class _WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """Одно соединение coordinator с worker."""
+
+    server: WorkerServer
+
+    def handle(self) -> None:
+        server = self.server
+        _send(self.wfile, {"type": "hello", "worker_id": server.worker_id, "cached": sorted(server.cached)})
+        while True:
+            try:
+                message = _receive(self.rfile)
+            except (WorkerLostError, OSError):
+                return
+            if message.get("type") != "run":
+                return
+            _send(self.wfile, server.run_step(message, self.wfile))
+
+
+class _WorkerLink:
+    """Соединение coordinator с одним worker."""
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.worker_id = address
+        self.cached: set[str] = set()
+        self.alive = False
+        self.busy = False
+        self._socket: socket.socket | None = None
+        self._stream: BinaryIO | None = None
+
+    def connect(self, timeout: float, heartbeat_timeout: float = HEARTBEAT_TIMEOUT) -> None:
+        """Подключается и читает hello."""
+
+        self._socket = socket.create_connection(parse_address(self.address), timeout=timeout)
+        # Шаг может идти долго, но worker шлет heartbeat: тишина дольше
+        # heartbeat_timeout означает, что worker или сеть пропали.
+        self._socket.settimeout(heartbeat_timeout)
+        # Keepalive закрывает полуоткрытое соединение и на простое между шагами.
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._stream = self._socket.makefile("rwb")
+        hello = _receive(self._stream)
+        self.worker_id = str(hello.get("worker_id") or self.address)
+        self.cached.update(hello.get("cached", []))
+        self.alive = True
+
+    def close(self) -> None:
+        """Закрывает соединение."""
+
+        self.alive = False
+        for item in (self._stream, self._socket):
+            if item is not None:
+                try:
+                    item.close()
+                except OSError:
+                    pass
+        self._stream = self._socket = None
+
+    def run(
+        self,
+        step: StepIR,
+        ctx: Mapping[str, Any],
+        on_event: EventSink,
+        step_timeout: float | None = None,
+    ) -> Dict[str, Any]:
+        """Отправляет шаг и транслирует события до итогового result.
+
+        Тишина дольше heartbeat_timeout (socket.timeout) дает OSError,
+        выход за step_timeout — StepDeadlineError.
+        """
+
+        if self._stream is None:
+            raise WorkerLostError(f"Нет соединения с worker {self.address}")
+        deadline = time.monotonic() + step_timeout if step_timeout else None
+        _send(self._stream, {"type": "run", "step": asdict(step), "ctx": dict(ctx)})
+        while True:
+            message = _receive(self._stream)
+            if deadline is not None and time.monotonic() > deadline:
+                raise StepDeadlineError(
+                    f"Worker {self.worker_id} не уложился в {step_timeout} с: {step.step_id}"
+                )
+            if message.get("type") == "heartbeat":
+                continue
+            message.setdefault("metrics", {})["worker"] = self.worker_id
+            on_event(step, message)
+            if message.get("type") == "result":
+                return message
+
+
+class Coordinator:
+    """Раздает шаги worker с учетом кэша входов и переживает потерю worker.
+
+    run_step совместим с StepHandler, поэтому coordinator подставляется в
+    handlers исполнителя для выбранных типов шагов.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[str],
+        on_event: EventSink | None = None,
+        connect_timeout: float = 5.0,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        step_timeout: float | None = None,
+    ) -> None:
+        self._links = [_WorkerLink(address) for address in addresses]
+        self._on_event = on_event or (lambda step, event: None)
+        self._connect_timeout = connect_timeout
+        self._heartbeat_timeout = heartbeat_timeout
+        self._step_timeout = step_timeout
+        self._condition = threading.Condition()
+
+    def connect(self) -> int:
+        """Подключается к worker и возвращает число доступных."""
+
+        for link in self._links:
+            try:
+                link.connect(self._connect_timeout, self._heartbeat_timeout)
+            except (OSError, ValueError):
+                link.close()
+        alive = sum(1 for link in self._links if link.alive)
+        if not alive:
+            raise RuntimeError("Нет доступных worker")
+        return alive
+
+    def close(self) -> None:
+        """Закрывает все соединения."""
+
+        for link in self._links:
+            link.close()
+
+    def __enter__(self) -> "Coordinator":
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def alive_workers(self) -> List[str]:
+        """worker_id подключенных worker."""
+
+        return [link.worker_id for link in self._links if link.alive]
+
+    def _acquire(self, keys: List[str]) -> _WorkerLink:
+        """Выбирает свободный worker с наибольшим пересечением кэша и входов."""
+
+        with self._condition:
+            while True:
+                alive = [link for link in self._links if link.alive]
+                if not alive:
+                    raise RuntimeError("Нет доступных worker")
+                idle = [link for link in alive if not link.busy]
+                if idle:
+                    link = max(idle, key=lambda item: len(item.cached.intersection(keys)))
+                    link.busy = True
+                    return link
+                self._condition.wait()
+
+    def _release(self, link: _WorkerLink) -> None:
+        """Возвращает worker в пул свободных."""
+
+        with self._condition:
+            link.busy = False
+            self._condition.notify_all()
+
+    def run_step(self, step: StepIR, ctx: Dict[str, Any]) -> None:
+        """Выполняет шаг на worker; при потере worker шаг переназначается.
+
+        Выход за step_timeout завершает шаг с ошибкой без переназначения:
+        worker продолжает его выполнять, и второй экземпляр только ждал бы
+        его step_lock.
+        """
+
+        keys = step_input_keys(step)
+        remote_ctx = {key: ctx[key] for key in REMOTE_CTX_KEYS if key in ctx}
+
+        while True:
+            link = self._acquire(keys)
+            try:
+                result = link.run(step, remote_ctx, self._on_event, self._step_timeout)
+            except StepDeadlineError:
+                # Соединение посреди шага больше не пригодно для протокола.
+                link.close()
+                self._release(link)
+                raise
+            except (OSError, ValueError):
+                # Worker пропал или замолчал: помечаем и отдаем шаг другому,
+                # step_lock не даст ему начать, пока прежний экземпляр жив.
+                link.close()
+                self._release(link)
+                continue
+            link.cached.update(keys)
+            self._release(link)
+            break
+
+        status = result.get("status")
+        message = str(result.get("message", ""))
+        if status == "Blocked":
+            raise StepBlockedError(message, result.get("next_action_at"), result.get("source"))
+        if status != "Succeeded":
+            raise RuntimeError(message or f"Шаг {step.step_id} завершился на worker с ошибкой")
@@ -0,0 +1,338 @@
+"""Удаленный кэш действий и blob по digest (HTTP) и эталонный сервер.
+
+Протокол:
+
+- GET/PUT /cas/<hex> — blob по sha256 содержимого (сервер проверяет digest);
+- POST /cas/missing {"digests": [...]} → {"missing": [...]} — пакетная проверка;
+- GET/PUT /ac/<hex> — результат действия (JSON) по ключу действия;
+- POST /ac/batch {"keys": [...]} → {"results": {key: result}} — пакетный поиск.
+
+Клиент не бросает ничего, кроме RemoteCacheError (включая обрывы
+ответа — http.client.IncompleteRead — и ответы неверной формы):
+вызывающий код при ошибке кэша просто выполняет действие локально.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import io
+import json
+import os
+import re
+import tempfile
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+# Версия схемы ключей: смена формата результатов инвалидирует старые записи.
+_ACTION_VERSION = "modbs.action.v0"
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+_BATCH_SIZE = 500
+_DEFAULT_TIMEOUT = 30.0
+_DEFAULT_MAX_TRANSFERS = 8
+
+_HEX_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+class RemoteCacheError(RuntimeError):
+    """Удаленный кэш недоступен или вернул некорректные данные."""
+
+
+def action_key(kind: str, *inputs: str) -> str:
+    """Ключ действия: sha256 от вида действия и digest его входов."""
+
+    digest = hashlib.sha256("\n".join((_ACTION_VERSION, kind, *inputs)).encode("utf-8"))
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _hex(digest: str) -> str:
+    """Возвращает hex-часть digest вида 'sha256:<hex>'."""
+
+    value = digest.split(":", 1)[1] if digest.startswith("sha256:") else digest
+    if not _HEX_DIGEST.match(value):
+        raise RemoteCacheError(f"Некорректный digest: {digest}")
+    return value
+
+
+def _chunks(items: Sequence[str], size: int) -> Iterable[Sequence[str]]:
+    """Делит список на пакеты."""
+
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class RemoteCache:
+    """HTTP-клиент удаленного кэша действий."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = _DEFAULT_TIMEOUT,
+        max_transfers: int = _DEFAULT_MAX_TRANSFERS,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_transfers = max(1, max_transfers)
+
+    def _open(self, method: str, path: str, body: Any = None, headers: Mapping[str, str] | None = None):
+        """Выполняет запрос; 404 возвращает как None."""
+
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=body,
+            method=method,
+            headers=dict(headers or {}),
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise RemoteCacheError(f"Кэш ответил {exc.code} на {method} {path}") from exc
+        except (OSError, ValueError, http.client.HTTPException) as exc:
+            raise RemoteCacheError(f"Кэш недоступен: {exc}") from exc
+
+    def _post_json(self, path: str, payload: Mapping[str, Any]) -> Dict[str, Any]:
+        """POST JSON → JSON."""
+
+        body = json.dumps(payload).encode("utf-8")
+        response = self._open("POST", path, body, {"Content-Type": "application/json"})
+        if response is None:
+            raise RemoteCacheError(f"Кэш не поддерживает {path}")
+        with response:
+            try:
+                result = json.loads(response.read())
+            except (OSError, ValueError, http.client.HTTPException) as exc:
+                raise RemoteCacheError(f"Некорректный ответ кэша на {path}") from exc
+        if not isinstance(result, dict):
+            raise RemoteCacheError(f"Некорректный ответ кэша на {path}")
+        return result
+
+    def lookup_actions(self, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Пакетно ищет результаты действий: ключ → результат (только найденные)."""
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for batch in _chunks(list(dict.fromkeys(keys)), _BATCH_SIZE):
+            results = self._post_json("/ac/batch", {"keys": list(batch)}).get("results", {})
+            if not isinstance(results, dict):
+                raise RemoteCacheError("Некорректный ответ кэша на /ac/batch")
+            found.update({key: value for key, value in results.items() if key in batch})
+        return found
+
+    def find_missing(self, digests: Sequence[str]) -> List[str]:
+        """Пакетно возвращает digest, которых нет в кэше."""
+
+        missing: List[str] = []
+        for batch in _chunks(list(dict.fromkeys(digests)), _BATCH_SIZE):
+            missing.extend(self._post_json("/cas/missing", {"digests": list(batch)}).get("missing", []))
+        return missing
+
+    def fetch_blob(self, digest: str, target: Path) -> None:
+        """Скачивает blob в файл, проверяя sha256 на лету."""
+
+        response = self._open("GET", f"/cas/{_hex(digest)}")
+        if response is None:
+            raise RemoteCacheError(f"В кэше нет blob {digest}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        try:
+            with response, open(target, "wb") as handle:
+                for chunk in iter(lambda: response.read(_COPY_CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    handle.write(chunk)
+        except (OSError, http.client.HTTPException) as exc:
+            raise RemoteCacheError(f"Обрыв загрузки blob {digest}: {exc!r}") from exc
+        if f"sha256:{hasher.hexdigest()}" != digest:
+            target.unlink()
+            raise RemoteCacheError(f"Blob {digest} не совпал по sha256")
+
+    def fetch_blobs(self, items: Iterable[Tuple[str, Path]]) -> None:
+        """Параллельно скачивает пары (digest, путь назначения)."""
+
+        with ThreadPoolExecutor(max_workers=self.max_transfers) as pool:
+            for _ in pool.map(lambda item: self.fetch_blob(*item), list(items)):
+                pass
+
+    def _put_blob(self, digest: str, path: Path) -> None:
+        """Загружает один blob потоком из файла."""
+
+        with open(path, "rb") as handle:
+            headers = {
+                "Content-Type": "application/octet-stream",
+                "Content-Length": str(os.fstat(handle.fileno()).st_size),
+            }
+            response = self._open("PUT", f"/cas/{_hex(digest)}", handle, headers)
+        if response is None:
+            raise RemoteCacheError(f"Кэш отклонил blob {digest}")
+        response.close()
+
+    def upload(self, key: str, result: Mapping[str, Any], blobs: Mapping[str, Path]) -> int:
+        """Публикует результат действия и недостающие blob; возвращает число загруженных.
+
+        Blob загружаются параллельно и до записи действия, поэтому
+        читатель не увидит действие, чьи blob еще не доступны.
+        """
+
+        missing = self.find_missing(list(blobs))
+        with ThreadPoolExecutor(max_workers=self.max_transfers) as pool:
+            for _ in pool.map(lambda digest: self._put_blob(digest, blobs[digest]), missing):
+                pass
+        body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        response = self._open("PUT", f"/ac/{_hex(key)}", body, {"Content-Type": "application/json"})
+        if response is None:
+            raise RemoteCacheError(f"Кэш отклонил действие {key}")
+        response.close()
+        return len(missing)
+
+
+class CacheServer(ThreadingHTTPServer):
+    """Эталонный сервер кэша: blob и действия в каталоге на диске."""
+
+    daemon_threads = True
+
+    def __init__(self, storage_dir: Path, address: Tuple[str, int] = ("127.0.0.1", 0)) -> None:
+        self.storage_dir = storage_dir
+        (storage_dir / "cas").mkdir(parents=True, exist_ok=True)
+        (storage_dir / "ac").mkdir(parents=True, exist_ok=True)
+        super().__init__(address, _CacheRequestHandler)
+
+    @property
+    def url(self) -> str:
+        """Базовый URL сервера."""
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def path_for(self, kind: str, hex_digest: str) -> Path:
+        """Файл хранилища для blob (cas) или действия (ac)."""
+
+        suffix = ".json" if kind == "ac" else ""
+        return self.storage_dir / kind / f"{hex_digest}{suffix}"
+
+    def store(self, kind: str, hex_digest: str, source: Any, length: int, verify: bool) -> bool:
+        """Атомарно сохраняет тело запроса; verify проверяет sha256 blob."""
+
+        target = self.path_for(kind, hex_digest)
+        hasher = hashlib.sha256()
+        fd, temp_name = tempfile.mkstemp(dir=target.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                remaining = length
+                while remaining > 0:
+                    chunk = source.read(min(_COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    handle.write(chunk)
+                    remaining -= len(chunk)
+            if remaining or (verify and hasher.hexdigest() != hex_digest):
+                os.unlink(temp_name)
+                return False
+            os.replace(temp_name, target)
+            return True
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+
+
+class _CacheRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов эталонного сервера."""
+
+    server: CacheServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # Сервер используется в тестах и CI: access log только шумит.
+        return
+
+    def _route(self) -> Tuple[str, str] | None:
+        """Разбирает путь /<kind>/<hex>."""
+
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] not in ("cas", "ac"):
+            return None
+        return parts[0], parts[1]
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json") -> None:
+        """Отправляет ответ с телом."""
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        """Читает JSON-тело запроса."""
+
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:  # noqa: N802
+        route = self._route()
+        if route is None or not _HEX_DIGEST.match(route[1]):
+            self._reply(400)
+            return
+        path = self.server.path_for(*route)
+        if not path.exists():
+            self._reply(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if route[0] == "ac" else "application/octet-stream")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.end_headers()
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(_COPY_CHUNK_SIZE), b""):
+                self.wfile.write(chunk)
+
+    def do_PUT(self) -> None:  # noqa: N802
+        route = self._route()
+        if route is None or not _HEX_DIGEST.match(route[1]):
+            self._reply(400)
+            return
+        kind, hex_digest = route
+        length = int(self.headers.get("Content-Length", 0))
+        if kind == "ac":
+            body = self.rfile.read(length)
+            try:
+                json.loads(body)
+            except ValueError:
+                self._reply(400)
+                return
+            self.server.store(kind, hex_digest, io.BytesIO(body), len(body), verify=False)
+            self._reply(201)
+            return
+        # Blob принимается, только если содержимое совпало с digest в пути.
+        stored = self.server.store(kind, hex_digest, self.rfile, length, verify=True)
+        self._reply(201 if stored else 400)
+
+    def do_POST(self) -> None:  # noqa: N802
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._reply(400)
+            return
+
+        if self.path == "/cas/missing":
+            missing = []
+            for digest in payload.get("digests", []):
+                value = str(digest).split(":", 1)[-1]
+                if not _HEX_DIGEST.match(value) or not self.server.path_for("cas", value).exists():
+                    missing.append(digest)
+            self._reply(200, json.dumps({"missing": missing}).encode("utf-8"))
+        elif self.path == "/ac/batch":
+            results: Dict[str, Any] = {}
+            for key in payload.get("keys", []):
+                value = str(key).split(":", 1)[-1]
+                path = self.server.path_for("ac", value) if _HEX_DIGEST.match(value) else None
+                if path is not None and path.exists():
+                    results[key] = json.loads(path.read_bytes())
+            self._reply(200, json.dumps({"results": results}, ensure_ascii=False).encode("utf-8"))
+        else:
+            self._reply(404)
@@ -4,9 +4,13 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
-from .storage import read_json, write_text
+from .conflicts import load_conflict_summary
+from .locking import state_lock
+from .profiling import latest_profiles
+from .state import iter_lockfile_artifacts
+from .storage import write_text
 
 
 def _load_journal(path: Path) -> List[Dict[str, Any]]:
@@ -16,10 +20,14 @@ def _load_journal(path: Path) -> List[Dict[str, Any]]:
         return []
 
     events: List[Dict[str, Any]] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
+    for line in path.read_text(encoding="utf-8", errors="replace").splitlines():
         if not line.strip():
             continue
-        events.append(json.loads(line))
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Оборванная при сбое запись; следующие события дописаны с новой строки.
+            continue
     return events
 
 
@@ -51,30 +59,94 @@ def _summarize_events(
     return step_order, step_statuses, counts
 
 
-def _collect_outputs(lockfile_payload: Dict[str, Any]) -> List[str]:
-    """Извлекает список outputs из lockfile и дополняет обязательным report.md."""
+def _collect_outputs(artifacts: Iterable[Tuple[str, str]]) -> List[str]:
+    """Извлекает список outputs из lockfile и дополняет обязательным report.md.
+
+    Артефакты читаются потоком (iter_lockfile_artifacts), без разбора всего
+    lockfile в один документ.
+    """
 
+    # Пути lockfile уникальны и отсортированы: хватает одного прохода.
     outputs: List[str] = []
-    artifacts = lockfile_payload.get("artifacts", [])
-    if isinstance(artifacts, list):
-        for artifact in artifacts:
-            path = artifact.get("path") if isinstance(artifact, dict) else None
-            if isinstance(path, str):
-                outputs.append(path)
-
-    if "state/report.md" not in outputs:
+    has_report = False
+    for path, _ in artifacts:
+        outputs.append(path)
+        has_report = has_report or path == "state/report.md"
+    if not has_report:
         outputs.append("state/report.md")
+    return outputs
 
-    # Удаляем дубликаты, сохраняя порядок.
-    seen = set()
-    unique_outputs = []
-    for path in outputs:
-        if path in seen:
-            continue
-        seen.add(path)
-        unique_outputs.append(path)
 
-    return unique_outputs
+def _format_bytes_delta(value: int) -> str:
+    """Форматирует Δбайт со знаком."""
+
+    return f"+{value}" if value >= 0 else str(value)
+
+
+def _collect_disk_ledger(events: List[Dict[str, Any]]) -> List[str]:
+    """Формирует секцию Disk Ledger по метрикам Δдиска из журнала."""
+
+    step_deltas: Dict[str, Dict[str, int]] = {}
+    step_flags: Dict[str, List[str]] = {}
+
+    for event in events:
+        metrics = event.get("metrics") or {}
+        step_id = str(event.get("step_id", "unknown"))
+        if isinstance(metrics.get("disk_delta"), dict):
+            step_deltas[step_id] = metrics["disk_delta"]
+        if metrics.get("risk_flags"):
+            step_flags[step_id] = list(metrics["risk_flags"])
+
+    if not step_deltas and not step_flags:
+        return []
+
+    lines = ["", "## Disk Ledger"]
+    for step_id, delta in step_deltas.items():
+        zones = ", ".join(
+            f"{zone} {_format_bytes_delta(int(value))}" for zone, value in delta.items()
+        )
+        lines.append(f"- {step_id}: {zones}")
+    for step_id, flags in step_flags.items():
+        lines.append(f"- {step_id}: risk {', '.join(flags)}")
+    return lines
+
+
+def _collect_conflicts(summary: Dict[str, Any]) -> List[str]:
+    """Формирует секцию Conflicts по сводке индекса конфликтов."""
+
+    if not summary:
+        return []
+
+    lines = [
+        "",
+        "## Conflicts",
+        f"- Files: {summary.get('files', 0)}",
+        f"- Conflicting paths: {summary.get('conflicts', 0)}",
+    ]
+    if summary.get("packed"):
+        lines.append(f"- Packed files (BSA): {summary['packed']}")
+    for mod, counts in summary.get("mods", {}).items():
+        lines.append(f"- {mod}: wins {counts.get('wins', 0)}, loses {counts.get('loses', 0)}")
+    for warning in summary.get("warnings", []):
+        lines.append(f"- Warning: {warning}")
+    return lines
+
+
+def _collect_profiles(profiles: Dict[str, Any], limit: int = 5) -> List[str]:
+    """Формирует секцию Profiles: top-N функций по кумулятивному времени на шаг."""
+
+    if not profiles.get("steps"):
+        return []
+
+    lines = ["", "## Profiles", f"- Run: {profiles['run_id']}"]
+    for step_id, rows in profiles["steps"].items():
+        lines.append(f"### {step_id}")
+        for row in rows[:limit]:
+            lines.append(
+                f"- {row['function']} ({row['location']}): "
+                f"{row['cumulative_ms']} ms cumulative, {row['calls']} calls"
+            )
+    return lines
 
 
 def generate_report(root_path: Path) -> str:
@@ -82,18 +154,16 @@ def generate_report(root_path: Path) -> str:
 
     state_dir = root_path / "state"
     journal_path = state_dir / "job.journal.jsonl"
-    lockfile_path = state_dir / "lockfile.json"
     report_path = state_dir / "report.md"
 
-    events = _load_journal(journal_path)
+    # Журнал и lockfile читаются под shared-блокировкой: параллельный apply
+    # не может оказаться между ними, а рендер отчета его уже не задерживает.
+    with state_lock(state_dir):
+        events = _load_journal(journal_path)
+        # Lockfile читается вместе с delta-записями последних Checkpoint.
+        outputs = _collect_outputs(iter_lockfile_artifacts(root_path))
     step_order, step_statuses, counts = _summarize_events(events)
 
-    lockfile_payload: Dict[str, Any] = {}
-    if lockfile_path.exists():
-        lockfile_payload = read_json(lockfile_path)
-
-    outputs = _collect_outputs(lockfile_payload)
-
     summary_lines = [
         "# Report",
         "",
@@ -125,6 +195,20 @@ def generate_report(root_path: Path) -> str:
         "- modbs report",
     ]
 
-    report_text = "\n".join(summary_lines + outputs_lines + reproduce_lines) + "\n"
+    ledger_lines = _collect_disk_ledger(events)
+    conflict_lines = _collect_conflicts(load_conflict_summary(root_path))
+    profile_lines = _collect_profiles(latest_profiles(root_path))
+
+    report_text = (
+        "\n".join(
+            summary_lines
+            + outputs_lines
+            + conflict_lines
+            + ledger_lines
+            + profile_lines
+            + reproduce_lines
+        )
+        + "\n"
+    )
     write_text(report_path, report_text)
     return report_text
@@ -0,0 +1,275 @@
+"""RootState/StockGame: snapshot, apply, rollback и verify корня игры.
+
+Снимок хранится в rootstate/snapshots/<id>/: каталог files/ с reflink- или
+hardlink-копиями файлов игры и manifest.json с хэшами. Создание снимка стоит
+O(файлов) в метаданных и почти не занимает места. Файлы игры меняются только
+через rename (RootApply/RootRollback), поэтому hardlink снимка сохраняет
+исходное содержимое.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
+
+from .fsops import link_or_copy, replace_with, sha256_file
+from .storage import read_json, write_json
+
+_SNAPSHOTS_DIR = "snapshots"
+_MANIFEST_NAME = "manifest.json"
+_STATE_NAME = "state.json"
+
+
+@dataclass(frozen=True)
+class RootDiff:
+    """Расхождения корня игры с ожидаемым состоянием."""
+
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    def is_clean(self) -> bool:
+        """True, если расхождений нет."""
+
+        return not (self.added or self.changed or self.removed)
+
+
+def _iter_game_files(game_dir: Path) -> Dict[str, os.stat_result]:
+    """Возвращает stat всех файлов каталога игры по относительным путям."""
+
+    stats: Dict[str, os.stat_result] = {}
+    pending = [game_dir]
+    while pending:
+        current = pending.pop()
+        for entry in os.scandir(current):
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                if entry.name.startswith(".modbs-"):
+                    continue
+                rel_path = Path(entry.path).relative_to(game_dir).as_posix()
+                stats[rel_path] = entry.stat(follow_symlinks=False)
+    return stats
+
+
+def _snapshot_dir(rootstate_dir: Path, snapshot_id: str) -> Path:
+    """Возвращает каталог снимка, запрещая выход за пределы rootstate/."""
+
+    if not snapshot_id or Path(snapshot_id).name != snapshot_id:
+        raise ValueError(f"Некорректный идентификатор снимка: {snapshot_id}")
+    return rootstate_dir / _SNAPSHOTS_DIR / snapshot_id
+
+
+def _stat_matches(entry: Mapping[str, Any], stat: os.stat_result) -> bool:
+    """Проверяет, что размер и mtime файла совпадают с записью манифеста."""
+
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+
+def load_manifest(rootstate_dir: Path, snapshot_id: str) -> Dict[str, Any]:
+    """Загружает манифест снимка."""
+
+    manifest_path = _snapshot_dir(rootstate_dir, snapshot_id) / _MANIFEST_NAME
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Не найден снимок RootState: {snapshot_id}")
+    return read_json(manifest_path)
+
+
+def load_root_state(rootstate_dir: Path) -> Dict[str, Any]:
+    """Загружает указатель текущего снимка и наложенных файлов."""
+
+    state_path = rootstate_dir / _STATE_NAME
+    if not state_path.exists():
+        return {}
+    return read_json(state_path)
+
+
+def _latest_manifest(rootstate_dir: Path) -> Dict[str, Any]:
+    """Возвращает манифест текущего снимка (для переиспользования хэшей)."""
+
+    snapshot_id = load_root_state(rootstate_dir).get("snapshot")
+    if not snapshot_id:
+        return {}
+    try:
+        return load_manifest(rootstate_dir, snapshot_id)
+    except FileNotFoundError:
+        return {}
+
+
+def take_snapshot(
+    game_dir: Path,
+    rootstate_dir: Path,
+    snapshot_id: str,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Создает снимок каталога игры и возвращает его манифест.
+
+    Хэши файлов, не изменившихся с прошлого снимка (size, mtime), берутся
+    из его манифеста, поэтому повторные снимки не перечитывают 15+ ГБ.
+
+    Существующий снимок с тем же id сохраняется как есть: повторный apply
+    не должен принимать уже наложенные RootApply файлы за исходный корень.
+    С refresh снимок пересоздается из текущего корня игры.
+    """
+
+    if not game_dir.is_dir():
+        raise FileNotFoundError(f"Не найден каталог игры: {game_dir}")
+
+    snapshot_dir = _snapshot_dir(rootstate_dir, snapshot_id)
+    if snapshot_dir.exists() and not refresh:
+        manifest = load_manifest(rootstate_dir, snapshot_id)
+        root_state = load_root_state(rootstate_dir)
+        if root_state.get("snapshot") != snapshot_id:
+            write_json(rootstate_dir / _STATE_NAME, {"snapshot": snapshot_id, "overlay": {}})
+        return manifest
+
+    previous_files = _latest_manifest(rootstate_dir).get("files", {})
+    # Новый снимок собирается рядом и подменяет старый только целиком.
+    build_dir = snapshot_dir.with_name(f".{snapshot_id}.new")
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    files_dir = build_dir / "files"
+    files: Dict[str, Dict[str, Any]] = {}
+    methods: Dict[str, int] = {}
+
+    for rel_path, stat in sorted(_iter_game_files(game_dir).items()):
+        source = game_dir / rel_path
+        method = link_or_copy(source, files_dir / rel_path)
+        methods[method] = methods.get(method, 0) + 1
+
+        previous = previous_files.get(rel_path)
+        if previous is not None and _stat_matches(previous, stat):
+            file_hash = previous["hash"]
+        else:
+            file_hash = sha256_file(source)
+
+        files[rel_path] = {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    manifest = {
+        "meta": {"schema": "modbs.rootstate.snapshot.v0", "snapshot_id": snapshot_id},
+        "game_dir": str(game_dir),
+        "link_methods": methods,
+        "files": files,
+    }
+    write_json(build_dir / _MANIFEST_NAME, manifest)
+    if snapshot_dir.exists():
+        stale_dir = snapshot_dir.with_name(f".{snapshot_id}.old")
+        if stale_dir.exists():
+            shutil.rmtree(stale_dir)
+        snapshot_dir.rename(stale_dir)
+        build_dir.rename(snapshot_dir)
+        shutil.rmtree(stale_dir)
+    else:
+        build_dir.rename(snapshot_dir)
+    write_json(rootstate_dir / _STATE_NAME, {"snapshot": snapshot_id, "overlay": {}})
+    return manifest
+
+
+def diff_game_dir(game_dir: Path, expected: Mapping[str, Mapping[str, Any]]) -> RootDiff:
+    """Сравнивает каталог игры с ожидаемым набором path → {hash, size, mtime_ns}.
+
+    Хэш считается только для файлов, у которых не совпали size/mtime.
+    """
+
+    current = _iter_game_files(game_dir)
+    added = sorted(path for path in current if path not in expected)
+    removed = sorted(path for path in expected if path not in current)
+    changed: List[str] = []
+
+    for rel_path in sorted(set(current) & set(expected)):
+        entry = expected[rel_path]
+        if _stat_matches(entry, current[rel_path]):
+            continue
+        if sha256_file(game_dir / rel_path) != entry["hash"]:
+            changed.append(rel_path)
+
+    return RootDiff(added=added, changed=changed, removed=removed)
+
+
+def apply_overlay(game_dir: Path, rootstate_dir: Path, source_dir: Path) -> List[str]:
+    """Накладывает файлы source_dir на корень игры (ENB/ReShade/движок).
+
+    Требует существующего снимка: без точки отката root-операции запрещены.
+    Файлы копируются через rename, не затрагивая hardlink снимка.
+    """
+
+    root_state = load_root_state(rootstate_dir)
+    if not root_state.get("snapshot"):
+        raise ValueError("RootApply требует предварительного RootSnapshot")
+    if not source_dir.is_dir():
+        raise FileNotFoundError(f"Не найден каталог root-файлов: {source_dir}")
+
+    overlay: Dict[str, Any] = dict(root_state.get("overlay", {}))
+    applied: List[str] = []
+
+    for rel_path in sorted(_iter_game_files(source_dir)):
+        source = source_dir / rel_path
+        target = game_dir / rel_path
+        # Копия, а не ссылка: правка исходника не должна менять корень игры.
+        replace_with(source, target, allow_hardlink=False)
+        stat = target.stat()
+        overlay[rel_path] = {
+            "hash": sha256_file(target),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        applied.append(rel_path)
+
+    write_json(
+        rootstate_dir / _STATE_NAME,
+        {"snapshot": root_state["snapshot"], "overlay": overlay},
+    )
+    return applied
+
+
+def expected_files(rootstate_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Возвращает ожидаемое состояние корня: снимок + наложенные файлы."""
+
+    root_state = load_root_state(rootstate_dir)
+    snapshot_id = root_state.get("snapshot")
+    if not snapshot_id:
+        raise ValueError("RootState не содержит снимка: выполните RootSnapshot")
+
+    files = dict(load_manifest(rootstate_dir, snapshot_id).get("files", {}))
+    files.update(root_state.get("overlay", {}))
+    return files
+
+
+def verify(game_dir: Path, rootstate_dir: Path) -> RootDiff:
+    """Проверяет корень игры против снимка с учетом RootApply."""
+
+    return diff_game_dir(game_dir, expected_files(rootstate_dir))
+
+
+def rollback(game_dir: Path, rootstate_dir: Path, snapshot_id: str | None = None) -> RootDiff:
+    """Возвращает корень игры к снимку, трогая только отличающиеся файлы.
+
+    Возвращает фактически исправленные расхождения.
+    """
+
+    root_state = load_root_state(rootstate_dir)
+    snapshot_id = snapshot_id or root_state.get("snapshot")
+    if not snapshot_id:
+        raise ValueError("RootRollback требует снимка RootState")
+
+    manifest = load_manifest(rootstate_dir, snapshot_id)
+    files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+    files_dir = _snapshot_dir(rootstate_dir, snapshot_id) / "files"
+    diff = diff_game_dir(game_dir, files)
+
+    for rel_path in diff.changed + diff.removed:
+        source = files_dir / rel_path
+        if sha256_file(source) != files[rel_path]["hash"]:
+            # Hardlink снимка изменили на месте — восстановить нечем.
+            raise RuntimeError(f"Копия в снимке повреждена: {rel_path}")
+        # Ссылка или copy2 сохраняют mtime, так что манифест снова совпадет по stat.
+        replace_with(source, game_dir / rel_path)
+
+    for rel_path in diff.added:
+        (game_dir / rel_path).unlink()
+
+    write_json(rootstate_dir / _STATE_NAME, {"snapshot": snapshot_id, "overlay": {}})
+    return diff
@@ -3,13 +3,64 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import os
+import time
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Mapping
 
-from .storage import write_json
+from .archives import load_install_hints
+from .locking import LOCK_FILE_NAMES, STEP_LOCK_DIR, state_lock
+from .locktable import (
+    SORTED_INDEX_NAME,
+    SORTED_LOCKFILE_NAME,
+    SortedLockfile,
+    diff_lockfiles,
+    iter_records,
+    write_sorted_lockfile,
+)
+from .storage import (
+    DURABILITY_FULL,
+    StateTransaction,
+    append_jsonl,
+    pending_transaction,
+    read_json,
+    recover_transaction,
+)
+from .trace import span
 
 _LOCKFILE_NAME = "lockfile.json"
 _PROVENANCE_NAME = "provenance.json"
+_DELTAS_NAME = "lockfile.deltas.jsonl"
+_STAT_CACHE_NAME = "lockfile.stat.json"
+
+# Формат базы lockfile: один JSON-документ или отсортированные строки
+# с разреженным индексом (для lockfile в сотни МБ).
+LOCKFILE_FORMAT_JSON = "json"
+LOCKFILE_FORMAT_LINES = "lines"
+LOCKFILE_FORMATS = (LOCKFILE_FORMAT_JSON, LOCKFILE_FORMAT_LINES)
+
+# Сколько delta-записей допускается до полной материализации lockfile.
+_MATERIALIZE_EVERY = 16
+
+# Файлы моложе этого окна не считаются надежными по (size, mtime):
+# в пределах одного тика mtime содержимое могло измениться незаметно.
+_RACY_WINDOW_NS = 100_000_000
+
+# Деплой состоит из ссылок на файлы workspace/mods: в lockfile он дублировал бы их.
+# Профили cProfile меняются при каждом --profile и не являются артефактами сборки,
+# как и файлы блокировок шагов worker.
+_EXCLUDED_OUTPUT_DIRS = {"workspace/deploy", "state/profiles", f"state/{STEP_LOCK_DIR}"}
+
+_EXCLUDED_STATE_FILES = {
+    f"state/{_LOCKFILE_NAME}",
+    f"state/{_PROVENANCE_NAME}",
+    f"state/{_DELTAS_NAME}",
+    f"state/{_STAT_CACHE_NAME}",
+    f"state/{SORTED_LOCKFILE_NAME}",
+    f"state/{SORTED_INDEX_NAME}",
+    *(f"state/{name}" for name in LOCK_FILE_NAMES),
+}
 
 
 def _iter_output_files(root_path: Path, extra_paths: Iterable[Path] | None = None) -> List[Path]:
@@ -17,10 +68,6 @@ def _iter_output_files(root_path: Path, extra_paths: Iterable[Path] | None = Non
 
     output_dirs = [root_path / "workspace", root_path / "state"]
     output_files: List[Path] = []
-    exclude_paths = {
-        f"state/{_LOCKFILE_NAME}",
-        f"state/{_PROVENANCE_NAME}",
-    }
 
     for base_dir in output_dirs:
         if not base_dir.exists():
@@ -29,7 +76,9 @@ def _iter_output_files(root_path: Path, extra_paths: Iterable[Path] | None = Non
             if not path.is_file():
                 continue
             rel_path = path.relative_to(root_path).as_posix()
-            if rel_path in exclude_paths:
+            if rel_path in _EXCLUDED_STATE_FILES:
+                continue
+            if any(rel_path.startswith(f"{prefix}/") for prefix in _EXCLUDED_OUTPUT_DIRS):
                 continue
             output_files.append(path)
 
@@ -42,6 +91,40 @@ def _iter_output_files(root_path: Path, extra_paths: Iterable[Path] | None = Non
     return output_files
 
 
+def _scan_output_stats(root_path: Path) -> Dict[str, os.stat_result]:
+    """Обходит outputs через scandir и возвращает stat по относительным путям.
+
+    Хэши здесь не считаются: обход стоит O(файлов) только в метаданных.
+    """
+
+    stats: Dict[str, os.stat_result] = {}
+    pending = [root_path / "workspace", root_path / "state"]
+
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list(os.scandir(current))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                rel_dir = Path(entry.path).relative_to(root_path).as_posix()
+                if rel_dir not in _EXCLUDED_OUTPUT_DIRS:
+                    pending.append(Path(entry.path))
+                continue
+            if not entry.is_file():
+                continue
+            if entry.name.startswith(".txn"):
+                # Служебные файлы незавершенной транзакции state/.
+                continue
+            rel_path = Path(entry.path).relative_to(root_path).as_posix()
+            if rel_path in _EXCLUDED_STATE_FILES:
+                continue
+            stats[rel_path] = entry.stat()
+
+    return stats
+
+
 def _sha256_file(path: Path) -> str:
     """Вычисляет sha256 для файла и возвращает строку с префиксом."""
 
@@ -52,18 +135,221 @@ def _sha256_file(path: Path) -> str:
     return f"sha256:{digest.hexdigest()}"
 
 
-def build_lockfile(root_path: Path, release_id: str = "local-run") -> Dict[str, Any]:
-    """Формирует структуру lockfile со списком артефактов и хэшей."""
+def _stat_matches(entry: Mapping[str, Any] | None, stat: os.stat_result) -> bool:
+    """Проверяет, что запись описывает файл с тем же размером и mtime."""
+
+    return (
+        entry is not None
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def _snapshot_entries(
+    root_path: Path,
+    known: Mapping[str, Dict[str, Any]] | None = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Строит снимок outputs: path → {hash, size, mtime_ns}.
+
+    Хэш пересчитывается только для файлов, у которых (size, mtime_ns)
+    не совпали с известной записью или манифестом установки архива.
+    """
+
+    known = known or {}
+    hints: Dict[str, Dict[str, Any]] | None = None
+    now_ns = time.time_ns()
+    entries: Dict[str, Dict[str, Any]] = {}
+    to_hash: List[str] = []
+
+    with span("snapshot_walk", "state") as walk_args:
+        stats = _scan_output_stats(root_path)
+        walk_args["files"] = len(stats)
+
+    for rel_path, stat in sorted(stats.items()):
+        previous = known.get(rel_path)
+        if not _stat_matches(previous, stat) and rel_path.startswith("workspace/"):
+            if hints is None:
+                # Хэши, посчитанные при распаковке архивов, читаем лениво.
+                hints = load_install_hints(root_path)
+            previous = hints.get(rel_path)
+
+        mtime_ns = stat.st_mtime_ns
+        if mtime_ns >= now_ns - _RACY_WINDOW_NS:
+            # "Свежий" файл: при следующем снимке хэш будет пересчитан.
+            mtime_ns = -1
 
-    artifacts: List[Dict[str, str]] = []
-    for path in _iter_output_files(root_path):
-        rel_path = path.relative_to(root_path).as_posix()
-        artifacts.append(
-            {
-                "path": rel_path,
-                "hash": _sha256_file(path),
+        if _stat_matches(previous, stat):
+            file_hash = previous["hash"]
+        else:
+            file_hash = ""
+            to_hash.append(rel_path)
+        entries[rel_path] = {"hash": file_hash, "size": stat.st_size, "mtime_ns": mtime_ns}
+
+    if to_hash:
+        with span("hash_batch", "state", files=len(to_hash)) as hash_args:
+            for rel_path in to_hash:
+                entries[rel_path]["hash"] = _sha256_file(root_path / rel_path)
+            hash_args["bytes"] = sum(entries[rel_path]["size"] for rel_path in to_hash)
+
+    return entries
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """Считывает JSONL-файл, пропуская пустые и оборванные строки.
+
+    append_jsonl начинает следующую запись с новой строки, поэтому после
+    сбоя оборванный фрагмент оказывается не только в хвосте, но и
+    посередине файла: такие строки пропускаются везде.
+    """
+
+    if not path.exists():
+        return []
+
+    records: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            if not line.endswith("\n"):
+                # Хвост без перевода строки — незавершенная запись.
+                break
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _state_file(state_dir: Path, name: str) -> Path | None:
+    """Путь, по которому читается файл state/, или None, если файла нет.
+
+    Если писатель упал после фиксации материализации, манифест транзакции
+    еще лежит в state/: новые версии файлов — во временных копиях, а
+    удаляемые файлы на месте. Читатели не довершают транзакцию (это делает
+    следующий писатель под exclusive-блокировкой), а читают сквозь нее.
+    """
+
+    pending = pending_transaction(state_dir)
+    if name in pending:
+        temp_name = pending[name]
+        if temp_name is None:
+            return None
+        temp_path = state_dir / temp_name
+        if temp_path.exists():
+            return temp_path
+
+    path = state_dir / name
+    return path if path.exists() else None
+
+
+def _state_signature(state_dir: Path) -> tuple[Any, ...]:
+    """Отпечаток базы и delta-файла: меняется при каждой фиксации state/."""
+
+    signature: List[Any] = []
+    for name in (_STAT_CACHE_NAME, _DELTAS_NAME):
+        try:
+            stat = (state_dir / name).stat()
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+    return tuple(signature)
+
+
+def _read_generation(state_dir: Path) -> tuple[int, Dict[str, Any]]:
+    """Возвращает поколение базы и содержимое stat-кэша."""
+
+    stat_cache_path = _state_file(state_dir, _STAT_CACHE_NAME)
+    if stat_cache_path is None:
+        return 0, {}
+    stat_cache = read_json(stat_cache_path)
+    return int(stat_cache.get("generation", 0)), stat_cache
+
+
+def _iter_current_deltas(state_dir: Path, generation: int) -> List[Dict[str, Any]]:
+    """Возвращает delta-записи, относящиеся к текущей базе."""
+
+    deltas_path = _state_file(state_dir, _DELTAS_NAME)
+    if deltas_path is None:
+        return []
+    # Записи прошлых поколений уже учтены материализацией.
+    return [
+        record
+        for record in _read_jsonl(deltas_path)
+        if record.get("generation") == generation
+    ]
+
+
+def _load_known_entries(state_dir: Path) -> tuple[int, Dict[str, Dict[str, Any]], int]:
+    """Восстанавливает последнее известное состояние: base + deltas.
+
+    Возвращает (generation, entries, число примененных delta-записей).
+    """
+
+    generation, stat_cache = _read_generation(state_dir)
+    entries: Dict[str, Dict[str, Any]] = {
+        path: {"hash": item[2], "size": item[0], "mtime_ns": item[1]}
+        for path, item in stat_cache.get("files", {}).items()
+    }
+
+    records = _iter_current_deltas(state_dir, generation)
+    for record in records:
+        _apply_delta(entries, record)
+
+    return generation, entries, len(records)
+
+
+def _apply_delta(entries: Dict[str, Dict[str, Any]], record: Mapping[str, Any]) -> None:
+    """Применяет delta-запись к словарю состояния."""
+
+    for key in ("added", "changed", "touched"):
+        for item in record.get(key, []):
+            entries[item["path"]] = {
+                "hash": item["hash"],
+                "size": item["size"],
+                "mtime_ns": item["mtime_ns"],
             }
-        )
+    for path in record.get("removed", []):
+        entries.pop(path, None)
+
+
+def _diff_entries(
+    previous: Mapping[str, Dict[str, Any]],
+    current: Mapping[str, Dict[str, Any]],
+) -> Dict[str, List[Any]]:
+    """Вычисляет added/changed/touched/removed между двумя снимками."""
+
+    delta: Dict[str, List[Any]] = {"added": [], "changed": [], "touched": [], "removed": []}
+
+    for path, entry in current.items():
+        item = {"path": path, **entry}
+        before = previous.get(path)
+        if before is None:
+            delta["added"].append(item)
+        elif before["hash"] != entry["hash"]:
+            delta["changed"].append(item)
+        elif before.get("size") != entry["size"] or before.get("mtime_ns") != entry["mtime_ns"]:
+            # Содержимое то же, обновились только метаданные.
+            delta["touched"].append(item)
+
+    delta["removed"] = sorted(path for path in previous if path not in current)
+    return delta
+
+
+def build_lockfile(
+    root_path: Path,
+    release_id: str = "local-run",
+    entries: Mapping[str, Dict[str, Any]] | None = None,
+) -> Dict[str, Any]:
+    """Формирует структуру lockfile со списком артефактов и хэшей."""
+
+    if entries is None:
+        entries = _snapshot_entries(root_path)
+
+    artifacts: List[Dict[str, str]] = [
+        {"path": path, "hash": entries[path]["hash"]}
+        for path in sorted(entries)
+    ]
 
     return {
         "meta": {"schema": "modbs.lockfile.v0"},
@@ -72,18 +358,18 @@ def build_lockfile(root_path: Path, release_id: str = "local-run") -> Dict[str,
     }
 
 
-def build_provenance(root_path: Path) -> Dict[str, Any]:
+def build_provenance(
+    root_path: Path,
+    entries: Mapping[str, Dict[str, Any]] | None = None,
+) -> Dict[str, Any]:
     """Формирует структуру provenance со списком артефактов."""
 
-    artifacts: List[Dict[str, str]] = []
-    for path in _iter_output_files(root_path):
-        rel_path = path.relative_to(root_path).as_posix()
-        artifacts.append(
-            {
-                "path": rel_path,
-                "class": "Generated",
-            }
-        )
+    if entries is None:
+        paths = [path.relative_to(root_path).as_posix() for path in _iter_output_files(root_path)]
+    else:
+        paths = sorted(entries)
+
+    artifacts: List[Dict[str, str]] = [{"path": path, "class": "Generated"} for path in paths]
 
     return {
         "meta": {"schema": "modbs.provenance.v0"},
@@ -91,16 +377,311 @@ def build_provenance(root_path: Path) -> Dict[str, Any]:
     }
 
 
-def write_state_artifacts(root_path: Path, release_id: str = "local-run") -> Dict[str, Dict[str, Any]]:
-    """Записывает lockfile.json и provenance.json в state/."""
+def _load_base_lockfile(state_dir: Path) -> Dict[str, Any]:
+    """Читает базу lockfile в любом из форматов целиком."""
+
+    lockfile_path = _state_file(state_dir, _LOCKFILE_NAME)
+    if lockfile_path is not None:
+        return read_json(lockfile_path)
+
+    table = _sorted_base(state_dir)
+    if table is not None:
+        payload = dict(table.header)
+        payload["artifacts"] = [{"path": path, "hash": file_hash} for path, file_hash in table]
+        return payload
+    return {}
+
+
+def _sorted_base(state_dir: Path) -> SortedLockfile | None:
+    """База lockfile.lines, если текущая база в построчном формате."""
+
+    if _state_file(state_dir, _LOCKFILE_NAME) is not None:
+        return None
+    sorted_path = _state_file(state_dir, SORTED_LOCKFILE_NAME)
+    if sorted_path is None:
+        return None
+    return SortedLockfile(sorted_path, _state_file(state_dir, SORTED_INDEX_NAME))
+
+
+def _current_overlay(state_dir: Path) -> Dict[str, str | None]:
+    """Сворачивает delta-записи текущего поколения: path → hash (None — удален)."""
+
+    generation, _ = _read_generation(state_dir)
+    overlay: Dict[str, str | None] = {}
+    for record in _iter_current_deltas(state_dir, generation):
+        for key in ("added", "changed"):
+            for item in record.get(key, []):
+                overlay[item["path"]] = item["hash"]
+        for path in record.get("removed", []):
+            overlay[path] = None
+    return overlay
+
+
+def load_lockfile(root_path: Path) -> Dict[str, Any]:
+    """Читает lockfile с учетом накопленных delta-записей.
+
+    Базовый lockfile (lockfile.json или lockfile.lines) дополняется
+    delta-записями текущего поколения, поэтому читатели видят состояние
+    на момент последнего Checkpoint.
+    """
+
+    state_dir = root_path / "state"
+    with state_lock(state_dir):
+        payload = _load_base_lockfile(state_dir)
+        overlay = _current_overlay(state_dir)
+
+    if not overlay:
+        return payload
+
+    merged = {
+        item["path"]: item["hash"]
+        for item in payload.get("artifacts", [])
+        if isinstance(item, dict) and "path" in item
+    }
+    for path, file_hash in overlay.items():
+        if file_hash is None:
+            merged.pop(path, None)
+        else:
+            merged[path] = file_hash
+
+    payload = dict(payload)
+    payload.setdefault("meta", {"schema": "modbs.lockfile.v0"})
+    payload["artifacts"] = [{"path": path, "hash": merged[path]} for path in sorted(merged)]
+    return payload
+
+
+def lookup_lockfile_hash(root_path: Path, rel_path: str) -> str | None:
+    """Возвращает хэш одного пути из lockfile с учетом delta-записей.
+
+    Для lockfile.lines это бинарный поиск по разреженному индексу
+    без чтения всей базы.
+    """
+
+    state_dir = root_path / "state"
+    with state_lock(state_dir):
+        overlay = _current_overlay(state_dir)
+        if rel_path in overlay:
+            return overlay[rel_path]
+
+        table = _sorted_base(state_dir)
+        if table is not None:
+            return table.lookup(rel_path)
+
+        for item in _load_base_lockfile(state_dir).get("artifacts", []):
+            if isinstance(item, dict) and item.get("path") == rel_path:
+                return item.get("hash")
+    return None
+
+
+def iter_lockfile_artifacts(root_path: Path) -> Iterator[tuple[str, str]]:
+    """Перебирает (path, hash) lockfile в порядке путей с учетом delta-записей.
+
+    Для lockfile.lines база читается потоком, в памяти держатся только
+    delta-записи текущего поколения. Блокировка state держится только
+    на время открытия базы: дальше чтение идет по открытому дескриптору.
+    """
+
+    state_dir = root_path / "state"
+    handle = None
+    with state_lock(state_dir):
+        overlay = _current_overlay(state_dir)
+        table = _sorted_base(state_dir)
+        if table is not None:
+            handle = open(table.path, "rb")
+            base: Iterable[tuple[str, str]] = iter_records(handle)
+        else:
+            base = [
+                (item["path"], item["hash"])
+                for item in _load_base_lockfile(state_dir).get("artifacts", [])
+                if isinstance(item, dict) and "path" in item
+            ]
+
+    pending = sorted(overlay.items())
+    position = 0
+    try:
+        for path, file_hash in base:
+            while position < len(pending) and pending[position][0] < path:
+                if pending[position][1] is not None:
+                    yield pending[position]
+                position += 1
+            if position < len(pending) and pending[position][0] == path:
+                if pending[position][1] is not None:
+                    yield pending[position]
+                position += 1
+                continue
+            yield path, file_hash
+    finally:
+        if handle is not None:
+            handle.close()
+    for path, file_hash in pending[position:]:
+        if file_hash is not None:
+            yield path, file_hash
+
+
+def verify_lockfile(root_path: Path, paths: Iterable[str] | None = None) -> Dict[str, List[str]]:
+    """Сверяет outputs с lockfile последнего Checkpoint.
+
+    Без paths текущий снимок outputs сравнивается с lockfile потоковым
+    merge-diff (хэши берутся из stat-кэша, пересчитываются только у
+    измененных файлов). С paths каждый путь проверяется точечно через
+    lookup_lockfile_hash, без чтения всей базы. Возвращает
+    added/changed/removed.
+    """
+
+    result: Dict[str, List[str]] = {"added": [], "changed": [], "removed": []}
+
+    if paths is not None:
+        for rel_path in paths:
+            expected = lookup_lockfile_hash(root_path, rel_path)
+            path = root_path / rel_path
+            if not path.is_file():
+                if expected is not None:
+                    result["removed"].append(rel_path)
+            elif expected is None:
+                result["added"].append(rel_path)
+            elif _sha256_file(path) != expected:
+                result["changed"].append(rel_path)
+        return result
+
+    state_dir = root_path / "state"
+    with state_lock(state_dir):
+        _, known, _ = _load_known_entries(state_dir)
+    current = _snapshot_entries(root_path, known)
+
+    actual = ((path, current[path]["hash"]) for path in sorted(current))
+    for path, old_hash, new_hash in diff_lockfiles(iter_lockfile_artifacts(root_path), actual):
+        if old_hash is None:
+            result["added"].append(path)
+        elif new_hash is None:
+            result["removed"].append(path)
+        else:
+            result["changed"].append(path)
+    return result
+
+
+def pending_changes(root_path: Path) -> Dict[str, List[Any]]:
+    """Изменения outputs с последнего Checkpoint без записи в state/.
+
+    Формат совпадает с delta-записью: added/changed/touched с хэшами и
+    список removed. Хэши пересчитываются только у измененных файлов.
+    """
+
+    state_dir = root_path / "state"
+    with state_lock(state_dir):
+        _, known, _ = _load_known_entries(state_dir)
+    return _diff_entries(known, _snapshot_entries(root_path, known))
+
+
+def write_checkpoint_delta(
+    root_path: Path,
+    release_id: str = "local-run",
+    durability: str = DURABILITY_FULL,
+    lockfile_format: str = LOCKFILE_FORMAT_JSON,
+) -> Dict[str, Any]:
+    """Фиксирует Checkpoint как delta-запись к последнему состоянию.
+
+    В state/lockfile.deltas.jsonl дописываются только добавленные,
+    измененные и удаленные пути с хэшами. Каждые _MATERIALIZE_EVERY
+    записей lockfile материализуется целиком.
+    """
 
     state_dir = root_path / "state"
     state_dir.mkdir(parents=True, exist_ok=True)
 
-    lockfile_payload = build_lockfile(root_path, release_id=release_id)
-    provenance_payload = build_provenance(root_path)
+    with state_lock(state_dir, exclusive=True):
+        # Прерванную материализацию довершает только писатель.
+        recover_transaction(state_dir, durability)
+        signature = _state_signature(state_dir)
+        generation, known, applied = _load_known_entries(state_dir)
+
+    # Хэширование идет без блокировки: читатели ждут только дозапись.
+    current = _snapshot_entries(root_path, known)
+
+    with state_lock(state_dir, exclusive=True):
+        if _state_signature(state_dir) != signature:
+            # Пока шло хэширование, state/ зафиксировал другой писатель.
+            recover_transaction(state_dir, durability)
+            generation, known, applied = _load_known_entries(state_dir)
+        delta = _diff_entries(known, current)
+        record = {"generation": generation, "seq": applied + 1, **delta}
+        append_jsonl(state_dir / _DELTAS_NAME, record, durability)
+
+    if applied + 1 >= _MATERIALIZE_EVERY:
+        write_state_artifacts(
+            root_path,
+            release_id=release_id,
+            durability=durability,
+            lockfile_format=lockfile_format,
+        )
+
+    return record
+
+
+def write_state_artifacts(
+    root_path: Path,
+    release_id: str = "local-run",
+    durability: str = DURABILITY_FULL,
+    lockfile_format: str = LOCKFILE_FORMAT_JSON,
+) -> Dict[str, Dict[str, Any]]:
+    """Записывает lockfile и provenance.json в state/.
+
+    Это полная материализация: delta-записи сворачиваются в новую базу,
+    а хэши неизмененных файлов берутся из stat-кэша. Все файлы фиксируются
+    одной транзакцией, поэтому пара lockfile/provenance всегда согласована.
+    При lockfile_format="lines" вместо lockfile.json пишется lockfile.lines
+    с разреженным индексом.
+    """
+
+    if lockfile_format not in LOCKFILE_FORMATS:
+        raise ValueError(f"Неизвестный формат lockfile: {lockfile_format}")
+
+    state_dir = root_path / "state"
+    state_dir.mkdir(parents=True, exist_ok=True)
+
+    with state_lock(state_dir, exclusive=True):
+        # Прерванную материализацию довершает только писатель.
+        recover_transaction(state_dir, durability)
+        signature = _state_signature(state_dir)
+        generation, known, _ = _load_known_entries(state_dir)
+
+    # Снимок и хэширование идут без блокировки: читатели ждут только фиксацию.
+    entries = _snapshot_entries(root_path, known)
+
+    with state_lock(state_dir, exclusive=True):
+        if _state_signature(state_dir) != signature:
+            # Пока шло хэширование, state/ зафиксировал другой писатель.
+            recover_transaction(state_dir, durability)
+            generation, known, _ = _load_known_entries(state_dir)
+            entries = _snapshot_entries(root_path, known)
+
+        lockfile_payload = build_lockfile(root_path, release_id=release_id, entries=entries)
+        provenance_payload = build_provenance(root_path, entries=entries)
+        stat_cache_payload = {
+            "generation": generation + 1,
+            "files": {
+                path: [entry["size"], entry["mtime_ns"], entry["hash"]]
+                for path, entry in entries.items()
+            },
+        }
 
-    write_json(state_dir / _LOCKFILE_NAME, lockfile_payload)
-    write_json(state_dir / _PROVENANCE_NAME, provenance_payload)
+        with StateTransaction(state_dir, durability) as transaction:
+            if lockfile_format == LOCKFILE_FORMAT_LINES:
+                header = {key: value for key, value in lockfile_payload.items() if key != "artifacts"}
+                artifacts = ((item["path"], item["hash"]) for item in lockfile_payload["artifacts"])
+                # Записи идут прямо во временную копию, без строки на весь lockfile.
+                index = transaction.stage_stream(
+                    SORTED_LOCKFILE_NAME,
+                    lambda handle: write_sorted_lockfile(handle, header, artifacts),
+                )
+                transaction.stage_json(SORTED_INDEX_NAME, index)
+                transaction.stage_delete(_LOCKFILE_NAME)
+            else:
+                transaction.stage_json(_LOCKFILE_NAME, lockfile_payload)
+                transaction.stage_delete(SORTED_LOCKFILE_NAME)
+                transaction.stage_delete(SORTED_INDEX_NAME)
+            transaction.stage_json(_PROVENANCE_NAME, provenance_payload)
+            transaction.stage_json(_STAT_CACHE_NAME, stat_cache_payload)
+            # Delta-записи прошлого поколения больше не нужны читателям.
+            transaction.stage_delete(_DELTAS_NAME)
 
     return {"lockfile": lockfile_payload, "provenance": provenance_payload}
@@ -0,0 +1,212 @@
+"""Межзапусковая аналитика журнала: перцентили длительности шагов и тренды."""
+
+from __future__ import annotations
+
+import json
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from .estimate import cost_point
+from .locking import state_lock
+from .storage import read_json, write_json, write_text
+
+STATS_PATH = Path("state") / "stats.json"
+STATS_MARKDOWN_PATH = Path("state") / "stats.md"
+JOURNAL_NAME = "job.journal.jsonl"
+
+# Для перцентилей и тренда хранится окно последних длительностей:
+# счетчики и максимум при этом точные за всю историю.
+_SAMPLE_WINDOW = 1000
+
+_FINAL_STATUSES = {"Succeeded", "Failed", "Blocked"}
+
+
+def _empty_aggregate() -> Dict[str, Any]:
+    """Пустой агрегат: позиция в журнале и счетчики по типам шагов."""
+
+    return {
+        "meta": {"schema": "modbs.stats.v0"},
+        "journal": {"offset": 0, "inode": None},
+        "pending": {},
+        "step_types": {},
+    }
+
+
+def _parse_ts(value: Any) -> float | None:
+    """Переводит ISO-время события в секунды epoch."""
+
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _trend_slope(values: Sequence[float]) -> float:
+    """Наклон линейной регрессии длительности по номеру запуска (мс/запуск)."""
+
+    count = len(values)
+    if count < 2:
+        return 0.0
+    mean_x = (count - 1) / 2
+    mean_y = sum(values) / count
+    numerator = sum((index - mean_x) * (value - mean_y) for index, value in enumerate(values))
+    denominator = sum((index - mean_x) ** 2 for index in range(count))
+    return numerator / denominator
+
+
+def _apply_event(aggregate: Dict[str, Any], event: Dict[str, Any]) -> None:
+    """Учитывает одно событие журнала в агрегате."""
+
+    step_id = str(event.get("step_id", "unknown"))
+    status = event.get("status")
+    pending: Dict[str, Any] = aggregate["pending"]
+
+    if status == "Running":
+        pending[step_id] = {"ts": event.get("ts"), "step_type": event.get("step_type")}
+        return
+    if status not in _FINAL_STATUSES:
+        return
+
+    started = pending.pop(step_id, {})
+    # В старых журналах нет step_type: группируем по step_id.
+    step_type = str(event.get("step_type") or started.get("step_type") or step_id)
+    entry = aggregate["step_types"].setdefault(
+        step_type,
+        {"runs": 0, "succeeded": 0, "failed": 0, "blocked": 0, "max_ms": 0.0, "samples": []},
+    )
+    entry["runs"] += 1
+    entry[str(status).lower()] += 1
+
+    metrics = event.get("metrics") or {}
+    duration = metrics.get("duration_ms")
+    if duration is None and started:
+        begin, end = _parse_ts(started.get("ts")), _parse_ts(event.get("ts"))
+        if begin is not None and end is not None:
+            duration = (end - begin) * 1000
+    if duration is None:
+        return
+
+    duration = float(duration)
+    entry["max_ms"] = max(entry["max_ms"], duration)
+    entry["samples"].append(duration)
+    if len(entry["samples"]) > _SAMPLE_WINDOW:
+        del entry["samples"][: len(entry["samples"]) - _SAMPLE_WINDOW]
+
+    # Точки (размер входа, метрики) для plan --estimate: только успешные
+    # шаги, иначе прерванные запуски занижают прогноз.
+    point = cost_point(metrics.get("input_size"), {**metrics, "duration_ms": duration})
+    if status == "Succeeded" and point is not None:
+        costs = entry.setdefault("costs", [])
+        costs.append(point)
+        if len(costs) > _SAMPLE_WINDOW:
+            del costs[: len(costs) - _SAMPLE_WINDOW]
+
+
+def update_stats(root_path: Path) -> Dict[str, Any]:
+    """Дочитывает новые события журнала и обновляет агрегат state/stats.json.
+
+    Позиция чтения хранится в агрегате, поэтому каждый вызов стоит
+    O(новых событий). Если журнал заменили или укоротили, агрегат
+    пересчитывается с начала.
+    """
+
+    journal_path = root_path / "state" / JOURNAL_NAME
+    stats_path = root_path / STATS_PATH
+    aggregate = read_json(stats_path) if stats_path.exists() else _empty_aggregate()
+
+    if not journal_path.exists():
+        return aggregate
+
+    with state_lock(journal_path.parent):
+        # Под блокировкой фиксируем только длину: все до нее — целые события.
+        stat = journal_path.stat()
+    position = aggregate["journal"]
+    if position.get("inode") != stat.st_ino or stat.st_size < position.get("offset", 0):
+        aggregate = _empty_aggregate()
+        position = aggregate["journal"]
+
+    offset = int(position.get("offset", 0))
+    if stat.st_size == offset:
+        return aggregate
+
+    # Хвост читается построчно, поэтому память не зависит от его размера.
+    end = offset
+    with open(journal_path, "rb") as handle:
+        handle.seek(offset)
+        for line in handle:
+            if end + len(line) > stat.st_size or not line.endswith(b"\n"):
+                # Неполная последняя строка (запись еще идет) дочитается в следующий раз.
+                break
+            end += len(line)
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            _apply_event(aggregate, event)
+
+    aggregate["journal"] = {"offset": end, "inode": stat.st_ino}
+    aggregate["summary"] = summarize_stats(aggregate)
+    write_json(stats_path, aggregate)
+    return aggregate
+
+
+def summarize_stats(aggregate: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Считает итоговые показатели по типам шагов."""
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for step_type, entry in sorted(aggregate.get("step_types", {}).items()):
+        samples: List[float] = entry.get("samples", [])
+        runs = entry.get("runs", 0) or 1
+        summary[step_type] = {
+            "runs": entry.get("runs", 0),
+            "p50_ms": round(_percentile(samples, 50), 3) if samples else None,
+            "p95_ms": round(_percentile(samples, 95), 3) if samples else None,
+            "max_ms": round(entry.get("max_ms", 0.0), 3),
+            "failure_rate": round(entry.get("failed", 0) / runs, 4),
+            "block_rate": round(entry.get("blocked", 0) / runs, 4),
+            "trend_ms_per_run": round(_trend_slope(samples), 3),
+        }
+    return summary
+
+
+def render_stats_markdown(summary: Dict[str, Dict[str, Any]]) -> str:
+    """Формирует Markdown-секцию со статистикой шагов."""
+
+    def _fmt(value: Any) -> str:
+        return "—" if value is None else f"{value}"
+
+    lines = [
+        "## Step Stats",
+        "",
+        "| Step type | Runs | p50 ms | p95 ms | max ms | Failed | Blocked | Trend ms/run |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for step_type, row in summary.items():
+        lines.append(
+            f"| {step_type} | {row['runs']} | {_fmt(row['p50_ms'])} | {_fmt(row['p95_ms'])} "
+            f"| {row['max_ms']} | {row['failure_rate']:.0%} | {row['block_rate']:.0%} "
+            f"| {row['trend_ms_per_run']:+} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_stats(root_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Обновляет агрегат и пишет state/stats.md; возвращает сводку."""
+
+    aggregate = update_stats(root_path)
+    summary = aggregate.get("summary") or summarize_stats(aggregate)
+    write_text(root_path / STATS_MARKDOWN_PATH, render_stats_markdown(summary))
+    return summary
+
@@ -0,0 +1,174 @@
+"""Состояние текущего (последнего) запуска по хвосту журнала.
+
+Журнал читается с конца блоками через seek, пока не встретится событие
+другого run_id: стоимость зависит от длины последнего запуска, а не от
+размера журнала, поэтому status можно опрашивать каждую секунду.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List
+
+from .locking import state_lock
+
+JOURNAL_NAME = "job.journal.jsonl"
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+# В старых журналах нет run_id: границу запуска не найти, поэтому
+# просмотр ограничен, чтобы стоимость оставалась постоянной.
+_MAX_EVENTS_WITHOUT_RUN_ID = 1000
+
+_FINAL_STATUSES = ("Failed", "Blocked", "Succeeded")
+
+
+def _iter_lines_reversed(handle: BinaryIO, end: int) -> Iterator[bytes]:
+    """Выдает строки файла до смещения end в обратном порядке."""
+
+    position = end
+    tail = b""
+    while position > 0:
+        size = min(_READ_CHUNK_SIZE, position)
+        position -= size
+        handle.seek(position)
+        block = handle.read(size) + tail
+        lines = block.split(b"\n")
+        # Первая строка блока может продолжаться в предыдущем блоке.
+        tail = lines.pop(0)
+        for line in reversed(lines):
+            if line.strip():
+                yield line
+    if tail.strip():
+        yield tail
+
+
+def _parse_ts(value: Any) -> datetime | None:
+    """Разбирает ISO-время события."""
+
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _read_last_run(journal_path: Path) -> List[Dict[str, Any]]:
+    """Возвращает события последнего запуска в порядке записи."""
+
+    with state_lock(journal_path.parent):
+        # Под блокировкой фиксируем только длину: все до нее — целые события.
+        end = journal_path.stat().st_size
+
+    events: List[Dict[str, Any]] = []
+    run_id: Any = None
+    with open(journal_path, "rb") as handle:
+        skip_partial = False
+        if end:
+            handle.seek(end - 1)
+            # Хвост без перевода строки — оборванная запись, ее пропускаем.
+            skip_partial = handle.read(1) != b"\n"
+        for line in _iter_lines_reversed(handle, end):
+            if skip_partial:
+                skip_partial = False
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not events:
+                run_id = event.get("run_id")
+            elif event.get("run_id") != run_id:
+                break
+            events.append(event)
+            if run_id is None and len(events) >= _MAX_EVENTS_WITHOUT_RUN_ID:
+                break
+    events.reverse()
+    return events
+
+
+def read_status(root_path: Path, now: datetime | None = None) -> Dict[str, Any]:
+    """Сводка запуска: статус, текущий шаг, прошедшее время и блокер."""
+
+    journal_path = root_path / "state" / JOURNAL_NAME
+    if not journal_path.exists():
+        return {"run_id": None, "status": "NoRuns", "steps": {}}
+
+    events = _read_last_run(journal_path)
+    if not events:
+        return {"run_id": None, "status": "NoRuns", "steps": {}}
+
+    latest: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        latest[str(event.get("step_id", "unknown"))] = event
+
+    statuses = [str(event.get("status")) for event in latest.values()]
+    if "Running" in statuses:
+        status = "Running"
+    else:
+        status = next((item for item in _FINAL_STATUSES if item in statuses), "Succeeded")
+
+    running = [event for event in latest.values() if event.get("status") == "Running"]
+    current = running[-1] if running else events[-1]
+
+    started = _parse_ts(events[0].get("ts"))
+    finished = _parse_ts(events[-1].get("ts"))
+    if status == "Running":
+        finished = now or datetime.now(timezone.utc)
+    elapsed = (finished - started).total_seconds() if started and finished else None
+
+    counts: Dict[str, int] = {}
+    for item in statuses:
+        counts[item] = counts.get(item, 0) + 1
+
+    result: Dict[str, Any] = {
+        "run_id": events[0].get("run_id"),
+        "status": status,
+        "current_step": {
+            "step_id": current.get("step_id"),
+            "step_type": current.get("step_type"),
+            "status": current.get("status"),
+            "since": current.get("ts"),
+        },
+        "started_at": events[0].get("ts"),
+        "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+        "steps": counts,
+    }
+
+    blockers = [event for event in latest.values() if event.get("status") in ("Blocked", "Failed")]
+    if blockers:
+        blocker = blockers[-1]
+        metrics = blocker.get("metrics") or {}
+        result["blocker"] = {
+            "step_id": blocker.get("step_id"),
+            "status": blocker.get("status"),
+            "message": blocker.get("message"),
+            "next_action_at": metrics.get("next_action_at"),
+            "source": metrics.get("source"),
+        }
+    return result
+
+
+def format_status(status: Dict[str, Any]) -> str:
+    """Текстовое представление сводки для терминала."""
+
+    if status.get("run_id") is None and status.get("status") == "NoRuns":
+        return "Запусков еще не было\n"
+
+    current = status["current_step"]
+    lines = [
+        f"Run: {status.get('run_id') or '—'} — {status['status']}",
+        f"Step: {current['step_id']} ({current.get('step_type') or '—'}) {current['status']} since {current['since']}",
+    ]
+    if status.get("elapsed_seconds") is not None:
+        lines.append(f"Elapsed: {status['elapsed_seconds']:.1f} s")
+    lines.append("Steps: " + ", ".join(f"{name} {count}" for name, count in sorted(status["steps"].items())))
+    blocker = status.get("blocker")
+    if blocker:
+        detail = f"{blocker['step_id']} {blocker['status']}: {blocker['message']}"
+        if blocker.get("next_action_at"):
+            moment = datetime.fromtimestamp(float(blocker["next_action_at"]), timezone.utc).isoformat()
+            detail += f" (next action at {moment})"
+        lines.append(f"Blocker: {detail}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,25 @@
 """Шаги исполнения для Modlist Profile Builder."""
 
+from .artifact_classify import artifact_classify
+from .deploy_profile import deploy_profile
+from .install import extract, install_to_manager
+from .root_state import root_apply, root_rollback, root_snapshot, root_verify
+from .verify_download import verify_download
 from .workspace_init import workspace_init
 from .write_mo2_profile import write_mo2_profile
+from .xedit_qac import run_xedit_qac
 
-__all__ = ["workspace_init", "write_mo2_profile"]
+__all__ = [
+    "artifact_classify",
+    "deploy_profile",
+    "extract",
+    "install_to_manager",
+    "root_apply",
+    "root_rollback",
+    "root_snapshot",
+    "root_verify",
+    "run_xedit_qac",
+    "verify_download",
+    "workspace_init",
+    "write_mo2_profile",
+]
@@ -0,0 +1,35 @@
+"""Шаг ArtifactClassify: классы влияния измененных файлов и ключи инвалидации."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+from modbs.classify import classify_changes
+from modbs.models import StepIR
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для ArtifactClassify")
+
+
+def artifact_classify(step: StepIR, ctx: Mapping[str, Any]) -> Dict[str, Any]:
+    """Классифицирует изменения с последнего Checkpoint (или payload.paths).
+
+    Результат пишется в state/impact.json и возвращается.
+    """
+
+    root_path = _resolve_root_path(ctx)
+    paths = step.payload.get("paths")
+    max_workers = int(step.payload.get("max_workers", 8))
+    return classify_changes(root_path, paths=paths, max_workers=max_workers)
@@ -0,0 +1,61 @@
+"""Шаг DeployProfile: плоский Data/ профиля из ссылок на файлы модов."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Mapping
+
+from modbs.deploy import DEPLOY_DIR, default_target_dir, materialize_profile
+from modbs.models import StepIR
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для DeployProfile")
+
+
+def _resolve_profile_name(step: StepIR, ctx: Mapping[str, Any]) -> str:
+    """Определяет имя профиля из шага или контекста."""
+
+    profile = step.payload.get("profile") or ctx.get("profile_name")
+    if profile:
+        return str(profile)
+
+    raise ValueError("Не задано имя профиля для DeployProfile")
+
+
+def _resolve_target_dir(step: StepIR, root_path: Path, profile_name: str) -> Path:
+    """Каталог деплоя: payload.target в workspace/deploy/ или workspace/deploy/<profile>/Data.
+
+    Деплой удаляет из target все, чего нет в профиле, поэтому target не может
+    указывать ни на workspace/mods, ни на state/, ни на сам workspace/deploy.
+    """
+
+    target = step.payload.get("target")
+    if not target:
+        return default_target_dir(root_path, profile_name)
+
+    deploy_dir = (root_path / DEPLOY_DIR).resolve()
+    target_dir = (root_path / str(target)).resolve()
+    if target_dir == deploy_dir or not target_dir.is_relative_to(deploy_dir):
+        raise ValueError(
+            f"DeployProfile: target должен быть подкаталогом {DEPLOY_DIR.as_posix()}: {target}"
+        )
+    return target_dir
+
+
+def deploy_profile(step: StepIR, ctx: Mapping[str, Any]) -> None:
+    """Материализует Data/ профиля по приоритету modlist.txt."""
+
+    root_path = _resolve_root_path(ctx)
+    profile_name = _resolve_profile_name(step, ctx)
+    materialize_profile(root_path, profile_name, _resolve_target_dir(step, root_path, profile_name))
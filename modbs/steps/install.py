@@ -0,0 +1,135 @@
+"""Шаги Extract и InstallToManager: установка локальных архивов модов."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, List, Mapping
+
+from modbs.archives import InstallJob, InstallResult, install_archives
+from modbs.models import StepIR
+from modbs.remote_cache import RemoteCache
+
+_DEFAULT_MAX_WORKERS = 4
+
+# Каталоги workspace/, которыми управляют другие шаги: замена целиком
+# стерла бы все моды, профили или деплой.
+_RESERVED_WORKSPACE_DIRS = {"mods", "profiles", "deploy"}
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для установки архивов")
+
+
+def _inside_root(root_path: Path, value: str, field_name: str) -> Path:
+    """Разрешает путь относительно корня и запрещает выход за его пределы."""
+
+    path = (root_path / value).resolve()
+    if not path.is_relative_to(root_path.resolve()):
+        raise ValueError(f"{field_name} вне корня сборки: {value}")
+    return path
+
+
+def _extract_target(root_path: Path, value: str) -> Path:
+    """Каталог распаковки: строгий подкаталог workspace/, не служебный.
+
+    Каталог назначения заменяется целиком, поэтому корень, state/,
+    rootstate/, сам workspace/ и его служебные каталоги запрещены.
+    """
+
+    path = _inside_root(root_path, value, "target")
+    workspace = root_path.resolve() / "workspace"
+    if not path.is_relative_to(workspace) or path == workspace:
+        raise ValueError(f"target должен быть подкаталогом workspace/: {value}")
+    rel_parts = path.relative_to(workspace).parts
+    if len(rel_parts) == 1 and rel_parts[0] in _RESERVED_WORKSPACE_DIRS:
+        raise ValueError(f"target указывает на служебный каталог workspace/: {value}")
+    return path
+
+
+def _payload_entries(step: StepIR) -> List[Mapping[str, Any]]:
+    """Возвращает список описаний архивов из payload шага."""
+
+    entries = step.payload.get("archives")
+    if entries is None and step.payload.get("archive"):
+        entries = [step.payload]
+    if not entries:
+        raise ValueError(f"{step.step_type}: не задан payload.archives")
+    return list(entries)
+
+
+def _resolve_name(entry: Mapping[str, Any], archive: Path) -> str:
+    """Определяет имя мода: явное или по имени файла архива."""
+
+    name = str(entry.get("name") or archive.name.split(".")[0])
+    if not name or Path(name).name != name or name.startswith("."):
+        raise ValueError(f"Некорректное имя мода: {name}")
+    return name
+
+
+def _resolve_remote_cache(ctx: Mapping[str, Any]) -> RemoteCache | None:
+    """Создает клиент удаленного кэша по ctx["remote_cache"], если он задан."""
+
+    options = ctx.get("remote_cache")
+    if not isinstance(options, Mapping) or not options.get("url"):
+        return None
+    return RemoteCache(
+        str(options["url"]),
+        timeout=float(options.get("timeout", 30.0)),
+        max_transfers=int(options.get("max_transfers", 8)),
+    )
+
+
+def _run_jobs(
+    step: StepIR,
+    ctx: Mapping[str, Any],
+    root_path: Path,
+    jobs: List[InstallJob],
+) -> List[InstallResult]:
+    """Запускает параллельную установку с лимитом из payload."""
+
+    max_workers = int(step.payload.get("max_workers", _DEFAULT_MAX_WORKERS))
+    return install_archives(
+        root_path,
+        jobs,
+        max_workers=max_workers,
+        remote=_resolve_remote_cache(ctx),
+    )
+
+
+def extract(step: StepIR, ctx: Mapping[str, Any]) -> List[InstallResult]:
+    """Распаковывает архивы в каталоги payload.archives[].target."""
+
+    root_path = _resolve_root_path(ctx)
+    jobs: List[InstallJob] = []
+    for entry in _payload_entries(step):
+        archive = _inside_root(root_path, str(entry["archive"]), "archive")
+        if not entry.get("target"):
+            raise ValueError("Extract: не задан target для архива")
+        target_dir = _extract_target(root_path, str(entry["target"]))
+        # Отдельное пространство имен манифестов, чтобы не пересечься с модами.
+        name = f"extract-{_resolve_name(entry, archive)}"
+        jobs.append(InstallJob(name=name, archive=archive, target_dir=target_dir))
+    return _run_jobs(step, ctx, root_path, jobs)
+
+
+def install_to_manager(step: StepIR, ctx: Mapping[str, Any]) -> List[InstallResult]:
+    """Устанавливает архивы модов в workspace/mods/<name>."""
+
+    root_path = _resolve_root_path(ctx)
+    mods_dir = root_path.resolve() / "workspace" / "mods"
+    jobs: List[InstallJob] = []
+    for entry in _payload_entries(step):
+        archive = _inside_root(root_path, str(entry["archive"]), "archive")
+        name = _resolve_name(entry, archive)
+        jobs.append(InstallJob(name=name, archive=archive, target_dir=mods_dir / name))
+    return _run_jobs(step, ctx, root_path, jobs)
@@ -0,0 +1,114 @@
+"""Шаги RootSnapshot/RootApply/RootRollback/RootVerify для Stock Game."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Mapping
+
+from modbs import rootstate
+from modbs.models import StepIR
+
+_DEFAULT_SNAPSHOT_ID = "baseline"
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для шага RootState")
+
+
+def _resolve_game_dir(step: StepIR, ctx: Mapping[str, Any]) -> Path:
+    """Определяет каталог Stock Game: payload → paths.stock_game → paths.skyrim."""
+
+    game_dir = step.payload.get("game_dir")
+    if game_dir:
+        return Path(game_dir)
+
+    paths = ctx.get("paths", {})
+    if isinstance(paths, Mapping):
+        for key in ("stock_game", "skyrim"):
+            if paths.get(key):
+                return Path(paths[key])
+
+    raise ValueError("Не задан каталог игры (paths.stock_game или paths.skyrim)")
+
+
+def _resolve_source_dir(step: StepIR, root_path: Path) -> Path:
+    """Определяет каталог root-файлов для RootApply внутри корня сборки."""
+
+    source = step.payload.get("source")
+    if not source:
+        raise ValueError("Не задан payload.source для RootApply")
+
+    source_dir = (root_path / str(source)).resolve()
+    if not source_dir.is_relative_to(root_path.resolve()):
+        raise ValueError(f"RootApply: source вне корня сборки: {source}")
+    return source_dir
+
+
+def _format_diff(diff: rootstate.RootDiff) -> str:
+    """Кратко описывает расхождения для сообщения об ошибке."""
+
+    parts = []
+    for label, paths in (("added", diff.added), ("changed", diff.changed), ("removed", diff.removed)):
+        if paths:
+            preview = ", ".join(paths[:5])
+            suffix = "…" if len(paths) > 5 else ""
+            parts.append(f"{label}: {preview}{suffix}")
+    return "; ".join(parts)
+
+
+def root_snapshot(step: StepIR, ctx: Mapping[str, Any]) -> None:
+    """Создает снимок Stock Game в rootstate/snapshots/<id>/.
+
+    Уже существующий снимок сохраняется; payload.refresh пересоздает его.
+    """
+
+    root_path = _resolve_root_path(ctx)
+    snapshot_id = str(step.payload.get("snapshot", _DEFAULT_SNAPSHOT_ID))
+    rootstate.take_snapshot(
+        _resolve_game_dir(step, ctx),
+        root_path / "rootstate",
+        snapshot_id,
+        refresh=bool(step.payload.get("refresh", False)),
+    )
+
+
+def root_apply(step: StepIR, ctx: Mapping[str, Any]) -> None:
+    """Накладывает root-файлы (ENB/ReShade) на Stock Game."""
+
+    root_path = _resolve_root_path(ctx)
+    rootstate.apply_overlay(
+        _resolve_game_dir(step, ctx),
+        root_path / "rootstate",
+        _resolve_source_dir(step, root_path),
+    )
+
+
+def root_rollback(step: StepIR, ctx: Mapping[str, Any]) -> None:
+    """Откатывает Stock Game к снимку, восстанавливая только отличия."""
+
+    root_path = _resolve_root_path(ctx)
+    snapshot_id = step.payload.get("snapshot")
+    rootstate.rollback(
+        _resolve_game_dir(step, ctx),
+        root_path / "rootstate",
+        str(snapshot_id) if snapshot_id else None,
+    )
+
+
+def root_verify(step: StepIR, ctx: Mapping[str, Any]) -> None:
+    """Проверяет инвариант RootState: корень = снимок + RootApply."""
+
+    root_path = _resolve_root_path(ctx)
+    diff = rootstate.verify(_resolve_game_dir(step, ctx), root_path / "rootstate")
+    if not diff.is_clean():
+        raise RuntimeError(f"RootVerify: корень игры расходится со снимком ({_format_diff(diff)})")
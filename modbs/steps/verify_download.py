@@ -0,0 +1,91 @@
+"""Шаг VerifyDownload: проверка архивов в cache/ по манифесту."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
+
+from modbs.downloads import DEFAULT_IO_CONCURRENCY, VerifyResult, verify_downloads
+from modbs.executor import StepBlockedError
+from modbs.manifest import iter_manifest, load_manifest_index
+from modbs.models import StepIR
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для VerifyDownload")
+
+
+def _resolve_entries(step: StepIR, ctx: Mapping[str, Any], root_path: Path) -> List[Dict[str, Any]]:
+    """Берет записи из payload.entries или из манифеста конфига.
+
+    При payload.mod_ids записи читаются точечно через индекс манифеста.
+    """
+
+    entries = step.payload.get("entries")
+    if entries is not None:
+        return [dict(entry) for entry in entries]
+
+    manifest_path = step.payload.get("manifest_path") or ctx.get("manifest_path")
+    if not manifest_path:
+        raise ValueError("VerifyDownload: не задан manifest_path")
+
+    path = Path(manifest_path)
+    if not path.is_absolute():
+        path = root_path / path
+
+    mod_ids = step.payload.get("mod_ids")
+    if mod_ids is not None:
+        index = load_manifest_index(root_path, path)
+        entries = []
+        for mod_id in mod_ids:
+            entry = index.get(str(mod_id))
+            if entry is None:
+                raise ValueError(f"VerifyDownload: мод {mod_id} не найден в манифесте")
+            if entry.get("archive"):
+                entries.append(entry)
+        return entries
+    return [entry for entry in iter_manifest(path) if entry.get("archive")]
+
+
+def _describe(results: List[VerifyResult], status: str) -> str:
+    """Перечисляет архивы с заданным статусом."""
+
+    names = [result.archive for result in results if result.status == status]
+    preview = ", ".join(names[:5])
+    return f"{preview}…" if len(names) > 5 else preview
+
+
+def verify_download(step: StepIR, ctx: Mapping[str, Any]) -> List[VerifyResult]:
+    """Проверяет sha256 скачанных архивов.
+
+    Несовпадение хэша или отсутствие ожидаемого digest — Failed (HashMismatch);
+    отсутствующий архив — Blocked: сначала нужен Acquire.
+    """
+
+    root_path = _resolve_root_path(ctx)
+    entries = _resolve_entries(step, ctx, root_path)
+    io_concurrency = int(step.payload.get("io_concurrency", DEFAULT_IO_CONCURRENCY))
+
+    results = verify_downloads(root_path, entries, io_concurrency=io_concurrency)
+
+    statuses = {result.status for result in results}
+    if "mismatch" in statuses:
+        raise RuntimeError(f"HashMismatch: {_describe(results, 'mismatch')}")
+    if "unverified" in statuses:
+        raise RuntimeError(f"Нет ожидаемого sha256 в манифесте: {_describe(results, 'unverified')}")
+    if "missing" in statuses:
+        raise StepBlockedError(
+            f"Архивы не скачаны: {_describe(results, 'missing')}",
+            source="downloads",
+        )
+    return results
@@ -0,0 +1,106 @@
+"""Шаг RunXEditQAC: quick auto clean грязных плагинов через xEdit."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, List, Mapping
+
+from modbs.adapters.xedit import DEFAULT_TIMEOUT, QACResult, run_qac
+from modbs.deploy import default_target_dir
+from modbs.executor import StepBlockedError
+from modbs.models import StepIR
+from modbs.plugins import iter_mod_plugins
+
+
+def _resolve_root_path(ctx: Mapping[str, Any]) -> Path:
+    """Возвращает корневой путь из контекста выполнения."""
+
+    if "root_path" in ctx:
+        return Path(ctx["root_path"])
+
+    paths = ctx.get("paths", {})
+    root = paths.get("root") if isinstance(paths, Mapping) else None
+    if root:
+        return Path(root)
+
+    raise ValueError("Не задан корневой путь для RunXEditQAC")
+
+
+def _resolve_plugins(step: StepIR, root_path: Path) -> List[Path]:
+    """Плагины из payload.plugins или все плагины в workspace/mods/<mod>/."""
+
+    root = root_path.resolve()
+    plugins = step.payload.get("plugins")
+    if plugins is None:
+        return list(iter_mod_plugins(root / "workspace" / "mods"))
+
+    resolved: List[Path] = []
+    for value in plugins:
+        path = (root / str(value)).resolve()
+        if not path.is_relative_to(root):
+            raise ValueError(f"Плагин вне корня сборки: {value}")
+        if not path.is_file():
+            raise FileNotFoundError(f"Не найден плагин: {value}")
+        resolved.append(path)
+    return resolved
+
+
+def _resolve_data_dir(step: StepIR, ctx: Mapping[str, Any], root_path: Path) -> Path:
+    """Data для xEdit: payload.data_dir или деплой профиля (DeployProfile)."""
+
+    data_dir = step.payload.get("data_dir")
+    if data_dir:
+        resolved = (root_path / str(data_dir)).resolve()
+        if not resolved.is_relative_to(root_path):
+            raise ValueError(f"RunXEditQAC: data_dir вне корня сборки: {data_dir}")
+    else:
+        profile = step.payload.get("profile") or ctx.get("profile_name")
+        if not profile:
+            raise ValueError("Не задано имя профиля для RunXEditQAC")
+        resolved = default_target_dir(root_path, str(profile))
+
+    if not resolved.is_dir():
+        raise StepBlockedError(
+            f"Data профиля не развернут: {resolved} (сначала выполните DeployProfile)",
+            source="deploy",
+        )
+    return resolved
+
+
+def run_xedit_qac(step: StepIR, ctx: Mapping[str, Any]) -> List[QACResult]:
+    """Чистит плагины; Blocked, если xEdit не настроен или не найден.
+
+    Настройки берутся из ctx["xedit"] (секция xedit конфига):
+    path, args, version, max_workers, timeout. payload.max_workers
+    переопределяет размер пула.
+
+    Профиль должен быть развернут DeployProfile до этого шага: xEdit
+    получает -D:<workspace/deploy/<profile>/Data> (или payload.data_dir)
+    и ищет там модуль и его мастера. Без деплоя шаг Blocked.
+    """
+
+    options = ctx.get("xedit")
+    if not isinstance(options, Mapping) or not options.get("path"):
+        raise StepBlockedError("xEdit недоступен: не задан xedit.path", source="xedit")
+    executable = Path(str(options["path"]))
+    if not executable.is_file():
+        raise StepBlockedError(f"xEdit недоступен: не найден {executable}", source="xedit")
+
+    root_path = _resolve_root_path(ctx).resolve()
+    max_workers = step.payload.get("max_workers", options.get("max_workers"))
+    results = run_qac(
+        root_path,
+        _resolve_plugins(step, root_path),
+        executable,
+        _resolve_data_dir(step, ctx, root_path),
+        extra_args=[str(arg) for arg in options.get("args", [])],
+        version=options.get("version"),
+        max_workers=int(max_workers) if max_workers else None,
+        timeout=float(options.get("timeout", DEFAULT_TIMEOUT)),
+    )
+
+    failed = [result for result in results if result.status == "failed"]
+    if failed:
+        details = "; ".join(f"{result.plugin}: {result.errors[0]}" for result in failed)
+        raise RuntimeError(f"RunXEditQAC: не удалось очистить {len(failed)} плагин(ов): {details}")
+    return results
@@ -1,4 +1,13 @@
-"""Сериализация и десериализация Plan IR."""
+"""Запись файлов state/ и сериализация Plan IR.
+
+- атомарная запись JSON и текста через временный файл и rename с
+  уровнями надежности full (fsync) и buffered;
+- append_jsonl — дозапись журналов JSONL без перезаписи файла;
+- StateTransaction — согласованная замена нескольких файлов каталога
+  через манифест .txn.json; recover_transaction доводит прерванную
+  фиксацию до конца, pending_transaction показывает ее читателям;
+- сериализация и десериализация Plan IR.
+"""
 
 from __future__ import annotations
 
@@ -7,36 +16,85 @@ import os
 import tempfile
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Iterable, Union
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, TypeVar, Union
 
 from .models import EdgeIR, PlanIR, StepIR
+from .trace import span
 
 PathLike = Union[str, Path]
+_T = TypeVar("_T")
 
+DURABILITY_FULL = "full"
+DURABILITY_BUFFERED = "buffered"
+DURABILITY_LEVELS = {DURABILITY_FULL, DURABILITY_BUFFERED}
 
-def _atomic_write_text(path: Path, content: str) -> None:
-    """Атомарно записывает текст: временный файл → rename."""
+_TXN_MANIFEST_NAME = ".txn.json"
+_TXN_TEMP_PREFIX = ".txn-"
+
+
+def _validate_durability(durability: str) -> None:
+    """Проверяет, что уровень надежности записи поддерживается."""
+
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(
+            f"Неизвестный уровень durability: {durability}. "
+            "Ожидались: full, buffered."
+        )
+
+
+def _fsync_dir(path: Path) -> None:
+    """Сбрасывает на диск запись каталога (rename/unlink внутри него)."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Windows не позволяет открыть каталог как файл — пропускаем.
+        return
+    try:
+        with span("fsync_dir", "io", path=path.name):
+            os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_temp_file(directory: Path, content: bytes, durability: str, prefix: str = "") -> Path:
+    """Пишет содержимое во временный файл каталога и возвращает его путь."""
 
-    path.parent.mkdir(parents=True, exist_ok=True)
     with tempfile.NamedTemporaryFile(
-        "w",
-        encoding="utf-8",
-        dir=path.parent,
+        "wb",
+        dir=directory,
+        prefix=prefix or "tmp",
+        suffix=".tmp",
         delete=False,
     ) as handle:
         handle.write(content)
         handle.flush()
-        os.fsync(handle.fileno())
-        temp_path = Path(handle.name)
-    os.replace(temp_path, path)
+        if durability == DURABILITY_FULL:
+            with span("fsync", "io", bytes=len(content)):
+                os.fsync(handle.fileno())
+        return Path(handle.name)
 
 
-def write_json(path: PathLike, payload: Any) -> None:
+def _atomic_write_text(path: Path, content: str, durability: str = DURABILITY_FULL) -> None:
+    """Атомарно записывает текст: временный файл → rename."""
+
+    _validate_durability(durability)
+    with span("atomic_write", "io", path=path.name, durability=durability):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = _write_temp_file(path.parent, content.encode("utf-8"), durability)
+        os.replace(temp_path, path)
+        if durability == DURABILITY_FULL:
+            _fsync_dir(path.parent)
+
+
+def write_json(path: PathLike, payload: Any, durability: str = DURABILITY_FULL) -> None:
     """Сохраняет JSON с атомарной записью."""
 
     target = Path(path)
     content = json.dumps(payload, ensure_ascii=False, indent=2)
-    _atomic_write_text(target, content)
+    _atomic_write_text(target, content, durability)
 
 
 def read_json(path: PathLike) -> Any:
@@ -47,8 +105,16 @@ def read_json(path: PathLike) -> Any:
         return json.load(handle)
 
 
-def append_jsonl(path: PathLike, payloads: Iterable[Any] | Any) -> None:
-    """Добавляет строки JSONL в файл без перезаписи существующих данных."""
+def append_jsonl(
+    path: PathLike,
+    payloads: Iterable[Any] | Any,
+    durability: str = DURABILITY_FULL,
+) -> None:
+    """Добавляет строки JSONL в файл без перезаписи существующих данных.
+
+    Запись идет в конец файла (O_APPEND), поэтому стоимость зависит только
+    от объема новых строк, а не от размера журнала.
+    """
 
     target = Path(path)
     if isinstance(payloads, (list, tuple)):
@@ -56,27 +122,203 @@ def append_jsonl(path: PathLike, payloads: Iterable[Any] | Any) -> None:
     else:
         items = [payloads]
 
-    existing_text = ""
-    if target.exists():
-        existing_text = target.read_text(encoding="utf-8")
+    _validate_durability(durability)
+    if not items:
+        return
 
     new_lines = [json.dumps(item, ensure_ascii=False) for item in items]
-    append_text = "\n".join(new_lines)
-
-    combined = existing_text
-    if combined and not combined.endswith("\n"):
-        combined += "\n"
-    if append_text:
-        combined += append_text + "\n"
-
-    _atomic_write_text(target, combined)
+    append_bytes = ("\n".join(new_lines) + "\n").encode("utf-8")
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "a+b") as handle:
+        # Если прошлая запись оборвалась без перевода строки, начинаем с новой.
+        if handle.seek(0, os.SEEK_END) > 0:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b"\n":
+                append_bytes = b"\n" + append_bytes
+        handle.write(append_bytes)
+        handle.flush()
+        if durability == DURABILITY_FULL:
+            with span("fsync", "io", bytes=len(append_bytes)):
+                os.fsync(handle.fileno())
 
 
-def write_text(path: PathLike, text: str) -> None:
+def write_text(path: PathLike, text: str, durability: str = DURABILITY_FULL) -> None:
     """Сохраняет текст с атомарной записью."""
 
     target = Path(path)
-    _atomic_write_text(target, text)
+    _atomic_write_text(target, text, durability)
+
+
+class StateTransaction:
+    """Транзакция над несколькими файлами одного каталога.
+
+    Файлы сначала пишутся во временные копии, затем одной атомарной заменой
+    публикуется манифест транзакции (точка фиксации), после чего временные
+    файлы переименовываются в целевые. Если процесс упал после фиксации,
+    recover_transaction() довершает переименования; если до — временные
+    файлы просто удаляются.
+    """
+
+    def __init__(self, directory: PathLike, durability: str = DURABILITY_FULL) -> None:
+        _validate_durability(durability)
+        self.directory = Path(directory)
+        self.durability = durability
+        self._writes: Dict[str, bytes] = {}
+        self._streamed: Dict[str, str] = {}
+        self._deletes: List[str] = []
+        self._committed = False
+        self._prepared = False
+
+    def __enter__(self) -> "StateTransaction":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # При исключении транзакция просто не фиксируется.
+        if exc_type is None and not self._committed:
+            self.commit()
+
+    @staticmethod
+    def _check_name(name: str) -> None:
+        """Разрешает только имена файлов внутри каталога транзакции."""
+
+        if not name or Path(name).name != name or name.startswith(_TXN_TEMP_PREFIX):
+            raise ValueError(f"Недопустимое имя файла в транзакции: {name}")
+
+    def stage_text(self, name: str, text: str) -> None:
+        """Добавляет в транзакцию запись текстового файла."""
+
+        self._check_name(name)
+        self._writes[name] = text.encode("utf-8")
+
+    def stage_stream(self, name: str, write: Callable[[BinaryIO], _T]) -> _T:
+        """Добавляет файл, содержимое которого write пишет в поток.
+
+        Временная копия пишется сразу, без буфера в памяти; возвращается
+        результат write. Если транзакция не будет зафиксирована, копию
+        удалит следующий recover_transaction().
+        """
+
+        self._check_name(name)
+        self._prepare()
+        with tempfile.NamedTemporaryFile(
+            "wb",
+            dir=self.directory,
+            prefix=_TXN_TEMP_PREFIX,
+            suffix=".tmp",
+            delete=False,
+        ) as handle:
+            result = write(handle)
+            handle.flush()
+            if self.durability == DURABILITY_FULL:
+                with span("fsync", "io", bytes=handle.tell()):
+                    os.fsync(handle.fileno())
+        self._streamed[name] = Path(handle.name).name
+        return result
+
+    def _prepare(self) -> None:
+        """Создает каталог и довершает прошлую транзакцию до первой записи."""
+
+        if not self._prepared:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            recover_transaction(self.directory, self.durability)
+            self._prepared = True
+
+    def stage_json(self, name: str, payload: Any) -> None:
+        """Добавляет в транзакцию запись JSON-файла."""
+
+        self.stage_text(name, json.dumps(payload, ensure_ascii=False, indent=2))
+
+    def stage_delete(self, name: str) -> None:
+        """Добавляет в транзакцию удаление файла."""
+
+        self._check_name(name)
+        self._deletes.append(name)
+
+    def commit(self) -> None:
+        """Фиксирует все подготовленные изменения как одно целое."""
+
+        if self._committed:
+            raise RuntimeError("Транзакция уже зафиксирована")
+        self._committed = True
+
+        self._prepare()
+
+        replacements: List[List[str]] = [[temp_name, name] for name, temp_name in self._streamed.items()]
+        for name, content in self._writes.items():
+            temp_path = _write_temp_file(
+                self.directory,
+                content,
+                self.durability,
+                prefix=_TXN_TEMP_PREFIX,
+            )
+            replacements.append([temp_path.name, name])
+
+        manifest = {"replace": replacements, "delete": self._deletes}
+        # Точка фиксации: после публикации манифеста изменения необратимы.
+        _atomic_write_text(
+            self.directory / _TXN_MANIFEST_NAME,
+            json.dumps(manifest, ensure_ascii=False),
+            self.durability,
+        )
+        _roll_forward(self.directory, manifest, self.durability)
+
+
+def _roll_forward(directory: Path, manifest: Dict[str, Any], durability: str) -> None:
+    """Применяет зафиксированный манифест транзакции (идемпотентно)."""
+
+    for temp_name, name in manifest.get("replace", []):
+        try:
+            os.replace(directory / temp_name, directory / name)
+        except FileNotFoundError:
+            # Уже перенесен прошлым (прерванным) довершением.
+            pass
+    for name in manifest.get("delete", []):
+        (directory / name).unlink(missing_ok=True)
+
+    if durability == DURABILITY_FULL:
+        _fsync_dir(directory)
+    (directory / _TXN_MANIFEST_NAME).unlink(missing_ok=True)
+
+
+def recover_transaction(directory: PathLike, durability: str = DURABILITY_FULL) -> bool:
+    """Довершает прерванную транзакцию в каталоге.
+
+    Возвращает True, если был найден и применен манифест транзакции.
+    Вызывается только писателями под exclusive-блокировкой каталога;
+    читатели смотрят на незавершенную транзакцию через pending_transaction().
+    """
+
+    target_dir = Path(directory)
+    manifest_path = target_dir / _TXN_MANIFEST_NAME
+    recovered = False
+
+    if manifest_path.exists():
+        _roll_forward(target_dir, read_json(manifest_path), durability)
+        recovered = True
+
+    # Временные файлы без манифеста — транзакция не дошла до фиксации.
+    for temp_path in target_dir.glob(f"{_TXN_TEMP_PREFIX}*.tmp"):
+        temp_path.unlink(missing_ok=True)
+
+    return recovered
+
+
+def pending_transaction(directory: PathLike) -> Dict[str, str | None]:
+    """Зафиксированная, но не довершенная транзакция каталога (только чтение).
+
+    Возвращает имя файла → имя временной копии с новым содержимым или
+    None для удаляемого файла; пустой словарь, если манифеста нет.
+    """
+
+    try:
+        manifest = read_json(Path(directory) / _TXN_MANIFEST_NAME)
+    except FileNotFoundError:
+        return {}
+
+    pending: Dict[str, str | None] = {name: None for name in manifest.get("delete", [])}
+    pending.update({name: temp_name for temp_name, name in manifest.get("replace", [])})
+    return pending
 
 
 def plan_ir_to_dict(plan: PlanIR) -> Dict[str, Any]:
@@ -0,0 +1,111 @@
+"""Экспорт трассировки apply в формате Chrome Trace Event (chrome://tracing, Perfetto).
+
+Трассировка включается явно (modbs apply --trace). Пока она выключена,
+span() возвращает пустой контекст и стоит один вызов функции.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+_ACTIVE: "Tracer | None" = None
+
+
+class Tracer:
+    """Собирает complete-события (ph=X) с pid/tid из всех потоков."""
+
+    def __init__(self) -> None:
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._thread_names: Dict[int, str] = {}
+
+    def _now_us(self) -> float:
+        """Микросекунды от начала трассировки."""
+
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    @contextmanager
+    def span(self, name: str, cat: str, args: Dict[str, Any] | None = None) -> Iterator[Dict[str, Any]]:
+        """Замеряет участок кода; в возвращенный словарь можно дописать args."""
+
+        span_args: Dict[str, Any] = dict(args or {})
+        thread = threading.current_thread()
+        start = self._now_us()
+        try:
+            yield span_args
+        finally:
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(start, 3),
+                "dur": round(self._now_us() - start, 3),
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": span_args,
+            }
+            with self._lock:
+                self._events.append(event)
+                self._thread_names.setdefault(thread.ident or 0, thread.name)
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Возвращает события вместе с метаданными имен потоков."""
+
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in sorted(thread_names.items())
+        ]
+        return metadata + sorted(events, key=lambda item: item["ts"])
+
+
+def start_trace() -> Tracer:
+    """Включает сбор трассировки для текущего процесса."""
+
+    global _ACTIVE
+    _ACTIVE = Tracer()
+    return _ACTIVE
+
+
+def stop_trace(path: Path | None = None) -> List[Dict[str, Any]]:
+    """Выключает трассировку и при необходимости пишет trace.json.
+
+    Файл пишется напрямую, а не через storage: иначе запись самой
+    трассировки попала бы в трассу.
+    """
+
+    global _ACTIVE
+    tracer, _ACTIVE = _ACTIVE, None
+    if tracer is None:
+        return []
+
+    events = tracer.events()
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, handle, ensure_ascii=False)
+    return events
+
+
+def span(name: str, cat: str, **args: Any):
+    """Контекст замера участка; без активной трассировки ничего не делает."""
+
+    tracer = _ACTIVE
+    if tracer is None:
+        return nullcontext({})
+    return tracer.span(name, cat, args)
@@ -0,0 +1,117 @@
+"""Тесты чтения оглавления BSA."""
+
+import struct
+from pathlib import Path
+
+import modbs.bsa
+from modbs.bsa import load_bsa_listings, read_bsa_listing
+from modbs.conflicts import build_conflict_index
+from modbs.report import generate_report
+
+
+def _write_bsa(path: Path, files: dict[str, bytes], version: int = 105) -> None:
+    """Создает несжатый BSA с таблицами каталогов и имен файлов."""
+
+    folders: dict[str, list[tuple[str, bytes]]] = {}
+    for rel_path, data in files.items():
+        folder, _, name = rel_path.rpartition("/")
+        folders.setdefault(folder.replace("/", "\\"), []).append((name, data))
+
+    folder_size = 16 if version == 104 else 24
+    folder_records = b""
+    file_blocks = b""
+    file_names = b""
+    bodies = b""
+    for folder, entries in folders.items():
+        if version == 104:
+            folder_records += struct.pack("<QII", 0, len(entries), 0)
+        else:
+            folder_records += struct.pack("<QI4xQ", 0, len(entries), 0)
+        encoded = folder.encode("cp1252") + b"\0"
+        file_blocks += bytes([len(encoded)]) + encoded
+        for name, data in entries:
+            file_blocks += struct.pack("<QII", 0, len(data), len(bodies))
+            file_names += name.encode("cp1252") + b"\0"
+            bodies += data
+
+    header = struct.pack(
+        "<4sIIIIIIIH2x",
+        b"BSA\0",
+        version,
+        36,
+        0x3,
+        len(folders),
+        len(files),
+        sum(len(folder) + 1 for folder in folders),
+        len(file_names),
+        0,
+    )
+    assert len(folder_records) == folder_size * len(folders)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(header + folder_records + file_blocks + file_names + bodies)
+
+
+def test_read_bsa_listing_v104_and_v105(tmp_path: Path) -> None:
+    """Проверяем разбор оглавления обеих версий без распаковки."""
+
+    files = {"textures/rock.dds": b"x" * 10, "meshes/tree.nif": b"y" * 3, "textures/sky.dds": b"z"}
+    for version in (104, 105):
+        archive = tmp_path / f"v{version}.bsa"
+        _write_bsa(archive, files, version)
+
+        listing = {entry.path: entry.size for entry in read_bsa_listing(archive)}
+
+        assert listing == {"textures/rock.dds": 10, "meshes/tree.nif": 3, "textures/sky.dds": 1}
+
+
+def test_load_bsa_listings_uses_cache(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что повторное чтение берет оглавление из кэша."""
+
+    archive = tmp_path / "workspace" / "mods" / "Pack" / "Pack.bsa"
+    _write_bsa(archive, {"textures/a.dds": b"a"})
+    load_bsa_listings(tmp_path, [archive])
+
+    def _fail(path: Path):
+        raise AssertionError("оглавление должно браться из кэша")
+
+    monkeypatch.setattr(modbs.bsa, "read_bsa_listing", _fail)
+    listings = load_bsa_listings(tmp_path, [archive])
+
+    assert [entry.path for entry in listings["workspace/mods/Pack/Pack.bsa"]] == ["textures/a.dds"]
+
+
+def test_conflict_index_loose_files_beat_packed(tmp_path: Path) -> None:
+    """Проверяем, что loose-файл выигрывает у BSA даже у менее приоритетного мода."""
+
+    mods_dir = tmp_path / "workspace" / "mods"
+    (mods_dir / "Loose" / "textures").mkdir(parents=True)
+    (mods_dir / "Loose" / "textures" / "rock.dds").write_bytes(b"loose")
+    _write_bsa(mods_dir / "Packed" / "Packed.bsa", {"textures/rock.dds": b"packed"})
+    profile_dir = tmp_path / "workspace" / "profiles" / "Default"
+    profile_dir.mkdir(parents=True)
+    (profile_dir / "modlist.txt").write_text("+Packed\n+Loose\n", encoding="utf-8")
+
+    index = build_conflict_index(tmp_path, "Default")
+
+    assert index.providers("textures/rock.dds") == ["Packed", "Loose"]
+    assert index.winner("textures/rock.dds") == "Loose"
+    assert index.is_packed("Packed", "textures/rock.dds")
+    assert index.summary()["packed"] == 1
+
+
+def test_conflict_index_skips_corrupt_bsa_with_warning(tmp_path: Path) -> None:
+    """Проверяем, что битый BSA дает предупреждение, а свободные файлы индексируются."""
+
+    mods_dir = tmp_path / "workspace" / "mods"
+    (mods_dir / "Broken" / "textures").mkdir(parents=True)
+    (mods_dir / "Broken" / "textures" / "rock.dds").write_bytes(b"loose")
+    (mods_dir / "Broken" / "Broken.bsa").write_bytes(b"BSA\0truncated")
+
+    index = build_conflict_index(tmp_path, "Default")
+
+    assert index.winner("textures/rock.dds") == "Broken"
+    summary = index.summary()
+    assert summary["warnings"] == ["Broken/Broken.bsa: Некорректный BSA: Broken.bsa"]
+    # Предупреждение сохраняется в индексе и без пересканирования мода.
+    assert build_conflict_index(tmp_path, "Default").summary()["warnings"] == summary["warnings"]
+    assert "- Warning: Broken/Broken.bsa" in generate_report(tmp_path)
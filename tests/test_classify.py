@@ -0,0 +1,112 @@
+"""Тесты классификации изменений (ArtifactClassify) и инкрементального плана."""
+
+from pathlib import Path
+
+from modbs import classify
+from modbs.cli import cmd_apply, cmd_plan
+from modbs.models import StepIR
+from modbs.steps.artifact_classify import artifact_classify
+from modbs.storage import read_json, write_json
+
+
+def _write(root: Path, rel_path: str, data: bytes) -> None:
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_classify_by_extension_magic_and_path(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем классы влияния, расхождение сигнатуры и кэш по digest."""
+
+    mod = "workspace/mods/Mod"
+    _write(tmp_path, f"{mod}/Mod.esp", b"TES4" + b"\0" * 20)
+    _write(tmp_path, f"{mod}/SKSE/Plugins/Engine.dll", b"MZ\x90\0")
+    _write(tmp_path, f"{mod}/Root/enbseries.ini", b"[GLOBAL]")
+    _write(tmp_path, f"{mod}/meshes/rock.nif", b"DDS \x7c\0\0\0")
+    _write(tmp_path, f"{mod}/textures/rock.dds", b"DDS \x7c\0\0\0")
+    _write(tmp_path, f"{mod}/meshes/actors/character/animations/walk.hkx", b"\x57\xe0\xe0\x57\x10\xc0\xc0\x10")
+    _write(tmp_path, f"{mod}/DynDOLOD/DynDOLOD_SSE_mod.txt", b"rules")
+    step = StepIR(step_id="classify", step_type="ArtifactClassify", label="Classify")
+
+    impact = artifact_classify(step, {"root_path": tmp_path})
+
+    assert impact["classes"] == {
+        "animation": [f"{mod}/meshes/actors/character/animations/walk.hkx"],
+        "generator": [f"{mod}/DynDOLOD/DynDOLOD_SSE_mod.txt"],
+        "plugin": [f"{mod}/Mod.esp"],
+        "root": [f"{mod}/Root/enbseries.ini"],
+        "skse_dll": [f"{mod}/SKSE/Plugins/Engine.dll"],
+        "texture": [f"{mod}/meshes/rock.nif", f"{mod}/textures/rock.dds"],
+    }
+    assert impact["files"][f"{mod}/meshes/rock.nif"]["mismatch"] == {"extension": "nif", "content": "dds"}
+    assert impact["invalidates"] == [
+        "DeployOutput",
+        "DynDOLODOutput",
+        "LoadOrder",
+        "NemesisOutput",
+        "RootState",
+        "XEditOutput",
+    ]
+    assert read_json(tmp_path / "state" / "impact.json") == impact
+
+    # Повторная классификация тех же digest не читает файлы.
+    def _fail(path: Path) -> bytes:
+        raise AssertionError(f"Повторное чтение {path}")
+
+    monkeypatch.setattr(classify, "_read_head", _fail)
+    assert artifact_classify(step, {"root_path": tmp_path})["classes"] == impact["classes"]
+
+
+def test_incremental_plan_keeps_only_invalidated_steps(tmp_path: Path) -> None:
+    """Проверяем, что текстура не перезапускает LOOT, а новый плагин — да."""
+
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {
+            "profile_name": "MVP",
+            "paths": {"root": str(tmp_path)},
+            "loot": {"mode": "mock"},
+            "plan": {"incremental": True},
+        },
+    )
+    cmd_plan(config_path)
+    cmd_apply(tmp_path, config_path)
+
+    _write(tmp_path, "workspace/mods/Rocks/textures/rock.dds", b"DDS \x7c\0\0\0")
+    plan = read_json(cmd_plan(config_path))
+    assert [step["step_type"] for step in plan["steps"]] == ["WorkspaceInit", "Checkpoint", "Report"]
+    assert "LoadOrder" not in plan["meta"]["invalidates"]
+
+    _write(tmp_path, "workspace/mods/Rocks/Rocks.esp", b"TES4" + b"\0" * 20)
+    plan = read_json(cmd_plan(config_path))
+    assert "RunLOOT" in [step["step_type"] for step in plan["steps"]]
+
+
+def test_incremental_plan_invalidates_all_on_config_inputs_change(tmp_path: Path) -> None:
+    """Проверяем, что изменение правил LOOT возвращает RunLOOT до следующего Checkpoint."""
+
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text("{}", encoding="utf-8")
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {
+            "profile_name": "MVP",
+            "paths": {"root": str(tmp_path)},
+            "loot": {"mode": "mock", "rules": "rules.json"},
+            "plan": {"incremental": True},
+        },
+    )
+    cmd_plan(config_path)
+    cmd_apply(tmp_path, config_path)
+    assert "RunLOOT" not in [step["step_type"] for step in read_json(cmd_plan(config_path))["steps"]]
+
+    rules_path.write_text('{"plugins": []}', encoding="utf-8")
+    for _ in range(2):
+        plan = read_json(cmd_plan(config_path))
+        assert "RunLOOT" in [step["step_type"] for step in plan["steps"]]
+        assert "LoadOrder" in plan["meta"]["invalidates"]
+
+    cmd_apply(tmp_path, config_path)
+    assert "RunLOOT" not in [step["step_type"] for step in read_json(cmd_plan(config_path))["steps"]]
@@ -1,8 +1,9 @@
 """Интеграционные тесты для CLI сценариев."""
 
+import json
 from pathlib import Path
 
-from modbs.cli import cmd_apply, cmd_init, cmd_plan, cmd_report
+from modbs.cli import cmd_apply, cmd_init, cmd_plan, cmd_report, cmd_status
 from modbs.storage import read_json, write_json
 
 
@@ -77,3 +78,69 @@ def test_report_contains_step_statuses(tmp_path: Path) -> None:
     assert "- run_loot: Succeeded" in content
     assert "- checkpoint: Succeeded" in content
     assert "- report: Succeeded" in content
+
+
+def test_cli_apply_resume_skips_completed_steps(tmp_path: Path) -> None:
+    """Проверяем state/resume.json после Blocked и apply --resume."""
+
+    config_path = _write_config(tmp_path)
+    config = read_json(config_path)
+    config["loot"] = {"mode": "blocked"}
+    write_json(config_path, config)
+    cmd_plan(config_path)
+
+    blocked = cmd_apply(tmp_path, config_path)
+
+    assert blocked.status == "Blocked"
+    resume = read_json(tmp_path / "state" / "resume.json")
+    assert resume["completed"] == ["workspace_init", "write_mo2_profile"]
+    assert resume["parked"]["run_loot"]["source"] == "loot"
+
+    config["loot"] = {"mode": "mock"}
+    write_json(config_path, config)
+    resumed = cmd_apply(tmp_path, config_path, resume=True)
+
+    assert resumed.status == "Succeeded"
+    assert resumed.executed_step_ids == ["run_loot", "checkpoint", "report"]
+    assert not (tmp_path / "state" / "resume.json").exists()
+
+
+def test_cli_plan_is_noop_when_inputs_unchanged(tmp_path: Path) -> None:
+    """Проверяем кэш плана по отпечатку конфига и манифеста."""
+
+    config_path = _write_config(tmp_path)
+    config = read_json(config_path)
+    config["manifest_path"] = "manifest.json"
+    write_json(config_path, config)
+    write_json(tmp_path / "manifest.json", {"mods": []})
+
+    plan_path = cmd_plan(config_path)
+    meta = read_json(plan_path)["meta"]
+    first_mtime = plan_path.stat().st_mtime_ns
+
+    assert "config" not in meta
+    assert meta["config_ref"] == str(config_path.resolve())
+    assert cmd_plan(config_path) == plan_path
+    assert plan_path.stat().st_mtime_ns == first_mtime
+
+    write_json(tmp_path / "manifest.json", {"mods": [{"id": "a"}]})
+    cmd_plan(config_path)
+
+    assert read_json(plan_path)["meta"]["fingerprint"] != meta["fingerprint"]
+    assert cmd_apply(tmp_path, None).status == "Succeeded"
+
+
+def test_cli_status_shows_last_run(tmp_path: Path) -> None:
+    """Проверяем, что status видит только последний запуск apply."""
+
+    config_path = _write_config(tmp_path)
+    cmd_plan(config_path)
+    cmd_apply(tmp_path, config_path)
+    cmd_apply(tmp_path, config_path)
+
+    output = cmd_status(tmp_path)
+    status = json.loads(cmd_status(tmp_path, as_json=True))
+
+    assert output.startswith(f"Run: {status['run_id']} — Succeeded")
+    assert status["current_step"]["step_id"] == "report"
+    assert status["steps"] == {"Succeeded": 5}
@@ -0,0 +1,87 @@
+"""Тесты индекса конфликтов модов."""
+
+from pathlib import Path
+
+import modbs.conflicts
+from modbs.conflicts import build_conflict_index, read_modlist
+from modbs.report import generate_report
+
+
+def _write_mod(root: Path, mod: str, files: list[str]) -> None:
+    """Создает мод с указанными файлами в workspace/mods/."""
+
+    for rel_path in files:
+        path = root / "workspace" / "mods" / mod / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(mod, encoding="utf-8")
+
+
+def _write_modlist(root: Path, lines: list[str]) -> None:
+    """Записывает modlist.txt профиля Default."""
+
+    profile_dir = root / "workspace" / "profiles" / "Default"
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    (profile_dir / "modlist.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_conflict_index_resolves_winner_by_modlist(tmp_path: Path) -> None:
+    """Проверяем победителя по modlist.txt и запросы overwrites/overwritten_by."""
+
+    _write_mod(tmp_path, "Base", ["textures/Rock.dds", "meshes/tree.nif"])
+    _write_mod(tmp_path, "Patch", ["Textures/rock.dds"])
+    _write_mod(tmp_path, "Off", ["textures/rock.dds"])
+    _write_modlist(tmp_path, ["# header", "+Patch", "-Off", "+Base"])
+
+    assert read_modlist(tmp_path / "workspace" / "profiles" / "Default") == ["Base", "Patch"]
+
+    index = build_conflict_index(tmp_path, "Default")
+
+    assert index.providers("TEXTURES\\rock.dds") == ["Base", "Patch"]
+    assert index.winner("textures/rock.dds") == "Patch"
+    assert index.winner("meshes/tree.nif") == "Base"
+    assert index.overwrites("Patch") == {"Textures/rock.dds": ["Base"]}
+    assert index.overwritten_by("Base") == {"textures/Rock.dds": "Patch"}
+    assert index.summary()["conflicts"] == 1
+
+
+def test_conflict_index_rescans_only_changed_mods(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем инкрементальное обновление: пересканируется только измененный мод."""
+
+    _write_mod(tmp_path, "Base", ["a.txt"])
+    _write_mod(tmp_path, "Patch", ["b.txt"])
+    _write_modlist(tmp_path, ["+Patch", "+Base"])
+    build_conflict_index(tmp_path, "Default")
+
+    scanned: list[str] = []
+    original = modbs.conflicts._walk_mod
+
+    def _tracking_walk(mod_dir: Path, files):
+        scanned.append(mod_dir.name)
+        return original(mod_dir, files)
+
+    monkeypatch.setattr(modbs.conflicts, "_walk_mod", _tracking_walk)
+    _write_mod(tmp_path, "Patch", ["a.txt"])
+
+    index = build_conflict_index(tmp_path, "Default")
+
+    # Неизмененный мод проверяется по stat каталогов, без обхода.
+    assert scanned == ["Patch"]
+    assert index.winner("a.txt") == "Patch"
+
+    _write_mod(tmp_path, "Base", ["deep/nested/c.txt"])
+    assert build_conflict_index(tmp_path, "Default").winner("deep/nested/c.txt") == "Base"
+    assert scanned == ["Patch", "Base"]
+
+
+def test_report_includes_conflict_summary(tmp_path: Path) -> None:
+    """Проверяем секцию Conflicts в report.md."""
+
+    _write_mod(tmp_path, "Base", ["a.txt"])
+    _write_mod(tmp_path, "Patch", ["a.txt"])
+    build_conflict_index(tmp_path, "Default")
+
+    report = generate_report(tmp_path)
+
+    assert "## Conflicts" in report
+    assert "- Conflicting paths: 1" in report
+    assert "- Patch: wins 1, loses 0" in report
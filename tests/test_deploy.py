@@ -0,0 +1,96 @@
+"""Тесты материализации профиля (DeployProfile)."""
+
+from pathlib import Path
+
+import pytest
+
+from modbs.deploy import default_target_dir, materialize_profile
+from modbs.models import StepIR
+from modbs.state import load_lockfile, write_state_artifacts
+from modbs.steps.deploy_profile import deploy_profile
+
+
+def _write_file(path: Path, content: str) -> None:
+    """Создает файл с родительскими каталогами."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def _setup_mods(root: Path) -> None:
+    """Два мода с конфликтом и modlist.txt, где Patch приоритетнее."""
+
+    mods_dir = root / "workspace" / "mods"
+    _write_file(mods_dir / "Base" / "textures" / "rock.dds", "base")
+    _write_file(mods_dir / "Base" / "meshes" / "tree.nif", "tree")
+    _write_file(mods_dir / "Patch" / "textures" / "rock.dds", "patch")
+    _write_file(root / "workspace" / "profiles" / "Default" / "modlist.txt", "+Patch\n+Base\n")
+
+
+def test_materialize_profile_links_winners(tmp_path: Path) -> None:
+    """Проверяем, что в Data/ попадают победители и это ссылки, а не копии."""
+
+    _setup_mods(tmp_path)
+
+    result = materialize_profile(tmp_path, "Default")
+
+    data_dir = default_target_dir(tmp_path, "Default")
+    assert (data_dir / "textures" / "rock.dds").read_text(encoding="utf-8") == "patch"
+    assert (data_dir / "meshes" / "tree.nif").read_text(encoding="utf-8") == "tree"
+    assert sorted(result.linked) == ["meshes/tree.nif", "textures/rock.dds"]
+    if result.methods.get("hardlink"):
+        source = tmp_path / "workspace" / "mods" / "Base" / "meshes" / "tree.nif"
+        assert (data_dir / "meshes" / "tree.nif").stat().st_ino == source.stat().st_ino
+
+
+def test_materialize_profile_is_incremental(tmp_path: Path) -> None:
+    """Проверяем повторный деплой: меняется только затронутый путь, лишнее удаляется."""
+
+    _setup_mods(tmp_path)
+    materialize_profile(tmp_path, "Default")
+
+    noop = materialize_profile(tmp_path, "Default")
+    assert noop.linked == [] and noop.removed == [] and noop.unchanged == 2
+
+    _write_file(tmp_path / "workspace" / "profiles" / "Default" / "modlist.txt", "-Patch\n+Base\n")
+    (tmp_path / "workspace" / "mods" / "Base" / "meshes" / "tree.nif").unlink()
+
+    result = materialize_profile(tmp_path, "Default")
+
+    data_dir = default_target_dir(tmp_path, "Default")
+    assert result.linked == ["textures/rock.dds"]
+    assert result.removed == ["meshes/tree.nif"]
+    assert (data_dir / "textures" / "rock.dds").read_text(encoding="utf-8") == "base"
+    assert not (data_dir / "meshes").exists()
+
+
+def test_deploy_profile_step_excluded_from_lockfile(tmp_path: Path) -> None:
+    """Проверяем шаг DeployProfile и исключение деплоя из lockfile."""
+
+    _setup_mods(tmp_path)
+    step = StepIR(step_id="deploy", step_type="DeployProfile", label="Deploy")
+
+    deploy_profile(step, {"root_path": tmp_path, "profile_name": "Default"})
+    write_state_artifacts(tmp_path)
+
+    assert (default_target_dir(tmp_path, "Default") / "textures" / "rock.dds").exists()
+    paths = {artifact["path"] for artifact in load_lockfile(tmp_path)["artifacts"]}
+    assert "workspace/mods/Patch/textures/rock.dds" in paths
+    assert not any(path.startswith("workspace/deploy/") for path in paths)
+
+
+def test_deploy_profile_rejects_targets_outside_deploy_dir(tmp_path: Path) -> None:
+    """Проверяем, что payload.target ограничен подкаталогами workspace/deploy/."""
+
+    _setup_mods(tmp_path)
+    ctx = {"root_path": tmp_path, "profile_name": "Default"}
+    for target in ("workspace/mods", "state", "workspace/deploy", "workspace/deploy/../mods/Base"):
+        step = StepIR(step_id="deploy", step_type="DeployProfile", label="Deploy", payload={"target": target})
+        with pytest.raises(ValueError, match="workspace/deploy"):
+            deploy_profile(step, ctx)
+    assert (tmp_path / "workspace" / "mods" / "Base" / "meshes" / "tree.nif").exists()
+
+    payload = {"target": "workspace/deploy/Alt"}
+    step = StepIR(step_id="deploy", step_type="DeployProfile", label="Deploy", payload=payload)
+    deploy_profile(step, ctx)
+    assert (tmp_path / "workspace" / "deploy" / "Alt" / "textures" / "rock.dds").exists()
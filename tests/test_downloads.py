@@ -0,0 +1,127 @@
+"""Тесты для шага VerifyDownload."""
+
+import hashlib
+from pathlib import Path
+
+import modbs.downloads
+from modbs.downloads import verify_downloads
+from modbs.executor import StepBlockedError
+from modbs.models import StepIR
+from modbs.steps.verify_download import verify_download
+from modbs.storage import write_json
+
+
+def _write_archive(root_path: Path, name: str, data: bytes) -> str:
+    """Создает архив в cache/downloads/ и возвращает его sha256."""
+
+    path = root_path / "cache" / "downloads" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def test_verify_download_checks_manifest_and_caches(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем сверку с манифестом и кэш результатов по size/mtime."""
+
+    digest_a = _write_archive(tmp_path, "a.zip", b"a" * 1000)
+    digest_b = _write_archive(tmp_path, "b.zip", b"b" * 10)
+    write_json(
+        tmp_path / "manifest.json",
+        {"mods": [
+            {"id": "a", "archive": "a.zip", "sha256": digest_a},
+            {"id": "b", "archive": "b.zip", "sha256": digest_b.upper().replace("SHA256:", "")},
+        ]},
+    )
+    step = StepIR(step_id="verify", step_type="VerifyDownload", label="Verify")
+    ctx = {"root_path": tmp_path, "manifest_path": "manifest.json"}
+
+    results = verify_download(step, ctx)
+    assert [(result.archive, result.status, result.cached) for result in results] == [
+        ("a.zip", "ok", False),
+        ("b.zip", "ok", False),
+    ]
+
+    def _fail(path: Path) -> str:
+        raise AssertionError(f"Архив перечитан повторно: {path}")
+
+    monkeypatch.setattr(modbs.downloads, "hash_large_file", _fail)
+    assert all(result.cached for result in verify_download(step, ctx))
+
+
+def test_verify_resumes_after_interruption(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что прерванная проверка продолжается с непроверенных архивов."""
+
+    entries = [
+        {"archive": "a.zip", "sha256": _write_archive(tmp_path, "a.zip", b"a" * 50)},
+        {"archive": "b.zip", "sha256": _write_archive(tmp_path, "b.zip", b"b" * 10)},
+    ]
+    original = modbs.downloads.hash_large_file
+    hashed: list[str] = []
+
+    def _interrupt_on_b(path: Path) -> str:
+        if path.name == "b.zip":
+            raise KeyboardInterrupt
+        hashed.append(path.name)
+        return original(path)
+
+    monkeypatch.setattr(modbs.downloads, "hash_large_file", _interrupt_on_b)
+    try:
+        verify_downloads(tmp_path, entries, io_concurrency=1)
+    except KeyboardInterrupt:
+        pass
+
+    def _track(path: Path) -> str:
+        hashed.append(path.name)
+        return original(path)
+
+    monkeypatch.setattr(modbs.downloads, "hash_large_file", _track)
+    results = verify_downloads(tmp_path, entries, io_concurrency=1)
+
+    assert hashed == ["a.zip", "b.zip"]
+    assert [result.status for result in results] == ["ok", "ok"]
+
+
+def test_verify_skips_torn_progress_line_after_append(tmp_path: Path) -> None:
+    """Проверяем, что оборванная строка прогресса не ломает следующие проверки."""
+
+    entries = [{"archive": "a.zip", "sha256": _write_archive(tmp_path, "a.zip", b"a" * 50)}]
+    progress_path = tmp_path / "state" / "verify.progress.jsonl"
+    progress_path.parent.mkdir(parents=True)
+    progress_path.write_text('{"archive": "a.zip", "si', encoding="utf-8")
+
+    assert [result.status for result in verify_downloads(tmp_path, entries)] == ["ok"]
+    # Оборванный фрагмент теперь посередине файла, за ним — новая запись.
+    assert progress_path.read_text(encoding="utf-8").startswith('{"archive": "a.zip", "si\n')
+    results = verify_downloads(tmp_path, entries)
+    assert [(result.status, result.cached) for result in results] == [("ok", True)]
+
+
+def test_verify_download_mismatch_fails_and_missing_blocks(tmp_path: Path) -> None:
+    """Проверяем HashMismatch → Failed и отсутствие архива → Blocked."""
+
+    _write_archive(tmp_path, "a.zip", b"tampered")
+    bad = StepIR(
+        step_id="verify",
+        step_type="VerifyDownload",
+        label="Verify",
+        payload={"entries": [{"archive": "a.zip", "sha256": "sha256:" + "0" * 64}]},
+    )
+    try:
+        verify_download(bad, {"root_path": tmp_path})
+    except RuntimeError as exc:
+        assert "HashMismatch" in str(exc)
+    else:
+        raise AssertionError("Ожидали HashMismatch")
+
+    missing = StepIR(
+        step_id="verify",
+        step_type="VerifyDownload",
+        label="Verify",
+        payload={"entries": [{"archive": "absent.zip", "sha256": "sha256:" + "0" * 64}]},
+    )
+    try:
+        verify_download(missing, {"root_path": tmp_path})
+    except StepBlockedError as exc:
+        assert "absent.zip" in str(exc)
+    else:
+        raise AssertionError("Ожидали StepBlockedError для отсутствующего архива")
@@ -0,0 +1,110 @@
+"""Тесты оценки стоимости плана по истории журнала."""
+
+import json
+from pathlib import Path
+
+import modbs.estimate
+from modbs.cli import cmd_apply, cmd_plan, main
+from modbs.estimate import critical_path, estimate_step
+from modbs.models import EdgeIR, PlanIR, StepIR
+from modbs.storage import read_json, write_json
+
+
+def _step(step_id: str, step_type: str = "Extract", **payload) -> StepIR:
+    return StepIR(step_id=step_id, step_type=step_type, label=step_id, payload=payload)
+
+
+def test_estimate_scales_history_by_input_size() -> None:
+    """Проверяем линейную модель по размеру входа и масштабирование одной точки."""
+
+    history = {
+        "Extract": {"costs": [[10, 100.0, 1000, 800], [20, 200.0, 2000, 1600], [30, 300.0, 3000, 2400]]},
+        "Report": {"costs": [[4, 8.0, 40, 40]]},
+    }
+
+    extract = estimate_step(_step("extract", archives=["a"] * 40), history, {})
+    report = estimate_step(_step("report", "Report"), history, {"files": 8})
+    loot = estimate_step(_step("loot", "RunLOOT"), history, {"mods": 3})
+
+    assert extract == {
+        "input_size": 40,
+        "samples": 3,
+        "duration_ms": 400.0,
+        "bytes_written": 4000,
+        "disk_delta": 3200,
+    }
+    assert report["duration_ms"] == 16.0
+    assert loot["samples"] == 0 and loot["duration_ms"] is None
+
+
+def test_critical_path_picks_longest_chain() -> None:
+    """Проверяем, что критический путь идет через самую долгую ветку DAG."""
+
+    plan = PlanIR(
+        meta={},
+        steps=[_step(name) for name in ("init", "fast", "slow", "report")],
+        edges=[
+            EdgeIR("init", "fast"),
+            EdgeIR("init", "slow"),
+            EdgeIR("fast", "report"),
+            EdgeIR("slow", "report"),
+        ],
+    )
+
+    total, path = critical_path(plan, {"init": 5.0, "fast": 1.0, "slow": 20.0, "report": None})
+
+    assert total == 25.0
+    assert path == ["init", "slow", "report"]
+
+
+def test_cli_plan_estimate_uses_journal_history(tmp_path: Path, capsys, monkeypatch) -> None:
+    """Проверяем plan --estimate после apply: прогнозы в meta и вывод критического пути."""
+
+    manifest_path = tmp_path / "manifest.jsonl"
+    manifest_path.write_text(
+        "".join(json.dumps({"id": f"mod{index}", "name": f"Mod {index}"}) + "\n" for index in range(3)),
+        encoding="utf-8",
+    )
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {
+            "profile_name": "MVP",
+            "paths": {"root": str(tmp_path)},
+            "manifest_path": "manifest.jsonl",
+            "loot": {"mode": "mock"},
+        },
+    )
+    cmd_plan(config_path)
+
+    # В apply мерило files берется из дерева DiskLedger, а не обходом workspace.
+    def _no_walk(path: Path) -> int:
+        raise AssertionError(f"Лишний обход {path}")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(modbs.estimate, "_count_files", _no_walk)
+        cmd_apply(tmp_path, config_path)
+
+    events = [json.loads(line) for line in (tmp_path / "state" / "job.journal.jsonl").read_text().splitlines()]
+    loot_event = next(event for event in events if event["step_id"] == "run_loot" and event["status"] == "Succeeded")
+    assert loot_event["metrics"]["input_size"] == 3
+    # Мерило files считается на момент шага и видит файлы, созданные apply.
+    checkpoint_event = next(
+        event for event in events if event["step_id"] == "checkpoint" and event["status"] == "Succeeded"
+    )
+    assert checkpoint_event["metrics"]["input_size"] == modbs.estimate._count_files(tmp_path / "workspace")
+
+    assert main(["plan", "--config", str(config_path), "--estimate"]) == 0
+
+    estimates = read_json(tmp_path / "state" / "plan.ir.json")["meta"]["estimates"]
+    assert estimates["scale"]["mods"] == 3
+    assert estimates["steps"]["run_loot"]["samples"] == 1
+    assert estimates["steps"]["run_loot"]["input_size"] == 3
+    assert estimates["unestimated"] == []
+    assert estimates["critical_path"]["steps"][0] == "workspace_init"
+    assert estimates["critical_path"]["steps"][-1] == "report"
+    assert "Critical path:" in capsys.readouterr().out
+
+    # Обычный plan после --estimate не оставляет устаревший прогноз.
+    cmd_plan(config_path)
+    assert "estimates" not in read_json(tmp_path / "state" / "plan.ir.json")["meta"]
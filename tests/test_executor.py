@@ -1,7 +1,10 @@
 """Тесты для детерминированного исполнителя."""
 
-from modbs.executor import ALLOWED_STEP_TYPES, execute
-from modbs.models import PlanIR, StepIR
+import time
+
+import modbs.executor
+from modbs.executor import ALLOWED_STEP_TYPES, StepBlockedError, execute
+from modbs.models import EdgeIR, PlanIR, StepIR
 
 
 def test_executor_runs_steps_in_order() -> None:
@@ -52,3 +55,64 @@ def test_executor_blocks_unknown_step_type() -> None:
     assert result.status == "Blocked"
     assert result.blocked_step_id == "s2"
     assert call_order == ["s1"]
+
+
+def _dag_plan() -> PlanIR:
+    """План с двумя независимыми ветвями: a → b и c → d."""
+
+    steps = [
+        StepIR(step_id="a", step_type="VerifyDownload", label="A"),
+        StepIR(step_id="b", step_type="Extract", label="B"),
+        StepIR(step_id="c", step_type="WorkspaceInit", label="C"),
+        StepIR(step_id="d", step_type="Report", label="D"),
+    ]
+    edges = [EdgeIR(source="a", target="b"), EdgeIR(source="c", target="d")]
+    return PlanIR(meta={}, steps=steps, edges=edges)
+
+
+def test_executor_parks_blocked_branch_and_runs_independent() -> None:
+    """Проверяем, что Blocked паркует ветвь, а независимые шаги выполняются."""
+
+    call_order: list[str] = []
+
+    def handler(step: StepIR, ctx: dict) -> None:
+        call_order.append(step.step_id)
+        if step.step_id == "a":
+            raise StepBlockedError("rate limit", next_action_at=time.time() + 3600, source="nexus")
+
+    handlers = {step_type: handler for step_type in ALLOWED_STEP_TYPES}
+
+    result = execute(_dag_plan(), {"handlers": handlers})
+
+    assert result.status == "Blocked"
+    assert result.blocked_step_id == "a"
+    assert call_order == ["a", "c", "d"]
+    assert result.executed_step_ids == ["c", "d"]
+    assert result.parked["a"]["source"] == "nexus"
+    assert result.next_action_at is not None
+
+
+def test_executor_retries_when_next_action_at_arrives(monkeypatch) -> None:
+    """Проверяем повтор после ожидания и исчерпание бюджета источника."""
+
+    sleeps: list[float] = []
+    monkeypatch.setattr(modbs.executor.time, "sleep", lambda seconds: sleeps.append(seconds))
+    attempts: dict[str, int] = {}
+
+    def handler(step: StepIR, ctx: dict) -> None:
+        attempts[step.step_id] = attempts.get(step.step_id, 0) + 1
+        if step.step_id == "a" and attempts["a"] < 2:
+            raise StepBlockedError("rate limit", next_action_at=time.time() + 0.5, source="nexus")
+
+    handlers = {step_type: handler for step_type in ALLOWED_STEP_TYPES}
+    ctx = {"handlers": handlers, "max_wait_seconds": 5, "retry_budgets": {"nexus": 1}}
+
+    result = execute(_dag_plan(), ctx)
+
+    assert result.status == "Succeeded"
+    assert attempts == {"a": 2, "b": 1, "c": 1, "d": 1}
+    assert len(sleeps) == 1
+
+    attempts.clear()
+    ctx["retry_budgets"] = {"nexus": 0}
+    assert execute(_dag_plan(), ctx).status == "Blocked"
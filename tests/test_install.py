@@ -0,0 +1,157 @@
+"""Тесты для шагов Extract и InstallToManager."""
+
+import hashlib
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import modbs.state
+from modbs.models import StepIR
+from modbs.state import write_state_artifacts
+from modbs.steps.install import extract, install_to_manager
+from modbs.storage import read_json
+
+
+def _make_zip(path: Path, files: dict) -> None:
+    """Создает zip-архив с заданными файлами."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in files.items():
+            bundle.writestr(name, data)
+
+
+def _make_tar(path: Path, files: dict) -> None:
+    """Создает tar.gz-архив с заданными файлами."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, "w:gz") as bundle:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            bundle.addfile(info, io.BytesIO(data))
+
+
+def test_install_to_manager_extracts_archives_with_hashes(tmp_path: Path) -> None:
+    """Проверяем установку zip и tar в workspace/mods с хэшами на лету."""
+
+    _make_zip(tmp_path / "cache" / "downloads" / "SkyUI.zip", {"SkyUI_SE.esp": b"plugin"})
+    _make_tar(
+        tmp_path / "cache" / "downloads" / "Textures.tar.gz",
+        {"textures/sky.dds": b"DDS data", "./meshes/rock.nif": b"NIF data"},
+    )
+    step = StepIR(
+        step_id="install",
+        step_type="InstallToManager",
+        label="Install",
+        payload={
+            "archives": [
+                {"archive": "cache/downloads/SkyUI.zip", "name": "SkyUI"},
+                {"archive": "cache/downloads/Textures.tar.gz"},
+            ]
+        },
+    )
+
+    results = install_to_manager(step, {"root_path": tmp_path})
+
+    assert [result.status for result in results] == ["installed", "installed"]
+    mods_dir = tmp_path / "workspace" / "mods"
+    assert (mods_dir / "SkyUI" / "SkyUI_SE.esp").read_bytes() == b"plugin"
+    assert (mods_dir / "Textures" / "meshes" / "rock.nif").read_bytes() == b"NIF data"
+
+    manifest = read_json(tmp_path / "state" / "installs" / "Textures.json")
+    expected_hash = "sha256:" + hashlib.sha256(b"DDS data").hexdigest()
+    assert manifest["files"]["textures/sky.dds"]["hash"] == expected_hash
+    assert manifest["target"] == "workspace/mods/Textures"
+
+
+def test_install_skips_unchanged_and_reinstalls_on_drift(tmp_path: Path) -> None:
+    """Проверяем пропуск по digest/манифесту и переустановку при расхождении."""
+
+    _make_zip(tmp_path / "cache" / "SkyUI.zip", {"SkyUI_SE.esp": b"plugin"})
+    step = StepIR(
+        step_id="install",
+        step_type="InstallToManager",
+        label="Install",
+        payload={"archive": "cache/SkyUI.zip", "name": "SkyUI"},
+    )
+    ctx = {"root_path": tmp_path}
+
+    install_to_manager(step, ctx)
+    assert install_to_manager(step, ctx)[0].status == "skipped"
+
+    (tmp_path / "workspace" / "mods" / "SkyUI" / "SkyUI_SE.esp").unlink()
+    assert install_to_manager(step, ctx)[0].status == "installed"
+
+
+def test_extract_rejects_path_traversal(tmp_path: Path) -> None:
+    """Проверяем, что члены архива с '..' не выходят за каталог назначения."""
+
+    _make_zip(tmp_path / "cache" / "evil.zip", {"../escape.txt": b"x"})
+    step = StepIR(
+        step_id="extract",
+        step_type="Extract",
+        label="Extract",
+        payload={"archive": "cache/evil.zip", "target": "workspace/extract/evil"},
+    )
+
+    try:
+        extract(step, {"root_path": tmp_path})
+    except ValueError as exc:
+        assert "Небезопасный путь" in str(exc)
+    else:
+        raise AssertionError("Ожидали ValueError для небезопасного пути")
+    assert not (tmp_path / "workspace" / "escape.txt").exists()
+    assert not (tmp_path / "workspace" / "extract" / "evil").exists()
+
+
+def test_extract_rejects_targets_outside_workspace_subdirs(tmp_path: Path) -> None:
+    """Проверяем, что Extract не заменяет корень, state/ и служебные каталоги."""
+
+    _make_zip(tmp_path / "cache" / "x.zip", {"x.txt": b"x"})
+    lockfile = tmp_path / "state" / "lockfile.json"
+    lockfile.parent.mkdir(parents=True)
+    lockfile.write_text("{}", encoding="utf-8")
+
+    for target in (".", "state", "rootstate", "workspace", "workspace/mods", "workspace/../state"):
+        step = StepIR(
+            step_id="extract",
+            step_type="Extract",
+            label="Extract",
+            payload={"archive": "cache/x.zip", "target": target},
+        )
+        try:
+            extract(step, {"root_path": tmp_path})
+        except ValueError as exc:
+            assert "target" in str(exc)
+        else:
+            raise AssertionError(f"Ожидали ValueError для target={target}")
+
+    assert lockfile.exists()
+    assert not (tmp_path / "state" / "x.txt").exists()
+
+
+def test_lockfile_reuses_install_hashes(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что lockfile не перечитывает только что установленные файлы."""
+
+    _make_zip(tmp_path / "cache" / "SkyUI.zip", {"SkyUI_SE.esp": b"plugin"})
+    step = StepIR(
+        step_id="install",
+        step_type="InstallToManager",
+        label="Install",
+        payload={"archive": "cache/SkyUI.zip", "name": "SkyUI"},
+    )
+    install_to_manager(step, {"root_path": tmp_path})
+
+    original = modbs.state._sha256_file
+
+    def _guarded(path: Path) -> str:
+        assert "mods" not in path.parts, f"Повторное чтение установленного файла: {path}"
+        return original(path)
+
+    monkeypatch.setattr(modbs.state, "_sha256_file", _guarded)
+
+    payload = write_state_artifacts(tmp_path)
+    paths = {item["path"] for item in payload["lockfile"]["artifacts"]}
+    assert "workspace/mods/SkyUI/SkyUI_SE.esp" in paths
@@ -0,0 +1,74 @@
+"""Тесты для Cost/Risk Ledger."""
+
+from pathlib import Path
+
+from modbs.cli import cmd_apply, cmd_plan
+from modbs.ledger import LEDGER_ZONES, DiskLedger
+from modbs.storage import write_json
+
+
+def _make_zones(root_path: Path) -> None:
+    """Создает каталоги всех зон ledger."""
+
+    for zone in LEDGER_ZONES:
+        (root_path / zone).mkdir(parents=True, exist_ok=True)
+
+
+def test_ledger_records_delta_per_zone(tmp_path: Path) -> None:
+    """Проверяем, что Δдиск считается по зонам за шаг."""
+
+    _make_zones(tmp_path)
+    ledger = DiskLedger(tmp_path, planned_steps=2)
+
+    ledger.begin_step("s1")
+    mod_dir = tmp_path / "workspace" / "mods" / "SkyUI"
+    mod_dir.mkdir(parents=True)
+    (mod_dir / "skyui.esp").write_bytes(b"x" * 100)
+    (tmp_path / "cache" / "SkyUI.7z").write_bytes(b"y" * 40)
+    metrics = ledger.end_step("s1")
+
+    assert metrics["disk_delta"] == {"workspace": 100, "cache": 40, "rootstate": 0, "state": 0}
+    assert metrics["disk_total"]["workspace"] == 100
+
+
+def test_ledger_uses_changed_paths_and_flags_pressure(tmp_path: Path) -> None:
+    """Проверяем точечное обновление и флаг disk pressure."""
+
+    _make_zones(tmp_path)
+    target = tmp_path / "workspace" / "big.bin"
+    target.write_bytes(b"a" * 10)
+
+    ledger = DiskLedger(tmp_path, planned_steps=3, min_free_bytes=10**18)
+    ledger.begin_step("s1")
+    # Перезапись на месте не меняет mtime каталога — помогает подсказка.
+    with open(target, "ab") as handle:
+        handle.write(b"b" * 90)
+    metrics = ledger.end_step("s1", changed_paths=[target])
+
+    assert metrics["disk_delta"]["workspace"] == 90
+
+    forecast = ledger.begin_step("s2")
+    assert forecast["disk_projected_step"] == 90
+    assert "disk_pressure" in forecast["risk_flags"]
+
+
+def test_apply_journal_contains_disk_metrics(tmp_path: Path) -> None:
+    """Проверяем, что apply пишет Δдиск в журнал и секцию в отчет."""
+
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {
+            "profile_name": "MVP",
+            "paths": {"root": str(tmp_path)},
+            "loot": {"mode": "mock"},
+            "state": {"durability": "buffered"},
+        },
+    )
+    cmd_plan(config_path)
+    cmd_apply(tmp_path, config_path)
+
+    journal_text = (tmp_path / "state" / "job.journal.jsonl").read_text(encoding="utf-8")
+    assert '"disk_delta"' in journal_text
+    report_text = (tmp_path / "state" / "report.md").read_text(encoding="utf-8")
+    assert "## Disk Ledger" in report_text
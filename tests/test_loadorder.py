@@ -0,0 +1,73 @@
+"""Тесты встроенной сортировки порядка загрузки."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from modbs.adapters.loot import run
+from modbs.loadorder import LoadOrderCycleError, SortRules, load_rules, sort_plugins
+from modbs.plugins import PluginHeader
+from tests.test_plugins import _write_plugin
+
+
+def _header(name: str, masters: list[str] | None = None, is_master: bool = False) -> PluginHeader:
+    """Создает заголовок плагина без файла на диске."""
+
+    return PluginHeader(name=name, path=name, masters=list(masters or []), is_master=is_master)
+
+
+def test_sort_plugins_respects_masters_flags_and_rules(tmp_path: Path) -> None:
+    """Проверяем masters, ESM-флаг и правила after/before из JSON."""
+
+    headers = {
+        "patch.esp": _header("Patch.esp", ["Base.esm", "Mod.esp"]),
+        "mod.esp": _header("Mod.esp", ["Base.esm"]),
+        "base.esm": _header("Base.esm", is_master=True),
+        "other.esp": _header("Other.esp"),
+    }
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(
+        json.dumps({"plugins": [{"name": "Other.esp", "after": ["Patch.esp"]}]}),
+        encoding="utf-8",
+    )
+
+    order = sort_plugins(headers, load_rules(rules_path))
+
+    assert order == ["Base.esm", "Mod.esp", "Patch.esp", "Other.esp"]
+
+
+def test_sort_plugins_keeps_previous_order_and_detects_cycles() -> None:
+    """Проверяем инкрементальность (прошлый порядок сохраняется) и циклы."""
+
+    headers = {
+        "b.esp": _header("B.esp"),
+        "a.esp": _header("A.esp"),
+        "new.esp": _header("New.esp"),
+    }
+
+    assert sort_plugins(headers, previous_order=["B.esp", "A.esp"]) == ["B.esp", "A.esp", "New.esp"]
+
+    with pytest.raises(LoadOrderCycleError):
+        sort_plugins(headers, SortRules(edges=[("a.esp", "b.esp"), ("b.esp", "a.esp")]))
+
+
+def test_loot_blocked_falls_back_to_native(tmp_path: Path) -> None:
+    """Проверяем fallback blocked → native и запись plugins.txt/loadorder.txt."""
+
+    mods_dir = tmp_path / "workspace" / "mods"
+    _write_plugin(mods_dir / "ModA" / "Patch.esp", ["Skyrim.esm", "Base.esm"])
+    _write_plugin(mods_dir / "ModB" / "Base.esm", ["Skyrim.esm"], flags=0x1)
+    ctx = {"root_path": tmp_path, "profile_name": "Default", "loot_fallback": "native"}
+
+    result = run("blocked", ctx)
+
+    profile_dir = tmp_path / "workspace" / "profiles" / "Default"
+    assert result.status == "Succeeded"
+    plugins_lines = (profile_dir / "plugins.txt").read_text(encoding="utf-8").splitlines()
+    assert plugins_lines[1:] == ["*Base.esm", "*Patch.esp"]
+    loadorder_lines = (profile_dir / "loadorder.txt").read_text(encoding="utf-8").splitlines()
+    assert loadorder_lines[1:] == ["Base.esm", "Patch.esp"]
+
+    # Повторный запуск без изменений берет порядок из кэша.
+    assert run("native", ctx).status == "Succeeded"
@@ -0,0 +1,53 @@
+"""Тесты блокировок рабочего каталога."""
+
+import fcntl
+import os
+from pathlib import Path
+
+import pytest
+
+from modbs.locking import STATE_LOCK_NAME, WorkspaceBusyError, apply_lock, state_lock
+
+
+def _can_lock(path: Path, mode: int) -> bool:
+    """Пробует взять flock через отдельный дескриптор (как другой процесс)."""
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return True
+    finally:
+        os.close(fd)
+
+
+def test_second_apply_on_same_root_is_rejected(tmp_path: Path) -> None:
+    """Проверяем, что второй apply на том же корне получает WorkspaceBusyError."""
+
+    with apply_lock(tmp_path):
+        with pytest.raises(WorkspaceBusyError):
+            with apply_lock(tmp_path):
+                pass
+    with apply_lock(tmp_path):
+        pass
+
+
+def test_state_lock_is_reentrant_and_shared_for_readers(tmp_path: Path) -> None:
+    """Проверяем reader/writer-семантику и реентерабельность state-блокировки."""
+
+    lock_path = tmp_path / STATE_LOCK_NAME
+    with state_lock(tmp_path):
+        assert _can_lock(lock_path, fcntl.LOCK_SH)
+        assert not _can_lock(lock_path, fcntl.LOCK_EX)
+        with pytest.raises(RuntimeError):
+            with state_lock(tmp_path, exclusive=True):
+                pass
+
+    with state_lock(tmp_path, exclusive=True):
+        with state_lock(tmp_path):
+            assert not _can_lock(lock_path, fcntl.LOCK_SH)
+        assert not _can_lock(lock_path, fcntl.LOCK_SH)
+    assert _can_lock(lock_path, fcntl.LOCK_EX)
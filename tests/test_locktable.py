@@ -0,0 +1,58 @@
+"""Тесты отсортированного построчного lockfile."""
+
+from pathlib import Path
+
+import pytest
+
+from modbs.locktable import SORTED_INDEX_NAME, SortedLockfile, diff_lockfiles, render_sorted_lockfile
+from modbs.storage import write_json
+
+
+def _write_table(directory: Path, artifacts, every: int = 4) -> SortedLockfile:
+    """Пишет lockfile.lines с индексом и открывает его."""
+
+    text, index = render_sorted_lockfile({"release_id": "test"}, artifacts, every=every)
+    path = directory / "lockfile.lines"
+    path.write_text(text, encoding="utf-8")
+    write_json(directory / SORTED_INDEX_NAME, index)
+    return SortedLockfile(path)
+
+
+def test_sorted_lockfile_binary_search_lookup(tmp_path: Path) -> None:
+    """Проверяем поиск пути по разреженному индексу, в том числе без индекса."""
+
+    artifacts = [(f"workspace/файл-{index:03d}.txt", f"sha256:{index}") for index in range(50)]
+    table = _write_table(tmp_path, artifacts)
+
+    assert len(table) == 50
+    assert table.header["release_id"] == "test"
+    assert table.lookup("workspace/файл-000.txt") == "sha256:0"
+    assert table.lookup("workspace/файл-037.txt") == "sha256:37"
+    assert table.lookup("workspace/файл-049.txt") == "sha256:49"
+    assert table.lookup("workspace/файл-0375.txt") is None
+    assert table.lookup("a") is None
+    assert table.lookup("zzz") is None
+
+    (tmp_path / SORTED_INDEX_NAME).unlink()
+    assert SortedLockfile(tmp_path / "lockfile.lines").lookup("workspace/файл-021.txt") == "sha256:21"
+    assert list(table) == artifacts
+
+
+def test_render_rejects_unsorted_artifacts() -> None:
+    """Проверяем, что неотсортированные записи не кодируются."""
+
+    with pytest.raises(ValueError, match="не отсортированы"):
+        render_sorted_lockfile({}, [("b", "1"), ("a", "2")])
+
+
+def test_diff_lockfiles_streams_changes(tmp_path: Path) -> None:
+    """Проверяем merge-diff: добавленные, удаленные и измененные пути."""
+
+    old = _write_table(tmp_path, [("a", "1"), ("b", "2"), ("c", "3")])
+    new = [("b", "2"), ("c", "4"), ("d", "5")]
+
+    assert list(diff_lockfiles(old, new)) == [
+        ("a", "1", None),
+        ("c", "3", "4"),
+        ("d", None, "5"),
+    ]
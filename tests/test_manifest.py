@@ -0,0 +1,89 @@
+"""Тесты потокового чтения манифеста и его индекса."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import modbs.manifest
+from modbs.manifest import MANIFEST_INDEX_PATH, iter_manifest, load_manifest_index
+from modbs.storage import read_json
+
+_DIGEST = "sha256:" + "ab" * 32
+
+
+def _records(count: int):
+    """Генерирует записи манифеста с не-ASCII именами."""
+
+    return [
+        {
+            "id": f"mod-{index}",
+            "name": f"Мод №{index}",
+            "archive": f"mod-{index}.7z",
+            "sha256": _DIGEST if index == 7 else ("%064x" % index).upper(),
+            "category": "textures" if index % 2 else "meshes",
+        }
+        for index in range(count)
+    ]
+
+
+def test_iter_manifest_streams_large_json_across_chunks(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем инкрементальный разбор JSON на границах маленьких блоков."""
+
+    monkeypatch.setattr(modbs.manifest, "_READ_CHUNK_SIZE", 7)
+    records = _records(40)
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"schema": 1, "mods": records}, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    entries = list(iter_manifest(path))
+    assert [entry["id"] for entry in entries] == [record["id"] for record in records]
+    assert entries[1]["name"] == "Мод №1"
+    assert entries[1]["sha256"] == "sha256:" + "%064x" % 1
+
+
+def test_manifest_index_looks_up_by_id_category_and_digest(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем индекс по JSONL: seek к записи и переиспользование по stat."""
+
+    path = tmp_path / "manifest.jsonl"
+    lines = [json.dumps(record, ensure_ascii=False) for record in _records(20)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    index = load_manifest_index(tmp_path, path)
+    assert len(index) == 20
+    assert index.get("mod-3")["name"] == "Мод №3"
+    assert index.get("missing") is None
+    assert index.ids_by_category("meshes")[:3] == ["mod-0", "mod-2", "mod-4"]
+    assert index.ids_by_digest(_DIGEST.upper()) == ["mod-7"]
+    assert read_json(tmp_path / MANIFEST_INDEX_PATH)["by_id"]["mod-0"][0] == 0
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("индекс должен переиспользоваться")
+
+    monkeypatch.setattr(modbs.manifest, "_iter_raw_records", _fail)
+    assert load_manifest_index(tmp_path, path).get("mod-19")["archive"] == "mod-19.7z"
+
+
+def test_json_manifest_index_offsets_survive_chunk_boundaries(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем байтовые смещения записей JSON с не-ASCII текстом на границах блоков."""
+
+    monkeypatch.setattr(modbs.manifest, "_READ_CHUNK_SIZE", 5)
+    records = _records(15)
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    index = load_manifest_index(tmp_path, path)
+    assert [index.get(record["id"])["name"] for record in records] == [record["name"] for record in records]
+
+
+def test_manifest_validator_rejects_bad_records(tmp_path: Path) -> None:
+    """Проверяем, что некорректные записи отклоняются с указанием смещения."""
+
+    path = tmp_path / "manifest.jsonl"
+    path.write_text('{"id": "a", "sha256": "not-a-digest"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="sha256"):
+        list(iter_manifest(path))
+
+    path.write_text('{"id": "a"}\n{"archive": "b.zip"}\n', encoding="utf-8")
+    assert len(list(iter_manifest(path))) == 2
+    with pytest.raises(ValueError, match="без поля id"):
+        load_manifest_index(tmp_path, path)
@@ -1,6 +1,9 @@
 """Тесты для планировщика и Plan IR."""
 
-from modbs.planner import generate_plan
+from pathlib import Path
+
+from modbs import planner
+from modbs.planner import generate_plan, plan_fingerprint
 from modbs.storage import plan_ir_from_dict, plan_ir_to_dict
 
 
@@ -29,3 +32,14 @@ def test_plan_ir_serialization_roundtrip() -> None:
     restored = plan_ir_from_dict(payload)
 
     assert restored == plan
+
+
+def test_plan_fingerprint_changes_with_planner_version(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что смена версии планировщика меняет отпечаток при том же конфиге."""
+
+    config = {"profile": "default"}
+    before = plan_fingerprint(config, tmp_path)
+    assert plan_fingerprint(config, tmp_path) == before
+
+    monkeypatch.setattr(planner, "PLANNER_VERSION", "next")
+    assert plan_fingerprint(config, tmp_path) != before
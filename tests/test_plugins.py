@@ -0,0 +1,109 @@
+"""Тесты для чтения заголовков плагинов и проверки masters."""
+
+import struct
+from pathlib import Path
+
+import modbs.plugins
+from modbs.cli import cmd_apply, cmd_plan
+from modbs.plugins import (
+    MissingMasterError,
+    build_master_graph,
+    check_masters,
+    parse_plugin_header,
+    scan_plugins,
+)
+from modbs.storage import write_json
+
+
+def _subrecord(sub_type: bytes, data: bytes) -> bytes:
+    """Кодирует подзапись TES4."""
+
+    return sub_type + struct.pack("<H", len(data)) + data
+
+
+def _write_plugin(path: Path, masters: list[str], flags: int = 0, body: bytes = b"") -> None:
+    """Создает минимальный плагин с записью TES4 и произвольным телом."""
+
+    data = _subrecord(b"HEDR", struct.pack("<fII", 1.71, 0, 0x800))
+    for master in masters:
+        data += _subrecord(b"MAST", master.encode("cp1252") + b"\0")
+        data += _subrecord(b"DATA", b"\0" * 8)
+    header = b"TES4" + struct.pack("<IIIII", len(data), flags, 0, 0, 44)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(header + data + body)
+
+
+def test_parse_plugin_header_reads_masters_and_flags(tmp_path: Path) -> None:
+    """Проверяем разбор masters, ESM/ESL-флагов и версии."""
+
+    plugin = tmp_path / "Light.esp"
+    _write_plugin(plugin, ["Skyrim.esm", "Update.esm"], flags=0x201, body=b"GRUP" * 1000)
+
+    header = parse_plugin_header(plugin)
+
+    assert header.masters == ["Skyrim.esm", "Update.esm"]
+    assert header.is_master is True
+    assert header.is_light is True
+    assert header.version == 1.71
+
+
+def test_scan_plugins_caches_headers(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем граф masters и повторное сканирование без разбора."""
+
+    mods_dir = tmp_path / "workspace" / "mods"
+    _write_plugin(mods_dir / "Base" / "Base.esm", ["Skyrim.esm"], flags=0x1)
+    _write_plugin(mods_dir / "Patch" / "Patch.esp", ["Skyrim.esm", "Base.esm"])
+
+    headers = scan_plugins(tmp_path)
+    assert build_master_graph(headers) == {
+        "base.esm": ["skyrim.esm"],
+        "patch.esp": ["skyrim.esm", "base.esm"],
+    }
+
+    def _fail(path: Path, rel_path: str | None = None):
+        raise AssertionError(f"Заголовок разобран повторно: {path}")
+
+    monkeypatch.setattr(modbs.plugins, "parse_plugin_header", _fail)
+    assert set(scan_plugins(tmp_path)) == {"base.esm", "patch.esp"}
+
+
+def test_missing_master_raised_before_loot(tmp_path: Path) -> None:
+    """Проверяем MissingMaster в check_masters и блокировку RunLOOT в apply."""
+
+    _write_plugin(tmp_path / "workspace" / "mods" / "Patch" / "Patch.esp", ["Absent.esm"])
+
+    try:
+        check_masters(tmp_path)
+    except MissingMasterError as exc:
+        assert "Patch.esp: Absent.esm" in str(exc)
+    else:
+        raise AssertionError("Ожидали MissingMasterError")
+
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {"profile_name": "MVP", "paths": {"root": str(tmp_path)}, "loot": {"mode": "mock"}},
+    )
+    cmd_plan(config_path)
+    result = cmd_apply(tmp_path, config_path)
+
+    assert result.status == "Failed"
+    assert result.failed_step_id == "run_loot"
+    assert not (tmp_path / "state" / "loot.mock.json").exists()
+
+
+def test_duplicate_plugin_name_resolved_by_mod_priority(tmp_path: Path) -> None:
+    """Проверяем, что при одинаковом имени плагина берется заголовок мода-победителя modlist."""
+
+    mods = tmp_path / "workspace" / "mods"
+    _write_plugin(mods / "AAA" / "Shared.esp", ["Winner.esm"])
+    _write_plugin(mods / "ZZZ" / "Shared.esp", ["Absent.esm"])
+    _write_plugin(mods / "AAA" / "Winner.esm", [])
+    profile_dir = tmp_path / "workspace" / "profiles" / "MVP"
+    profile_dir.mkdir(parents=True)
+    # В modlist.txt первая строка — самый приоритетный мод.
+    (profile_dir / "modlist.txt").write_text("+AAA\n+ZZZ\n", encoding="utf-8")
+
+    assert scan_plugins(tmp_path)["shared.esp"].path == "workspace/mods/ZZZ/Shared.esp"
+    headers = check_masters(tmp_path, profile_name="MVP")
+    assert headers["shared.esp"].path == "workspace/mods/AAA/Shared.esp"
@@ -0,0 +1,48 @@
+"""Тесты профилирования шагов apply через cProfile."""
+
+from pathlib import Path
+
+from modbs.cli import cmd_apply, cmd_plan
+from modbs.models import StepIR
+from modbs.profiling import top_functions, wrap_profiled_handler
+from modbs.storage import write_json
+
+
+def _busy_step(step: StepIR, ctx: dict) -> None:
+    """Шаг с заметной работой для профиля."""
+
+    sum(index * index for index in range(20000))
+
+
+def test_profiled_handler_writes_pstats(tmp_path: Path) -> None:
+    """Проверяем запись .pstats и выборку top-N по кумулятивному времени."""
+
+    handler = wrap_profiled_handler(_busy_step, tmp_path / "run")
+    handler(StepIR(step_id="busy", step_type="Busy", label="Busy"), {})
+
+    rows = top_functions(tmp_path / "run" / "busy.pstats", limit=3)
+
+    assert len(rows) <= 3
+    assert any(row["function"] == "_busy_step" for row in rows)
+    assert rows == sorted(rows, key=lambda row: -row["cumulative_ms"])
+
+
+def test_apply_profile_adds_report_section(tmp_path: Path) -> None:
+    """Проверяем apply --profile: профили по шагам и секция Profiles в отчете."""
+
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {"paths": {"root": str(tmp_path)}, "profile_name": "MVP", "loot": {"mode": "mock"}},
+    )
+    cmd_plan(config_path)
+
+    result = cmd_apply(tmp_path, config_path, profile=True)
+
+    assert result.status == "Succeeded"
+    run_dirs = list((tmp_path / "state" / "profiles").iterdir())
+    assert len(run_dirs) == 1
+    assert (run_dirs[0] / "checkpoint.pstats").exists()
+    report = (tmp_path / "state" / "report.md").read_text(encoding="utf-8")
+    assert "## Profiles" in report
+    assert "### checkpoint" in report
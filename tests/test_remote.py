@@ -0,0 +1,227 @@
+"""Тесты распределенного выполнения шагов на worker по localhost."""
+
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from modbs.executor import StepBlockedError, execute
+from modbs.models import EdgeIR, PlanIR, StepIR
+from modbs.remote import Coordinator, WorkerServer
+
+
+def _start_worker(tmp_path: Path, handlers, worker_id: str) -> WorkerServer:
+    """Запускает worker на свободном порту localhost в фоновом потоке."""
+
+    server = WorkerServer(tmp_path, handlers, worker_id=worker_id)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def _stop(*servers: WorkerServer) -> None:
+    """Останавливает worker."""
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_coordinator_runs_steps_in_parallel_and_streams_events(tmp_path: Path) -> None:
+    """Проверяем параллельную раздачу шагов, события и привязку к кэшу входов."""
+
+    barrier = threading.Barrier(2, timeout=5)
+    runs = []
+
+    def _handler(worker_id: str):
+        def _verify(step: StepIR, ctx) -> None:
+            runs.append((worker_id, step.step_id, ctx["run_id"], ctx["root_path"]))
+            if step.payload.get("parallel"):
+                barrier.wait()
+
+        return {"VerifyDownload": _verify}
+
+    first = _start_worker(tmp_path, _handler("w1"), "w1")
+    second = _start_worker(tmp_path, _handler("w2"), "w2")
+    events = []
+    try:
+        with Coordinator([first.address, second.address], on_event=lambda step, event: events.append(
+            (step.step_id, event["status"], event["metrics"]["worker"])
+        )) as coordinator:
+            plan = PlanIR(
+                meta={},
+                steps=[
+                    StepIR("a", "VerifyDownload", "A", {"archive": "a.zip", "parallel": True}),
+                    StepIR("b", "VerifyDownload", "B", {"archive": "b.zip", "parallel": True}),
+                    StepIR("c", "VerifyDownload", "C", {"entries": [{"archive": "b.zip"}]}),
+                ],
+                edges=[EdgeIR("a", "c"), EdgeIR("b", "c")],
+            )
+            ctx = {
+                "run_id": "run-1",
+                "handlers": {"VerifyDownload": coordinator.run_step},
+                "concurrent_step_types": ["VerifyDownload"],
+                "max_parallel": 2,
+            }
+            result = execute(plan, ctx)
+    finally:
+        _stop(first, second)
+
+    assert result.status == "Succeeded"
+    assert result.executed_step_ids == ["a", "b", "c"]
+    workers = {step_id: worker_id for worker_id, step_id, _, _ in runs}
+    assert {workers["a"], workers["b"]} == {"w1", "w2"}
+    assert workers["c"] == workers["b"]
+    assert all(run_id == "run-1" and root == tmp_path for _, _, run_id, root in runs)
+    assert [status for step_id, status, _ in events if step_id == "c"] == ["Running", "Succeeded"]
+
+
+def test_coordinator_reschedules_step_after_worker_loss(tmp_path: Path) -> None:
+    """Проверяем, что шаг потерянного worker выполняется на другом."""
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def _lost_worker() -> None:
+        connection, _ = listener.accept()
+        with connection, connection.makefile("rwb") as stream:
+            stream.write(b'{"type": "hello", "worker_id": "lost"}\n')
+            stream.flush()
+            stream.readline()
+
+    threading.Thread(target=_lost_worker, daemon=True).start()
+    healthy = _start_worker(tmp_path, {"Extract": lambda step, ctx: None}, "healthy")
+    events = []
+    try:
+        lost_address = "127.0.0.1:%d" % listener.getsockname()[1]
+        with Coordinator([lost_address, healthy.address], on_event=lambda step, event: events.append(
+            event["metrics"]["worker"]
+        )) as coordinator:
+            coordinator.run_step(StepIR("x", "Extract", "X"), {})
+            assert coordinator.alive_workers == ["healthy"]
+    finally:
+        listener.close()
+        _stop(healthy)
+
+    assert events == ["healthy", "healthy"]
+
+
+def test_worker_reports_blocked_and_failed_steps(tmp_path: Path) -> None:
+    """Проверяем передачу Blocked (с source) и Failed от worker."""
+
+    def _blocked(step: StepIR, ctx) -> None:
+        raise StepBlockedError("нет архива", next_action_at=10.0, source="downloads")
+
+    worker = _start_worker(tmp_path, {"VerifyDownload": _blocked}, "w")
+    try:
+        with Coordinator([worker.address]) as coordinator:
+            with pytest.raises(StepBlockedError) as blocked:
+                coordinator.run_step(StepIR("v", "VerifyDownload", "V"), {})
+            with pytest.raises(RuntimeError, match="не выполняет"):
+                coordinator.run_step(StepIR("r", "Report", "R"), {})
+    finally:
+        _stop(worker)
+
+    assert blocked.value.source == "downloads"
+    assert blocked.value.next_action_at == 10.0
+
+
+def test_coordinator_detects_silent_worker_by_heartbeat(tmp_path: Path) -> None:
+    """Проверяем, что замолчавший worker теряется по heartbeat, а долгий шаг — нет."""
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    release = threading.Event()
+
+    def _silent_worker() -> None:
+        connection, _ = listener.accept()
+        with connection, connection.makefile("rwb") as stream:
+            stream.write(b'{"type": "hello", "worker_id": "silent"}\n')
+            stream.flush()
+            stream.readline()
+            # Соединение открыто, но ни heartbeat, ни result не приходят.
+            release.wait(5)
+
+    threading.Thread(target=_silent_worker, daemon=True).start()
+    slow = WorkerServer(
+        tmp_path,
+        {"Extract": lambda step, ctx: time.sleep(0.5)},
+        worker_id="slow",
+        heartbeat_interval=0.05,
+    )
+    threading.Thread(target=slow.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    events = []
+    try:
+        silent_address = "127.0.0.1:%d" % listener.getsockname()[1]
+        with Coordinator(
+            [silent_address, slow.address],
+            on_event=lambda step, event: events.append(event["metrics"]["worker"]),
+            heartbeat_timeout=0.3,
+        ) as coordinator:
+            coordinator.run_step(StepIR("x", "Extract", "X"), {})
+            assert coordinator.alive_workers == ["slow"]
+    finally:
+        release.set()
+        listener.close()
+        _stop(slow)
+
+    assert events == ["slow", "slow"]
+
+
+def test_step_lock_fences_duplicate_step_on_shared_workspace(tmp_path: Path) -> None:
+    """Проверяем, что второй экземпляр шага на другом worker ждет первый."""
+
+    release = threading.Event()
+    order = []
+
+    def _slow(step: StepIR, ctx) -> None:
+        order.append("first-start")
+        release.wait(5)
+        order.append("first-end")
+
+    first = _start_worker(tmp_path, {"Extract": _slow}, "first")
+    second = _start_worker(tmp_path, {"Extract": lambda step, ctx: order.append("second")}, "second")
+    try:
+        with Coordinator([first.address]) as one, Coordinator([second.address]) as two:
+            thread = threading.Thread(target=one.run_step, args=(StepIR("x", "Extract", "X"), {}))
+            thread.start()
+            while not order:
+                time.sleep(0.01)
+            duplicate = threading.Thread(target=two.run_step, args=(StepIR("x", "Extract", "X"), {}))
+            duplicate.start()
+            time.sleep(0.2)
+            assert order == ["first-start"]
+            release.set()
+            thread.join(5)
+            duplicate.join(5)
+    finally:
+        release.set()
+        _stop(first, second)
+
+    assert order == ["first-start", "first-end", "second"]
+
+
+def test_step_timeout_fails_without_rescheduling(tmp_path: Path) -> None:
+    """Проверяем, что шаг за step_timeout завершается ошибкой и не уходит другому worker."""
+
+    ran = []
+    slow = WorkerServer(
+        tmp_path,
+        {"Extract": lambda step, ctx: time.sleep(0.5)},
+        worker_id="slow",
+        heartbeat_interval=0.05,
+    )
+    threading.Thread(target=slow.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    spare = _start_worker(tmp_path, {"Extract": lambda step, ctx: ran.append(step.step_id)}, "spare")
+    try:
+        with Coordinator([slow.address, spare.address], step_timeout=0.1) as coordinator:
+            # Оба worker свободны и без кэша: шаг достается первому, медленному.
+            with pytest.raises(RuntimeError, match="не уложился"):
+                coordinator.run_step(StepIR("x", "Extract", "X"), {})
+    finally:
+        _stop(slow, spare)
+
+    assert ran == []
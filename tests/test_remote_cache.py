@@ -0,0 +1,139 @@
+"""Тесты удаленного кэша действий и эталонного сервера."""
+
+import hashlib
+import socket
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import modbs.archives
+from modbs.models import StepIR
+from modbs.remote_cache import CacheServer, RemoteCache, RemoteCacheError
+from modbs.steps.install import install_to_manager
+
+_FILES = {"SkyUI_SE.esp": b"plugin", "interface/skyui.swf": b"swf" * 1000}
+
+
+def _make_zip(path: Path) -> None:
+    """Создает одинаковый zip-архив мода на "машине" path."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in _FILES.items():
+            bundle.writestr(zipfile.ZipInfo(name, (2020, 1, 1, 0, 0, 0)), data)
+
+
+def _install(root: Path, url: str):
+    """Выполняет InstallToManager с удаленным кэшем."""
+
+    step = StepIR(
+        step_id="install",
+        step_type="InstallToManager",
+        label="Install",
+        payload={"archives": [{"archive": "cache/downloads/SkyUI.zip", "name": "SkyUI"}]},
+    )
+    return install_to_manager(step, {"root_path": root, "remote_cache": {"url": url}})
+
+
+@pytest.fixture()
+def cache_server(tmp_path: Path):
+    """Эталонный сервер кэша на свободном порту localhost."""
+
+    server = CacheServer(tmp_path / "cache-server")
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_second_machine_reuses_uploaded_install(tmp_path: Path, cache_server, monkeypatch) -> None:
+    """Проверяем, что вторая "машина" собирает мод из кэша без распаковки."""
+
+    first, second = tmp_path / "a", tmp_path / "b"
+    for root in (first, second):
+        _make_zip(root / "cache" / "downloads" / "SkyUI.zip")
+
+    assert [result.status for result in _install(first, cache_server.url)] == ["installed"]
+    assert len(list((cache_server.storage_dir / "cas").iterdir())) == len(_FILES)
+
+    def _no_extract(*_args, **_kwargs):
+        raise AssertionError("архив не должен распаковываться")
+
+    monkeypatch.setattr(modbs.archives, "extract_archive", _no_extract)
+    results = _install(second, cache_server.url)
+
+    assert [result.status for result in results] == ["cached"]
+    mod_dir = second / "workspace" / "mods" / "SkyUI"
+    assert {path: (mod_dir / path).read_bytes() for path in _FILES} == _FILES
+    assert results[0].files["SkyUI_SE.esp"]["hash"] == "sha256:" + hashlib.sha256(b"plugin").hexdigest()
+
+
+def test_cache_failures_fall_back_to_local_extraction(tmp_path: Path, cache_server) -> None:
+    """Проверяем откат на распаковку при недоступном кэше и испорченном blob."""
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        dead_url = "http://127.0.0.1:%d" % probe.getsockname()[1]
+    offline = tmp_path / "offline"
+    _make_zip(offline / "cache" / "downloads" / "SkyUI.zip")
+    assert [result.status for result in _install(offline, dead_url)] == ["installed"]
+
+    _make_zip(tmp_path / "a" / "cache" / "downloads" / "SkyUI.zip")
+    _install(tmp_path / "a", cache_server.url)
+    for blob in (cache_server.storage_dir / "cas").iterdir():
+        blob.write_bytes(b"corrupted")
+
+    fresh = tmp_path / "fresh"
+    _make_zip(fresh / "cache" / "downloads" / "SkyUI.zip")
+    assert [result.status for result in _install(fresh, cache_server.url)] == ["installed"]
+    assert (fresh / "workspace" / "mods" / "SkyUI" / "SkyUI_SE.esp").read_bytes() == b"plugin"
+
+    # Запись действия неверной формы тоже откатывает на распаковку.
+    for action in (cache_server.storage_dir / "ac").iterdir():
+        action.write_text('{"files": {"SkyUI_SE.esp": "not-a-dict"}}', encoding="utf-8")
+    malformed = tmp_path / "malformed"
+    _make_zip(malformed / "cache" / "downloads" / "SkyUI.zip")
+    assert [result.status for result in _install(malformed, cache_server.url)] == ["installed"]
+
+
+def test_truncated_response_raises_remote_cache_error(tmp_path: Path) -> None:
+    """Проверяем, что оборванный ответ (IncompleteRead) становится RemoteCacheError."""
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def _truncating_server() -> None:
+        connection, _ = listener.accept()
+        with connection:
+            connection.recv(65536)
+            connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\nshort")
+
+    threading.Thread(target=_truncating_server, daemon=True).start()
+    try:
+        remote = RemoteCache("http://127.0.0.1:%d" % listener.getsockname()[1], timeout=5)
+        with pytest.raises(RemoteCacheError, match="Некорректный ответ"):
+            remote.lookup_actions(["sha256:" + "0" * 64])
+    finally:
+        listener.close()
+
+
+def test_server_verifies_blobs_and_batches_lookups(tmp_path: Path, cache_server) -> None:
+    """Проверяем проверку digest при загрузке и пакетные запросы."""
+
+    remote = RemoteCache(cache_server.url)
+    data_path = tmp_path / "blob.bin"
+    data_path.write_bytes(b"payload")
+    digest = "sha256:" + hashlib.sha256(b"payload").hexdigest()
+    other = "sha256:" + "0" * 64
+
+    with pytest.raises(RemoteCacheError):
+        remote.upload("sha256:" + "1" * 64, {"files": {}}, {other: data_path})
+
+    assert remote.upload("sha256:" + "2" * 64, {"files": {"x": {"hash": digest}}}, {digest: data_path}) == 1
+    assert remote.find_missing([digest, other]) == [other]
+    assert remote.lookup_actions(["sha256:" + "2" * 64, "sha256:" + "3" * 64]) == {
+        "sha256:" + "2" * 64: {"files": {"x": {"hash": digest}}}
+    }
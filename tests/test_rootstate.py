@@ -0,0 +1,121 @@
+"""Тесты для RootState: snapshot/apply/rollback/verify."""
+
+from pathlib import Path
+
+from modbs import rootstate
+from modbs.models import StepIR
+from modbs.steps.root_state import root_apply, root_snapshot, root_verify
+
+
+def _make_game(root_path: Path) -> Path:
+    """Создает фиктивный Stock Game."""
+
+    game_dir = root_path / "stock"
+    (game_dir / "Data").mkdir(parents=True)
+    (game_dir / "SkyrimSE.exe").write_bytes(b"MZ" + b"\0" * 64)
+    (game_dir / "Data" / "Skyrim.esm").write_bytes(b"TES4" + b"\1" * 128)
+    return game_dir
+
+
+def test_snapshot_links_files_and_verifies_clean(tmp_path: Path) -> None:
+    """Проверяем, что снимок не копирует байты и проходит verify."""
+
+    game_dir = _make_game(tmp_path)
+    rootstate_dir = tmp_path / "rootstate"
+
+    manifest = rootstate.take_snapshot(game_dir, rootstate_dir, "baseline")
+
+    assert set(manifest["files"]) == {"SkyrimSE.exe", "Data/Skyrim.esm"}
+    assert manifest["files"]["Data/Skyrim.esm"]["hash"].startswith("sha256:")
+    assert "copy" not in manifest["link_methods"]
+    snapshot_file = rootstate_dir / "snapshots" / "baseline" / "files" / "Data" / "Skyrim.esm"
+    assert snapshot_file.read_bytes() == (game_dir / "Data" / "Skyrim.esm").read_bytes()
+    assert rootstate.verify(game_dir, rootstate_dir).is_clean()
+
+
+def test_rollback_restores_only_differing_files(tmp_path: Path) -> None:
+    """Проверяем, что rollback чинит отличия и удаляет лишние файлы."""
+
+    game_dir = _make_game(tmp_path)
+    rootstate_dir = tmp_path / "rootstate"
+    rootstate.take_snapshot(game_dir, rootstate_dir, "baseline")
+
+    # Изменение через rename, как делают RootApply и инструменты с atomic write.
+    exe_path = game_dir / "SkyrimSE.exe"
+    patched = game_dir / "patched.tmp"
+    patched.write_bytes(b"MZ-patched")
+    patched.replace(exe_path)
+    (game_dir / "d3d11.dll").write_bytes(b"MZ-enb")
+    esm_inode = (game_dir / "Data" / "Skyrim.esm").stat().st_ino
+
+    diff = rootstate.rollback(game_dir, rootstate_dir)
+
+    assert diff.changed == ["SkyrimSE.exe"]
+    assert diff.added == ["d3d11.dll"]
+    assert exe_path.read_bytes() == b"MZ" + b"\0" * 64
+    assert not (game_dir / "d3d11.dll").exists()
+    assert (game_dir / "Data" / "Skyrim.esm").stat().st_ino == esm_inode
+    assert rootstate.verify(game_dir, rootstate_dir).is_clean()
+
+
+def test_root_steps_apply_overlay_and_detect_drift(tmp_path: Path) -> None:
+    """Проверяем шаги RootApply/RootVerify и обнаружение расхождений."""
+
+    game_dir = _make_game(tmp_path)
+    enb_dir = tmp_path / "workspace" / "root" / "ENB"
+    enb_dir.mkdir(parents=True)
+    (enb_dir / "enbseries.ini").write_text("[GLOBAL]\n", encoding="utf-8")
+
+    ctx = {"root_path": tmp_path, "paths": {"stock_game": str(game_dir)}}
+    root_snapshot(StepIR(step_id="r1", step_type="RootSnapshot", label="Snap"), ctx)
+    apply_step = StepIR(
+        step_id="r2",
+        step_type="RootApply",
+        label="ENB",
+        payload={"source": "workspace/root/ENB"},
+    )
+    root_apply(apply_step, ctx)
+    verify_step = StepIR(step_id="r3", step_type="RootVerify", label="Verify")
+    root_verify(verify_step, ctx)
+
+    assert (game_dir / "enbseries.ini").exists()
+
+    (game_dir / "stray.txt").write_text("stray", encoding="utf-8")
+    try:
+        root_verify(verify_step, ctx)
+    except RuntimeError as exc:
+        assert "stray.txt" in str(exc)
+    else:
+        raise AssertionError("Ожидали RuntimeError при расхождении RootState")
+
+
+def test_snapshot_step_is_idempotent_on_second_apply(tmp_path: Path) -> None:
+    """Проверяем, что повторный RootSnapshot сохраняет снимок, а refresh его обновляет."""
+
+    game_dir = _make_game(tmp_path)
+    enb_dir = tmp_path / "workspace" / "root" / "ENB"
+    enb_dir.mkdir(parents=True)
+    (enb_dir / "enbseries.ini").write_text("[GLOBAL]\n", encoding="utf-8")
+    ctx = {"root_path": tmp_path, "paths": {"stock_game": str(game_dir)}}
+    snapshot_step = StepIR(step_id="r1", step_type="RootSnapshot", label="Snap")
+    apply_step = StepIR(
+        step_id="r2",
+        step_type="RootApply",
+        label="ENB",
+        payload={"source": "workspace/root/ENB"},
+    )
+    verify_step = StepIR(step_id="r3", step_type="RootVerify", label="Verify")
+
+    for _ in range(2):
+        root_snapshot(snapshot_step, ctx)
+        root_apply(apply_step, ctx)
+        root_verify(verify_step, ctx)
+
+    rootstate_dir = tmp_path / "rootstate"
+    assert "enbseries.ini" not in rootstate.load_manifest(rootstate_dir, "baseline")["files"]
+
+    refresh_step = StepIR(step_id="r1", step_type="RootSnapshot", label="Snap", payload={"refresh": True})
+    root_snapshot(refresh_step, ctx)
+    assert "enbseries.ini" in rootstate.load_manifest(rootstate_dir, "baseline")["files"]
+    assert sorted(path.name for path in (rootstate_dir / "snapshots").iterdir()) == ["baseline"]
+    root_verify(verify_step, ctx)
@@ -1,10 +1,21 @@
 """Тесты для lockfile и provenance."""
 
+import json
 from pathlib import Path
 
+import pytest
+
+from modbs import storage
 from modbs.adapters.loot import run as run_loot
 from modbs.models import StepIR
-from modbs.state import write_state_artifacts
+from modbs.state import (
+    iter_lockfile_artifacts,
+    load_lockfile,
+    lookup_lockfile_hash,
+    verify_lockfile,
+    write_checkpoint_delta,
+    write_state_artifacts,
+)
 from modbs.steps.workspace_init import workspace_init
 from modbs.steps.write_mo2_profile import write_mo2_profile
 from modbs.storage import read_json
@@ -65,3 +76,148 @@ def test_provenance_contains_all_outputs(tmp_path: Path) -> None:
     }
 
     assert expected_paths.issubset(artifact_paths)
+
+
+def test_checkpoint_appends_only_changed_paths(tmp_path: Path) -> None:
+    """Проверяем, что Checkpoint пишет delta только по изменившимся путям."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run")
+
+    modlist_path = tmp_path / "workspace" / "profiles" / "MVP" / "modlist.txt"
+    modlist_path.write_text("+SkyUI\n", encoding="utf-8")
+    extra_path = tmp_path / "workspace" / "notes.txt"
+    extra_path.write_text("notes", encoding="utf-8")
+    (tmp_path / "state" / "loot.mock.json").unlink()
+
+    record = write_checkpoint_delta(tmp_path, release_id="test-run")
+
+    assert [item["path"] for item in record["added"]] == ["workspace/notes.txt"]
+    assert [item["path"] for item in record["changed"]] == [
+        "workspace/profiles/MVP/modlist.txt"
+    ]
+    assert record["removed"] == ["state/loot.mock.json"]
+
+    deltas_path = tmp_path / "state" / "lockfile.deltas.jsonl"
+    lines = deltas_path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[-1])["seq"] == 1
+
+
+def test_torn_delta_record_survives_next_checkpoint(tmp_path: Path) -> None:
+    """Проверяем, что оборванная при сбое delta-запись не ломает чтение после дозаписи."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run")
+    deltas_path = tmp_path / "state" / "lockfile.deltas.jsonl"
+    with open(deltas_path, "ab") as handle:
+        handle.write(b'{"generation": 1, "seq": 1, "added": [{"path": "workspace/to')
+
+    (tmp_path / "workspace" / "notes.txt").write_text("notes", encoding="utf-8")
+    write_checkpoint_delta(tmp_path, release_id="test-run")
+
+    paths = {item["path"] for item in load_lockfile(tmp_path)["artifacts"]}
+    assert "workspace/notes.txt" in paths
+    assert "workspace/to" not in paths
+
+
+def test_readers_read_through_pending_materialization(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что читатели не довершают транзакцию state/, а писатель — да."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run")
+    (tmp_path / "workspace" / "notes.txt").write_text("notes", encoding="utf-8")
+    write_checkpoint_delta(tmp_path, release_id="test-run")
+    expected = load_lockfile(tmp_path)
+
+    def _crash(*args, **kwargs) -> None:
+        raise OSError("сбой после фиксации")
+
+    # Сбой между публикацией манифеста и переименованиями.
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, "_roll_forward", _crash)
+        with pytest.raises(OSError):
+            write_state_artifacts(tmp_path, release_id="test-run", lockfile_format="lines")
+
+    state_dir = tmp_path / "state"
+    before = sorted(path.name for path in state_dir.iterdir())
+    assert ".txn.json" in before
+    assert load_lockfile(tmp_path)["artifacts"] == expected["artifacts"]
+    assert lookup_lockfile_hash(tmp_path, "workspace/notes.txt") is not None
+    assert sorted(path.name for path in state_dir.iterdir()) == before
+
+    write_checkpoint_delta(tmp_path, release_id="test-run")
+    assert not (state_dir / ".txn.json").exists()
+    assert not (state_dir / "lockfile.json").exists()
+    assert load_lockfile(tmp_path)["artifacts"] == expected["artifacts"]
+
+
+def test_load_lockfile_merges_base_and_deltas(tmp_path: Path) -> None:
+    """Проверяем, что читатели видят base + deltas, а материализация их сворачивает."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run")
+
+    (tmp_path / "workspace" / "notes.txt").write_text("notes", encoding="utf-8")
+    write_checkpoint_delta(tmp_path, release_id="test-run")
+
+    merged_paths = {item["path"] for item in load_lockfile(tmp_path)["artifacts"]}
+    base_paths = {
+        item["path"]
+        for item in read_json(tmp_path / "state" / "lockfile.json")["artifacts"]
+    }
+    assert "workspace/notes.txt" in merged_paths
+    assert "workspace/notes.txt" not in base_paths
+
+    write_state_artifacts(tmp_path, release_id="test-run")
+
+    assert not (tmp_path / "state" / "lockfile.deltas.jsonl").exists()
+    rebuilt_paths = {item["path"] for item in load_lockfile(tmp_path)["artifacts"]}
+    assert merged_paths == rebuilt_paths
+
+
+def test_lines_lockfile_format_with_deltas(tmp_path: Path) -> None:
+    """Проверяем lockfile.lines: поиск и потоковый перебор с учетом deltas."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run", lockfile_format="lines")
+
+    state_dir = tmp_path / "state"
+    assert not (state_dir / "lockfile.json").exists()
+    assert (state_dir / "lockfile.lines").exists()
+
+    (tmp_path / "workspace" / "notes.txt").write_text("notes", encoding="utf-8")
+    write_checkpoint_delta(tmp_path, release_id="test-run", lockfile_format="lines")
+
+    payload = load_lockfile(tmp_path)
+    assert payload["release_id"] == "test-run"
+    assert list(iter_lockfile_artifacts(tmp_path)) == [
+        (item["path"], item["hash"]) for item in payload["artifacts"]
+    ]
+    notes_hash = lookup_lockfile_hash(tmp_path, "workspace/notes.txt")
+    assert notes_hash and notes_hash.startswith("sha256:")
+    assert lookup_lockfile_hash(tmp_path, "workspace/profiles/MVP/modlist.txt") is not None
+    assert lookup_lockfile_hash(tmp_path, "workspace/absent.txt") is None
+
+
+def test_verify_lockfile_streams_diff_and_checks_single_paths(tmp_path: Path) -> None:
+    """Проверяем сверку outputs с lockfile: потоковый diff и точечный lookup."""
+
+    _prepare_outputs(tmp_path)
+    write_state_artifacts(tmp_path, release_id="test-run", lockfile_format="lines")
+    assert verify_lockfile(tmp_path) == {"added": [], "changed": [], "removed": []}
+
+    modlist = "workspace/profiles/MVP/modlist.txt"
+    (tmp_path / modlist).write_text("+Changed\n", encoding="utf-8")
+    (tmp_path / "workspace" / "notes.txt").write_text("notes", encoding="utf-8")
+    (tmp_path / "state" / "loot.mock.json").unlink()
+
+    assert verify_lockfile(tmp_path) == {
+        "added": ["workspace/notes.txt"],
+        "changed": [modlist],
+        "removed": ["state/loot.mock.json"],
+    }
+    assert verify_lockfile(tmp_path, [modlist, "workspace/notes.txt"]) == {
+        "added": ["workspace/notes.txt"],
+        "changed": [modlist],
+        "removed": [],
+    }
@@ -0,0 +1,77 @@
+"""Тесты межзапусковой статистики шагов."""
+
+from pathlib import Path
+
+from modbs import journal
+from modbs.cli import main
+from modbs.journal import append_event
+from modbs.stats import update_stats, write_stats
+
+
+def _record_run(run_id: str, durations: dict[str, tuple[str, float]]) -> None:
+    """Пишет в журнал пары Running/финал для шагов одного запуска."""
+
+    for step_id, (status, duration) in durations.items():
+        step_type = step_id.title()
+        append_event("2026-01-01T00:00:00+00:00", step_id, "Running", "", None, run_id, step_type)
+        append_event(
+            "2026-01-01T00:00:01+00:00",
+            step_id,
+            status,
+            "",
+            {"duration_ms": duration},
+            run_id,
+            step_type,
+        )
+
+
+def test_stats_percentiles_rates_and_trend(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем p50/p95/max, долю ошибок/блокировок и растущий тренд."""
+
+    monkeypatch.setattr(journal, "JOURNAL_PATH", tmp_path / "state" / "job.journal.jsonl")
+    for index, duration in enumerate([10.0, 20.0, 30.0, 40.0]):
+        status = "Failed" if index == 3 else "Succeeded"
+        _record_run(f"r{index}", {"deploy": (status, duration), "loot": ("Blocked", 1.0)})
+
+    summary = write_stats(tmp_path)
+
+    assert summary["Deploy"]["runs"] == 4
+    assert summary["Deploy"]["p50_ms"] == 20.0
+    assert summary["Deploy"]["p95_ms"] == 40.0
+    assert summary["Deploy"]["max_ms"] == 40.0
+    assert summary["Deploy"]["failure_rate"] == 0.25
+    assert summary["Deploy"]["trend_ms_per_run"] == 10.0
+    assert summary["Loot"]["block_rate"] == 1.0
+    assert "| Deploy | 4 |" in (tmp_path / "state" / "stats.md").read_text(encoding="utf-8")
+
+
+def test_stats_aggregate_is_incremental(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что повторный вызов дочитывает только новые события."""
+
+    journal_path = tmp_path / "state" / "job.journal.jsonl"
+    monkeypatch.setattr(journal, "JOURNAL_PATH", journal_path)
+    _record_run("r1", {"deploy": ("Succeeded", 5.0)})
+    first = update_stats(tmp_path)
+    assert first["journal"]["offset"] == journal_path.stat().st_size
+
+    # Незавершенная строка не учитывается и не сдвигает позицию.
+    with open(journal_path, "ab") as handle:
+        handle.write(b'{"step_id": "deploy", "status": "Runn')
+    second = update_stats(tmp_path)
+    assert second["journal"]["offset"] == first["journal"]["offset"]
+
+    _record_run("r2", {"deploy": ("Succeeded", 7.0)})
+    third = update_stats(tmp_path)
+    assert third["summary"]["Deploy"]["runs"] == 2
+    assert third["step_types"]["Deploy"]["samples"] == [5.0, 7.0]
+
+
+def test_stats_cli_command(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем команду modbs stats."""
+
+    monkeypatch.setattr(journal, "JOURNAL_PATH", tmp_path / "state" / "job.journal.jsonl")
+    _record_run("r1", {"report": ("Succeeded", 3.0)})
+
+    assert main(["stats", "--root", str(tmp_path)]) == 0
+    assert (tmp_path / "state" / "stats.json").exists()
+    assert (tmp_path / "state" / "stats.md").exists()
@@ -0,0 +1,79 @@
+"""Тесты modbs status: чтение хвоста журнала."""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import modbs.status
+from modbs.status import format_status, read_status
+
+
+def _event(run_id, step_id, status, ts, **extra):
+    """Формирует строку события журнала."""
+
+    payload = {"ts": ts, "step_id": step_id, "status": status, "message": extra.pop("message", ""),
+               "metrics": extra.pop("metrics", {}), "run_id": run_id, **extra}
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+def _write_journal(root: Path, lines) -> Path:
+    """Пишет журнал в state/."""
+
+    path = root / "state" / "job.journal.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+
+def test_status_reports_blocker_of_last_run(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем сводку последнего запуска с блокером и границу run_id."""
+
+    monkeypatch.setattr(modbs.status, "_READ_CHUNK_SIZE", 16)
+    _write_journal(tmp_path, [
+        _event("r1", "old", "Running", "2026-01-01T00:00:00+00:00"),
+        _event("r1", "old", "Failed", "2026-01-01T00:00:01+00:00", message="старый сбой"),
+        _event("r2", "init", "Running", "2026-01-02T00:00:00+00:00", step_type="WorkspaceInit"),
+        _event("r2", "init", "Succeeded", "2026-01-02T00:00:02+00:00", step_type="WorkspaceInit"),
+        _event("r2", "verify", "Running", "2026-01-02T00:00:02+00:00", step_type="VerifyDownload"),
+        _event("r2", "verify", "Blocked", "2026-01-02T00:00:05+00:00", step_type="VerifyDownload",
+               message="Архивы не скачаны: a.zip", metrics={"source": "downloads"}),
+    ])
+
+    status = read_status(tmp_path)
+
+    assert status["run_id"] == "r2"
+    assert status["status"] == "Blocked"
+    assert status["elapsed_seconds"] == 5.0
+    assert status["steps"] == {"Blocked": 1, "Succeeded": 1}
+    assert status["blocker"]["message"] == "Архивы не скачаны: a.zip"
+    assert status["blocker"]["source"] == "downloads"
+    assert "Blocker: verify Blocked" in format_status(status)
+
+
+def test_status_reads_only_current_run_and_skips_partial_line(tmp_path: Path, monkeypatch) -> None:
+    """Проверяем, что чтение не зависит от размера истории журнала."""
+
+    history = [_event("old", f"s{index}", "Succeeded", "2026-01-01T00:00:00+00:00") for index in range(5000)]
+    current = [
+        _event("now", "install", "Succeeded", "2026-01-02T00:00:00+00:00"),
+        _event("now", "deploy", "Running", "2026-01-02T00:00:10+00:00", step_type="DeployProfile"),
+        '{"ts": "2026-01-02T00:00:11+00:00", "step_id": "deploy", "sta',
+    ]
+    _write_journal(tmp_path, history + current)
+
+    consumed = []
+    original = modbs.status._iter_lines_reversed
+
+    def _counting(handle, end):
+        for line in original(handle, end):
+            consumed.append(line)
+            yield line
+
+    monkeypatch.setattr(modbs.status, "_iter_lines_reversed", _counting)
+    status = read_status(tmp_path, now=datetime(2026, 1, 2, 0, 1, tzinfo=timezone.utc))
+
+    assert len(consumed) == 4
+    assert status["status"] == "Running"
+    assert status["current_step"]["step_id"] == "deploy"
+    assert status["current_step"]["step_type"] == "DeployProfile"
+    assert status["elapsed_seconds"] == 60.0
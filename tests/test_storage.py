@@ -3,7 +3,14 @@
 import json
 
 from modbs.journal import append_event
-from modbs.storage import append_jsonl, read_json, write_json
+from modbs.storage import (
+    DURABILITY_BUFFERED,
+    StateTransaction,
+    append_jsonl,
+    read_json,
+    recover_transaction,
+    write_json,
+)
 
 
 def test_storage_json_roundtrip(tmp_path) -> None:
@@ -79,3 +86,49 @@ def test_journal_rejects_invalid_status(tmp_path, monkeypatch) -> None:
         assert "Недопустимый статус" in str(exc)
     else:
         raise AssertionError("Ожидали ValueError для недопустимого статуса")
+
+
+def test_state_transaction_commits_files_together(tmp_path) -> None:
+    """Проверяем, что транзакция публикует все файлы и удаления разом."""
+
+    (tmp_path / "stale.jsonl").write_text("{}\n", encoding="utf-8")
+
+    with StateTransaction(tmp_path, DURABILITY_BUFFERED) as transaction:
+        transaction.stage_json("lockfile.json", {"release_id": "r1"})
+        transaction.stage_json("provenance.json", {"artifacts": []})
+        transaction.stage_delete("stale.jsonl")
+        assert not (tmp_path / "lockfile.json").exists()
+
+    assert read_json(tmp_path / "lockfile.json") == {"release_id": "r1"}
+    assert read_json(tmp_path / "provenance.json") == {"artifacts": []}
+    assert not (tmp_path / "stale.jsonl").exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "lockfile.json",
+        "provenance.json",
+    ]
+
+
+def test_recover_transaction_rolls_forward_committed_manifest(tmp_path) -> None:
+    """Проверяем, что зафиксированная, но не довершенная транзакция применяется."""
+
+    (tmp_path / ".txn-a.tmp").write_text('{"v": 2}', encoding="utf-8")
+    (tmp_path / ".txn-orphan.tmp").write_text("junk", encoding="utf-8")
+    write_json(tmp_path / "lockfile.json", {"v": 1})
+    manifest = {"replace": [[".txn-a.tmp", "lockfile.json"]], "delete": []}
+    (tmp_path / ".txn.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+    assert recover_transaction(tmp_path) is True
+
+    assert read_json(tmp_path / "lockfile.json") == {"v": 2}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["lockfile.json"]
+
+
+def test_write_json_rejects_unknown_durability(tmp_path) -> None:
+    """Проверяем, что неизвестный уровень durability отклоняется."""
+
+    try:
+        write_json(tmp_path / "payload.json", {}, durability="eventual")
+    except ValueError as exc:
+        assert "durability" in str(exc)
+    else:
+        raise AssertionError("Ожидали ValueError для неизвестного durability")
@@ -0,0 +1,62 @@
+"""Тесты экспорта Chrome trace для apply."""
+
+import threading
+from pathlib import Path
+
+from modbs import trace
+from modbs.cli import cmd_apply, cmd_plan
+from modbs.storage import read_json, write_json
+
+
+def test_span_is_noop_without_active_trace() -> None:
+    """Проверяем, что без start_trace события не собираются."""
+
+    with trace.span("idle", "test") as args:
+        args["ignored"] = True
+
+    assert trace.stop_trace() == []
+
+
+def test_tracer_records_thread_ids() -> None:
+    """Проверяем complete-события и метаданные потоков."""
+
+    def _work() -> None:
+        with trace.span("worker", "test"):
+            pass
+
+    trace.start_trace()
+    with trace.span("main", "test"):
+        worker = threading.Thread(target=_work, name="w1")
+        worker.start()
+        worker.join()
+    events = trace.stop_trace()
+
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert set(spans) == {"main", "worker"}
+    assert all(event["dur"] >= 0 for event in spans.values())
+    assert spans["main"]["tid"] == threading.get_ident()
+    assert spans["worker"]["tid"] != spans["main"]["tid"]
+    thread_names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert "w1" in thread_names
+
+
+def test_apply_trace_covers_steps_journal_and_writes(tmp_path: Path) -> None:
+    """Проверяем, что apply --trace пишет шаги, журнал, атомарные записи и обход."""
+
+    config_path = tmp_path / "config.json"
+    write_json(
+        config_path,
+        {"paths": {"root": str(tmp_path)}, "profile_name": "MVP", "loot": {"mode": "mock"}},
+    )
+    cmd_plan(config_path)
+    trace_path = tmp_path / "trace.json"
+
+    result = cmd_apply(tmp_path, config_path, trace_path)
+
+    assert result.status == "Succeeded"
+    events = read_json(trace_path)["traceEvents"]
+    categories = {event.get("cat") for event in events}
+    assert {"run", "step", "journal", "io", "state"} <= categories
+    step_names = {event["name"] for event in events if event.get("cat") == "step"}
+    assert "checkpoint" in step_names
+    assert any(event["ph"] == "M" and event["name"] == "thread_name" for event in events)
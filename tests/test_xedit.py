@@ -0,0 +1,171 @@
+"""Тесты шага RunXEditQAC и адаптера xEdit."""
+
+import os
+import shutil
+import stat
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+from modbs.adapters.xedit import QACLogParser
+from modbs.executor import StepBlockedError
+from modbs.models import StepIR
+from modbs.steps.xedit_qac import run_xedit_qac
+from modbs.storage import read_json
+
+# Заглушка xEdit: пишет лог QAC, «чистит» плагин и отмечает запуск.
+_STUB = '''
+import sys
+from pathlib import Path
+
+data_dir = next(arg[3:] for arg in sys.argv if arg.startswith("-D:"))
+module = Path(data_dir) / sys.argv[sys.argv.index("-autoload") + 1]
+assert "-quickautoclean" in sys.argv and "-autoexit" in sys.argv
+with open(sys.argv[1], "a", encoding="utf-8") as calls:
+    calls.write(module.name + "\\n")
+data = module.read_bytes()
+if data.endswith(b"BROKEN"):
+    print("[00:00] <Error: could not be resolved>")
+    sys.exit(1)
+if data.endswith(b"DIRTY"):
+    print("[00:00] Removing: [REFR:00012345]")
+    print("[00:00] Removing: [REFR:00012346]")
+    print("[00:00] Undeleting: [REFR:00023456]")
+    module.write_bytes(data[: -len(b"DIRTY")])
+print("[00:01] Done.")
+'''
+
+
+def _write_stub(tmp_path: Path) -> Path:
+    stub = tmp_path / "xedit-stub"
+    stub.write_text(f"#!{sys.executable}\n{_STUB}", encoding="utf-8")
+    stub.chmod(stub.stat().st_mode | stat.S_IXUSR)
+    return stub
+
+
+def _write_plugin(root: Path, mod: str, name: str, tail: bytes) -> Path:
+    path = root / "workspace" / "mods" / mod / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"TES4" + os.urandom(8) + tail)
+    return path
+
+
+def _deploy(root: Path, *plugins: Path) -> None:
+    """Раскладывает плагины в Data профиля MVP копиями, как DeployProfile без ссылок."""
+
+    data_dir = root / "workspace" / "deploy" / "MVP" / "Data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for plugin in plugins:
+        shutil.copy2(plugin, data_dir / plugin.name)
+
+
+def test_qac_cleans_in_parallel_and_skips_cached(tmp_path: Path) -> None:
+    """Проверяем разбор лога, кэш по digest и пропуск уже очищенных плагинов."""
+
+    dirty = _write_plugin(tmp_path, "ModA", "A.esp", b"DIRTY")
+    _deploy(tmp_path, dirty, _write_plugin(tmp_path, "ModB", "B.esp", b"CLEAN"))
+    calls = tmp_path / "calls.txt"
+    ctx = {
+        "root_path": tmp_path,
+        "profile_name": "MVP",
+        "xedit": {"path": str(_write_stub(tmp_path)), "args": [str(calls)], "version": "4.1.5", "max_workers": 2},
+    }
+    step = StepIR(step_id="qac", step_type="RunXEditQAC", label="QAC")
+
+    first = {result.plugin: result for result in run_xedit_qac(step, ctx)}
+
+    assert first["workspace/mods/ModA/A.esp"].status == "cleaned"
+    assert first["workspace/mods/ModA/A.esp"].itm_removed == 2
+    assert first["workspace/mods/ModA/A.esp"].udr_undeleted == 1
+    assert first["workspace/mods/ModB/B.esp"].status == "clean"
+    assert sorted(calls.read_text(encoding="utf-8").split()) == ["A.esp", "B.esp"]
+    # Очищенная в Data копия вернулась в мод.
+    assert not dirty.read_bytes().endswith(b"DIRTY")
+
+    # Повторный запуск: исходный digest B и digest очищенного A уже в кэше.
+    second = run_xedit_qac(step, ctx)
+    assert [result.status for result in second] == ["cached", "cached"]
+    assert len(calls.read_text(encoding="utf-8").split()) == 2
+
+    # Новая версия xEdit — другой ключ кэша.
+    ctx["xedit"]["version"] = "4.1.6"
+    run_xedit_qac(step, ctx)
+    assert len(calls.read_text(encoding="utf-8").split()) == 4
+    assert set(read_json(tmp_path / "state" / "xedit.qac.json")["versions"]) == {"4.1.5", "4.1.6"}
+
+
+def test_qac_failure_is_not_cached(tmp_path: Path) -> None:
+    """Проверяем, что ошибка xEdit валит шаг и не попадает в кэш."""
+
+    plugin = _write_plugin(tmp_path, "ModC", "C.esp", b"BROKEN")
+    _deploy(tmp_path, plugin)
+    calls = tmp_path / "calls.txt"
+    ctx = {
+        "root_path": tmp_path,
+        "profile_name": "MVP",
+        "xedit": {"path": str(_write_stub(tmp_path)), "args": [str(calls)]},
+    }
+    step = StepIR(
+        step_id="qac",
+        step_type="RunXEditQAC",
+        label="QAC",
+        payload={"plugins": [plugin.relative_to(tmp_path).as_posix()]},
+    )
+
+    with pytest.raises(RuntimeError, match="C.esp"):
+        run_xedit_qac(step, ctx)
+    with pytest.raises(RuntimeError):
+        run_xedit_qac(step, ctx)
+    assert len(calls.read_text(encoding="utf-8").split()) == 2
+
+
+def test_qac_cleans_masters_before_dependents(tmp_path: Path) -> None:
+    """Проверяем, что мастер чистится раньше зависящего от него плагина, а не одновременно."""
+
+    def _with_masters(mod: str, name: str, masters: list[str]) -> Path:
+        data = b"".join(
+            b"MAST" + struct.pack("<H", len(master) + 1) + master.encode() + b"\0" for master in masters
+        )
+        path = tmp_path / "workspace" / "mods" / mod / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"TES4" + struct.pack("<IIIII", len(data), 0, 0, 0, 44) + data + b"DIRTY")
+        return path
+
+    # Зависимый плагин идет первым по порядку модов.
+    dependent = _with_masters("AAA", "Dep.esp", ["Skyrim.esm", "Master.esm"])
+    master = _with_masters("ZZZ", "Master.esm", [])
+    _deploy(tmp_path, dependent, master)
+    calls = tmp_path / "calls.txt"
+    ctx = {
+        "root_path": tmp_path,
+        "profile_name": "MVP",
+        "xedit": {"path": str(_write_stub(tmp_path)), "args": [str(calls)], "max_workers": 2},
+    }
+
+    results = run_xedit_qac(StepIR(step_id="qac", step_type="RunXEditQAC", label="QAC"), ctx)
+
+    assert [result.status for result in results] == ["cleaned", "cleaned"]
+    assert calls.read_text(encoding="utf-8").split() == ["Master.esm", "Dep.esp"]
+
+
+def test_qac_blocked_without_xedit_and_log_parser(tmp_path: Path) -> None:
+    """Проверяем Blocked без xedit.path и без деплоя, счетчики потокового парсера."""
+
+    step = StepIR(step_id="qac", step_type="RunXEditQAC", label="QAC")
+    with pytest.raises(StepBlockedError) as excinfo:
+        run_xedit_qac(step, {"root_path": tmp_path})
+    assert excinfo.value.source == "xedit"
+
+    # Без развернутого Data профиля xEdit не найдет мастера.
+    ctx = {"root_path": tmp_path, "profile_name": "MVP", "xedit": {"path": str(_write_stub(tmp_path))}}
+    with pytest.raises(StepBlockedError) as excinfo:
+        run_xedit_qac(step, ctx)
+    assert excinfo.value.source == "deploy"
+
+    parser = QACLogParser()
+    for line in ["Removing: x", "Undeleting: y", "Found deleted navmesh z", "Exception in unit"]:
+        parser.feed(line)
+    assert (parser.itm_removed, parser.udr_undeleted, parser.navmesh_deleted) == (1, 1, 1)
+    assert parser.errors == ["Exception in unit"]